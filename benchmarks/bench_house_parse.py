@@ -0,0 +1,82 @@
+# benchmarks/bench_house_parse.py
+"""
+Parse time and peak memory of the House VideoArchive parsers.
+
+    python -m benchmarks.bench_house_parse                 # synthetic page
+    python -m benchmarks.bench_house_parse --html page.html # a saved copy of the real page
+
+Each parser runs in a fresh process so peak RSS isn't polluted by the other one.
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run(name, content, repeat, results):
+    from fetcher.house_scraper_static import parse_archive_bs4, parse_archive_lxml
+    parser = {"bs4": parse_archive_bs4, "lxml": parse_archive_lxml}[name]
+
+    baseline = _peak_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        videos = parser(content)
+        timings.append(time.perf_counter() - started)
+
+    results.put({
+        "parser": name,
+        "videos": len(videos),
+        "best_seconds": round(min(timings), 4),
+        "mean_seconds": round(sum(timings) / len(timings), 4),
+        "peak_rss_growth_mb": round(_peak_rss_mb() - baseline, 1),
+    })
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--html", type=Path, help="Saved VideoArchive page, defaults to a synthetic one")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = arg_parser.parse_args()
+
+    if args.html:
+        content = args.html.read_bytes()
+    else:
+        from benchmarks.fixtures import house_archive_html
+        content = house_archive_html()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    rows = []
+    for name in ("bs4", "lxml"):
+        process = context.Process(target=_run, args=(name, content, args.repeat, results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+
+    if rows[0]["videos"] != rows[1]["videos"]:
+        print(f"[Warning] Parsers disagree: {rows[0]['videos']} vs {rows[1]['videos']} videos")
+
+    if args.json:
+        print(json.dumps({"page_bytes": len(content), "results": rows}, indent=2))
+        return
+
+    print(f"Page: {len(content) / 1024:.0f} KB, {args.repeat} runs each")
+    for row in rows:
+        print(f"{row['parser']:>5}: {row['videos']} videos, best {row['best_seconds'] * 1000:.1f} ms, "
+              f"mean {row['mean_seconds'] * 1000:.1f} ms, peak RSS +{row['peak_rss_growth_mb']} MB")
+    print(f"Speedup: {rows[0]['best_seconds'] / rows[1]['best_seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end pipeline benchmark that never leaves this machine.
+
+    python -m benchmarks.bench_pipeline                              # scrape, house, senate, all
+    python -m benchmarks.bench_pipeline --scenario house --videos 8 --seconds 300
+    python -m benchmarks.bench_pipeline --transcribe whisper --ingest video
+    python -m benchmarks.bench_pipeline --output new.json --baseline last.json
+
+The House site, the Senate API, CloudFront and GCS are replaced by benchmarks/stub_server.py
+serving synthetic recordings (made with ffmpeg, cached in the work dir). Every scenario
+runs main.run_house / run_senate / run_all in a fresh process and working directory, so
+state.db, caches and peak RSS start from zero each time.
+
+Reported per scenario: wall time, per-stage latency and utilization (Pipeline.stats),
+videos/hour, audio-seconds processed per second, peak RSS of the pipeline process and of
+its largest child (ffmpeg), peak disk use of the working directory, bytes uploaded and
+requests per service. --baseline compares against an earlier --output and exits 1 if
+anything got worse by more than --tolerance.
+
+Needs ffmpeg/ffprobe. --transcribe whisper also needs the model to be available locally.
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCENARIOS = ("scrape", "house", "senate", "all")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASE_TONE_HZ = 300
+
+# metric -> True if bigger is better. Used by --baseline.
+COMPARED_METRICS = {
+    "wall_seconds": False,
+    "videos_per_hour": True,
+    "audio_seconds_per_second": True,
+    "peak_rss_mb": False,
+    "peak_disk_mb": False,
+}
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _dir_bytes(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+# ===== Child: one scenario against the stub services =====
+
+def _point_at_stubs(server: str, args):
+    """Swap every external URL for the stub server before anything runs."""
+    import main
+    import fetcher.house_scraper_static as house_scraper_static
+    import fetcher.senate_scraper as senate_scraper
+    import storage.hls_resolver as hls_resolver
+    import storage.video_processor as video_processor
+
+    house_scraper_static.HOUSE_URL = server
+    senate_scraper.SENATE_API_URL = f"{server}/default/api/all"
+    hls_resolver.SENATE_CDN_URL = server
+    main.HOUSE_VIDEO_URL = f"{server}/ArchiveVideoFiles"
+    main.SENATE_MAX_PAGES = math.ceil(args.videos / main.SENATE_BATCH_SIZE)
+    video_processor.TRANSCRIBE_MODE = args.transcribe
+    video_processor.INGEST_MODE = args.ingest
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, round(time.perf_counter() - started, 3)
+
+
+def _run_scrape(args) -> dict:
+    import main
+    from fetcher.house_scraper_static import HouseScraperStatic
+    from fetcher.senate_scraper import SenateScraper
+
+    house, cold = _timed(HouseScraperStatic().scrape)
+    _, unchanged = _timed(HouseScraperStatic().scrape)
+    senate, senate_seconds = _timed(SenateScraper().scrape, main.SENATE_MAX_PAGES, main.SENATE_BATCH_SIZE)
+    return {
+        "house_videos": len(house),
+        "house_seconds": cold,
+        "house_unchanged_seconds": unchanged,
+        "senate_videos": len(senate),
+        "senate_seconds": senate_seconds,
+    }
+
+
+def _run_pipeline(scenario: str, args) -> dict:
+    import main
+
+    if scenario == "all":
+        return {"stages": main.run_all(args.videos)}
+
+    pipeline = main.build_pipeline()
+    pipeline.start()
+    runner = main.run_house if scenario == "house" else main.run_senate
+    runner(args.videos, pipeline)
+    pipeline.close()
+    pipeline.join()
+    pipeline.report()
+    return {"stages": pipeline.stats()}
+
+
+def run_child(args):
+    sys.path.insert(0, str(REPO_ROOT))
+    _point_at_stubs(args.server, args)
+
+    started = time.perf_counter()
+    if args.child == "scrape":
+        result = _run_scrape(args)
+    else:
+        result = _run_pipeline(args.child, args)
+    result["wall_seconds"] = round(time.perf_counter() - started, 3)
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    result["peak_child_rss_mb"] = round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1)
+    from pipeline.metrics import snapshot
+    result["metrics"] = snapshot()
+    Path(args.result_file).write_text(json.dumps(result))
+
+
+# ===== Parent: fixtures, stub server, one process per scenario =====
+
+def build_fixtures(media_dir: Path, videos: int, seconds: int):
+    """Synthetic archive page, API items and recordings. Reused across runs with the same settings."""
+    from benchmarks.fixtures import house_archive_html, house_filenames, senate_api_items, make_media, make_hls
+
+    media_dir = media_dir / f"{seconds}s"
+    media_dir.mkdir(parents=True, exist_ok=True)
+    html = house_archive_html(committees=max(1, math.ceil(videos / 10)), videos_per_committee=10)
+    house_media = {}
+    for i, filename in enumerate(house_filenames(html, videos)):
+        path = media_dir / "house" / filename
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            make_media(path, seconds, BASE_TONE_HZ + 10 * i)
+        house_media[filename] = path
+
+    items = senate_api_items(videos)
+    senate_hls = {}
+    for i, item in enumerate(items):
+        out_dir = media_dir / "senate" / item["_id"]
+        if not (out_dir / "out.m3u8").exists():
+            source = media_dir / "senate" / f"{item['_id']}.mp4"
+            source.parent.mkdir(parents=True, exist_ok=True)
+            make_media(source, seconds, BASE_TONE_HZ + 5 + 10 * i)
+            make_hls(source, out_dir)
+            source.unlink()
+        senate_hls[item["_id"]] = out_dir
+
+    return html, house_media, items, senate_hls
+
+
+def run_scenario(scenario: str, stubs, work_dir: Path, args) -> dict:
+    """Run one scenario in a fresh process and directory while sampling its disk use."""
+    scenario_dir = work_dir / "runs" / scenario
+    shutil.rmtree(scenario_dir, ignore_errors=True)  # Earlier runs would leave state.db saying everything is done
+    scenario_dir.mkdir(parents=True, exist_ok=True)
+    result_file = scenario_dir / "result.json"
+    log_file = scenario_dir / "run.log"
+    requests_before = dict(stubs.requests)
+    gcs_before = stubs.gcs.total_bytes()
+
+    env = dict(os.environ, STORAGE_EMULATOR_HOST=stubs.url,
+               PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])))
+    command = [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", scenario,
+               "--server", stubs.url, "--result-file", str(result_file),
+               "--videos", str(args.videos), "--transcribe", args.transcribe, "--ingest", args.ingest]
+
+    peak_disk = [0]
+    done = threading.Event()
+
+    def sample_disk():
+        while not done.wait(0.25):
+            peak_disk[0] = max(peak_disk[0], _dir_bytes(scenario_dir))
+
+    sampler = threading.Thread(target=sample_disk, daemon=True)
+    sampler.start()
+    with open(log_file, "w") as log:
+        code = subprocess.run(command, cwd=scenario_dir, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+    done.set()
+    sampler.join()
+    peak_disk[0] = max(peak_disk[0], _dir_bytes(scenario_dir))
+
+    if code != 0 or not result_file.exists():
+        print(f"[Bench] {scenario} failed (exit {code}), see {log_file}")
+        return {"scenario": scenario, "error": f"exit {code}", "log": str(log_file)}
+
+    result = {"scenario": scenario, **json.loads(result_file.read_text())}
+    result["peak_disk_mb"] = round(peak_disk[0] / 1e6, 1)
+    result["requests"] = {service: count - requests_before.get(service, 0)
+                          for service, count in stubs.requests.items() if count != requests_before.get(service, 0)}
+
+    stages = result.get("stages")
+    if stages:
+        # processed counts every video a stage handled, failures included
+        finished = stages[-1]["processed"] - stages[-1]["failed"]
+        failed = sum(stage["failed"] for stage in stages)
+        wall = result["wall_seconds"]
+        result["videos"] = finished
+        result["failed"] = failed
+        print(f"[Bench] {scenario}: {finished} videos done, {failed} failed")
+        if finished == 0:
+            print(f"[Bench] {scenario}: no video made it through the pipeline, see {log_file}")
+        elif failed:
+            print(f"[Bench] {scenario}: some videos failed, see {log_file}")
+        result["videos_per_hour"] = round(finished / wall * 3600, 1) if wall else 0.0
+        result["audio_seconds_per_second"] = round(finished * args.seconds / wall, 2) if wall else 0.0
+        result["uploaded_mb"] = round((stubs.gcs.total_bytes() - gcs_before) / 1e6, 1)
+    return result
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """@return: One line per metric that got worse than baseline by more than tolerance"""
+    previous = {row["scenario"]: row for row in baseline.get("scenarios", [])}
+    regressions = []
+    for row in results:
+        before = previous.get(row["scenario"])
+        if not before or "error" in row:
+            continue
+
+        pairs = [(metric, row.get(metric), before.get(metric), higher_is_better)
+                 for metric, higher_is_better in COMPARED_METRICS.items()]
+        before_stages = {stage["stage"]: stage for stage in before.get("stages") or []}
+        for stage in row.get("stages") or []:
+            if stage["stage"] in before_stages:
+                pairs.append((f"{stage['stage']}.avg_seconds", stage["avg_seconds"],
+                              before_stages[stage["stage"]]["avg_seconds"], False))
+
+        for metric, now, then, higher_is_better in pairs:
+            if not now or not then:
+                continue
+            change = (now - then) / then
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{row['scenario']}.{metric}: {then} -> {now} ({change * 100:+.0f}%)")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                            help="Scenario to run, repeatable. Defaults to all of them")
+    arg_parser.add_argument("--videos", type=int, default=4, help="Videos per chamber")
+    arg_parser.add_argument("--seconds", type=int, default=60, help="Length of each synthetic recording")
+    arg_parser.add_argument("--transcribe", choices=("test", "whisper", "parallel", "batched"), default="test",
+                            help="video_processor.TRANSCRIBE_MODE for the run")
+    arg_parser.add_argument("--ingest", choices=("audio", "video", "stream"), default="audio",
+                            help="video_processor.INGEST_MODE for the run")
+    arg_parser.add_argument("--latency-ms", type=float, default=0, help="Added to every stub response")
+    arg_parser.add_argument("--work-dir", type=Path, help="Keep fixtures and runs here instead of a temp dir")
+    arg_parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    arg_parser.add_argument("--baseline", type=Path, help="Earlier --output to compare against")
+    arg_parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown, 0.25 = 25%%")
+    # Used when the benchmark starts itself for a scenario
+    arg_parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    arg_parser.add_argument("--server", help=argparse.SUPPRESS)
+    arg_parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        return run_child(args)
+
+    from benchmarks.stub_server import StubServices
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="bench-pipeline-"))
+    print(f"[Bench] Building fixtures in {work_dir} ...")
+    html, house_media, items, senate_hls = build_fixtures(work_dir / "media", args.videos, args.seconds)
+
+    stubs = StubServices(html, house_media, items, senate_hls, latency_ms=args.latency_ms)
+    stubs.start()
+    results = []
+    try:
+        for scenario in args.scenario or SCENARIOS:
+            print(f"[Bench] Running {scenario} ...")
+            results.append(run_scenario(scenario, stubs, work_dir, args))
+    finally:
+        stubs.stop()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {key: getattr(args, key) for key in ("videos", "seconds", "transcribe", "ingest", "latency_ms")},
+        "scenarios": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"[Regression] {line}")
+        if regressions:
+            sys.exit(1)
+        print("[Bench] No regressions against baseline")
+
+    if any("error" in row for row in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
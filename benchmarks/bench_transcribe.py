@@ -0,0 +1,95 @@
+# benchmarks/bench_transcribe.py
+"""
+Transcription throughput of the sequential path against batched inference.
+
+    python -m benchmarks.bench_transcribe session.wav
+    python -m benchmarks.bench_transcribe clips/*.wav --batch-size 16 --beam-size 1
+    python -m benchmarks.bench_transcribe clips/*.wav --modes batched --output batched.json
+
+The same files go through WhisperTranscriber (one video after the other, window by
+window) and BatchedWhisperTranscriber.transcribe_many (speech clips of all the files
+sharing batches). The number to look at is audio-seconds per wall-second: how fast a
+backlog drains, not how soon any one video finishes.
+
+Needs ffmpeg and the Whisper model available locally. Use recordings with real speech;
+synthetic tones have none, so the batched path would skip them entirely.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+MODES = ("sequential", "batched")
+
+
+def run_mode(mode: str, paths: list, args) -> dict:
+    from transcriber.audio import SAMPLE_RATE, decode_pcm
+    from transcriber.batched_transcriber import BatchedWhisperTranscriber
+    from transcriber.whisper_transcriber import WhisperTranscriber
+
+    audio_seconds = sum(len(decode_pcm(path)) / SAMPLE_RATE for path in paths)
+    if mode == "batched":
+        transcriber = BatchedWhisperTranscriber(args.model, args.compute_type, args.cpu_threads, args.language,
+                                                batch_size=args.batch_size, beam_size=args.beam_size)
+        started = time.perf_counter()
+        transcripts = transcriber.transcribe_many(paths)
+    else:
+        transcriber = WhisperTranscriber(args.model, args.compute_type, args.cpu_threads, args.language,
+                                         decode_options={"beam_size": args.beam_size})
+        started = time.perf_counter()
+        transcripts = {path: transcriber.transcribe_to_segments(path) for path in paths}
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "files": len(paths),
+        "audio_seconds": round(audio_seconds, 1),
+        "wall_seconds": round(elapsed, 2),
+        "audio_seconds_per_second": round(audio_seconds / elapsed, 2) if elapsed else 0.0,
+        "segments": sum(len(segments) for segments in transcripts.values()),
+        "words": sum(len(text.split()) for segments in transcripts.values() for _, _, text in segments),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("files", type=Path, nargs="+", help="Recordings to transcribe")
+    arg_parser.add_argument("--modes", choices=MODES, nargs="+", default=list(MODES))
+    arg_parser.add_argument("--model", default="base")
+    arg_parser.add_argument("--compute-type", default="float32")
+    arg_parser.add_argument("--cpu-threads", type=int, default=0)
+    arg_parser.add_argument("--language", default="en")
+    arg_parser.add_argument("--batch-size", type=int, default=8, help="Clips per batch (batched mode)")
+    arg_parser.add_argument("--beam-size", type=int, default=5, help="Beam width, used by both modes")
+    arg_parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = arg_parser.parse_args()
+
+    from transcriber.model_pool import get_model
+    from transcriber.whisper_config import load_config
+    # Load outside the timed runs, with the same key the transcribers will ask for
+    get_model(args.model, args.compute_type, args.cpu_threads, load_config()["num_workers"])
+
+    results = []
+    for mode in args.modes:
+        print(f"[Bench] Running {mode} ...")
+        results.append(run_mode(mode, args.files, args))
+
+    rates = {row["mode"]: row["audio_seconds_per_second"] for row in results}
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {key: getattr(args, key) for key in ("model", "compute_type", "cpu_threads", "batch_size",
+                                                       "beam_size")},
+        "results": results,
+    }
+    if rates.get("sequential") and "batched" in rates:
+        report["batched_speedup"] = round(rates["batched"] / rates["sequential"], 2)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/fixtures.py
+# Synthetic stand-ins for the pages and APIs we scrape, shaped like the real ones.
+
+import subprocess
+from datetime import date, timedelta
+from pathlib import Path
+
+COMMITTEES = [
+    "Agriculture", "Appropriations", "Education", "Energy", "Health Policy",
+    "Judiciary", "Natural Resources", "Oversight", "Tax Policy", "Transportation",
+]
+
+
+def house_archive_html(committees: int = 60, videos_per_committee: int = 40) -> bytes:
+    """A VideoArchive page with the same markup the House scraper reads."""
+    start = date(2025, 1, 1)
+    blocks = []
+    for c in range(committees):
+        name = f"{COMMITTEES[c % len(COMMITTEES)]} {c // len(COMMITTEES) or ''}".strip()
+        code = f"H{name.upper().replace(' ', '')[:6]}"
+        links = []
+        for v in range(videos_per_committee):
+            day = start + timedelta(days=v * 3)
+            links.append(
+                f'<div class="page-search-object col-md-4">'
+                f'<a href="/VideoArchivePlayer?video={code}-{day:%m%d%y}.mp4">{day:%A, %B %-d, %Y}</a>'
+                f'<span class="small">Committee meeting</span></div>'
+            )
+        blocks.append(
+            f'<li class="page-search-container">'
+            f'<div class="text-clickable"><strong>{name} | House Committee</strong></div>'
+            f'<div class="row">{"".join(links)}</div></li>'
+        )
+    return (
+        "<!DOCTYPE html><html><head><title>Video Archive</title></head><body>"
+        "<nav><ul><li><a href='/'>Home</a></li></ul></nav>"
+        f"<ul class='page-search-list'>{''.join(blocks)}</ul>"
+        "</body></html>"
+    ).encode()
+
+
+def house_filenames(content: bytes, count: int) -> list:
+    """The first count video filenames on a VideoArchive page, in the order the scraper yields them."""
+    from fetcher.house_scraper_static import parse_archive
+    return [video["url"].split("video=", 1)[1] for video in parse_archive(content)[:count]]
+
+
+def senate_api_items(count: int) -> list:
+    """/api/all items, newest first like the real API."""
+    start = date(2025, 1, 6)
+    items = []
+    for i in range(count):
+        day = start + timedelta(days=i)
+        items.append({
+            "_id": f"bench{i:020d}",
+            "metadata": {"filename": f"{COMMITTEES[i % len(COMMITTEES)]} {day:%y-%m-%d}"},
+            "date": f"{day.isoformat()}T18:00:00.000Z",
+        })
+    return items[::-1]
+
+
+def make_media(path: Path, seconds: int, tone_hz: int):
+    """A small test-pattern MP4 with a tone. Every video gets its own tone so the
+    content fingerprints differ and nothing is short-circuited as a duplicate."""
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size=320x240:rate=15:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency={tone_hz}:sample_rate=44100:duration={seconds}",
+        "-c:v", "mpeg4", "-q:v", "10", "-c:a", "aac", "-shortest",
+        "-movflags", "+faststart", str(path),
+    ], check=True)
+
+
+def make_hls(source: Path, out_dir: Path, segment_seconds: int = 6):
+    """Cut an MP4 into a VOD HLS rendition (out360p.m3u8 + .ts segments) plus a master playlist."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", str(source),
+        "-c", "copy", "-bsf:v", "dump_extra", "-f", "hls",
+        "-hls_time", str(segment_seconds), "-hls_playlist_type", "vod",
+        "-hls_segment_filename", str(out_dir / "out360p_%05d.ts"),
+        str(out_dir / "out360p.m3u8"),
+    ], check=True)
+    (out_dir / "out.m3u8").write_text(
+        "#EXTM3U\n"
+        '#EXT-X-STREAM-INF:BANDWIDTH=400000,RESOLUTION=320x240,CODECS="mp4v.20.9,mp4a.40.2"\n'
+        "out360p.m3u8\n"
+    )
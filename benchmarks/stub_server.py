@@ -0,0 +1,372 @@
+# benchmarks/stub_server.py
+"""
+Local stand-ins for every service the pipeline talks to, on one port:
+
+    /VideoArchive                         House archive page (ETag, 304 on If-None-Match)
+    /ArchiveVideoFiles/<name>.mp4         House recordings (HEAD, Range)
+    /default/api/all                      Senate API, paged JSON like the real one
+    /outputs/<id>/Default/HLS/...         Senate HLS master/media playlists and segments
+    /storage/v1, /upload/storage/v1,      Enough of the GCS JSON API for google-cloud-storage
+    /download/storage/v1                  (STORAGE_EMULATOR_HOST=<base url>)
+
+Everything is served from memory or local files, so runs are repeatable and offline.
+"""
+
+import base64
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs, unquote
+import google_crc32c
+
+CHUNK_BYTES = 1024 * 1024
+
+
+class FakeGCS:
+    """In-memory buckets. Objects are kept as bytes with the metadata GCS would report."""
+
+    def __init__(self):
+        self.objects = {}       # (bucket, name) -> dict with data and metadata
+        self.uploads = {}       # upload_id -> dict with bucket, name and received bytes
+        self._lock = threading.Lock()
+        self._generation = int(time.time() * 1e6)
+
+    def store(self, bucket: str, name: str, data: bytes, content_type: str = "application/octet-stream") -> dict:
+        with self._lock:
+            self._generation += 1
+            obj = {
+                "data": data,
+                "kind": "storage#object",
+                "id": f"{bucket}/{name}/{self._generation}",
+                "bucket": bucket,
+                "name": name,
+                "generation": str(self._generation),
+                "metageneration": "1",
+                "contentType": content_type,
+                "size": str(len(data)),
+                "crc32c": base64.b64encode(google_crc32c.Checksum(data).digest()).decode(),
+                "md5Hash": base64.b64encode(hashlib.md5(data).digest()).decode(),
+                "timeCreated": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            }
+            obj["updated"] = obj["timeCreated"]
+            self.objects[(bucket, name)] = obj
+            return obj
+
+    def generation_matches(self, bucket: str, name: str, expected) -> bool:
+        """ifGenerationMatch: None always matches, 0 means the object must not exist."""
+        if expected is None:
+            return True
+        obj = self.get(bucket, name)
+        return int(expected) == (int(obj["generation"]) if obj else 0)
+
+    def get(self, bucket: str, name: str) -> dict:
+        with self._lock:
+            return self.objects.get((bucket, name))
+
+    def delete(self, bucket: str, name: str) -> bool:
+        with self._lock:
+            return self.objects.pop((bucket, name), None) is not None
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(len(obj["data"]) for obj in self.objects.values())
+
+    @staticmethod
+    def resource(obj: dict) -> dict:
+        return {key: value for key, value in obj.items() if key != "data"}
+
+
+class StubServices:
+    """
+    @param house_html: VideoArchive page
+    @param house_media: filename -> local MP4
+    @param senate_items: /api/all items, newest first
+    @param senate_hls: video _id -> directory with out.m3u8, the media playlist and segments
+    @param latency_ms: Added to every response, to stand in for a network round trip
+    """
+
+    def __init__(self, house_html: bytes, house_media: dict, senate_items: list, senate_hls: dict,
+                 latency_ms: float = 0):
+        self.house_html = house_html
+        self.house_etag = f'"{hashlib.sha256(house_html).hexdigest()[:16]}"'
+        self.house_media = house_media
+        self.senate_items = senate_items
+        self.senate_hls = senate_hls
+        self.latency = latency_ms / 1000
+        self.gcs = FakeGCS()
+        self.requests = Counter()   # Requests per service, to catch extra round trips
+        self._counter_lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, port: int = 0) -> str:
+        """Serve in a background thread. @return: Base URL"""
+        services = self
+
+        class Handler(_Handler):
+            stubs = services
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, service: str):
+        with self._counter_lock:
+            self.requests[service] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # Keep-alive, like the real services; the pools depend on it
+    stubs: StubServices = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # ----- plumbing -----
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        self.query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        self.parts = parsed.path.split("/")
+        if self.stubs.latency:
+            time.sleep(self.stubs.latency)
+
+        path = parsed.path
+        if path == "/VideoArchive":
+            self.stubs.count("house_archive")
+            return self._house_archive()
+        if path.startswith("/ArchiveVideoFiles/"):
+            self.stubs.count("house_media")
+            return self._serve_file(self.stubs.house_media.get(unquote(path.rsplit("/", 1)[1])))
+        if path == "/default/api/all":
+            self.stubs.count("senate_api")
+            return self._senate_api()
+        if path.startswith("/outputs/"):
+            self.stubs.count("senate_hls")
+            return self._senate_hls()
+        if path.startswith(("/storage/v1/", "/upload/storage/v1/", "/download/storage/v1/")):
+            self.stubs.count("gcs")
+            return self._gcs()
+        self._send(404, b"not found")
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = _route
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/plain", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status: int, value, headers: dict = None):
+        self._send(status, json.dumps(value).encode(), "application/json", headers)
+
+    def _serve_file(self, path: Path, content_type: str = "video/mp4"):
+        if path is None or not path.is_file():
+            return self._send(404, b"not found")
+        stat = path.stat()
+        size = stat.st_size
+        headers = {"Accept-Ranges": "bytes", "ETag": f'"{size:x}-{int(stat.st_mtime):x}"'}
+
+        start, end, status = 0, size - 1, 200
+        spec = self.headers.get("Range", "")
+        if spec.startswith("bytes="):
+            first, _, last = spec[6:].split(",")[0].partition("-")
+            start = int(first) if first else max(0, size - int(last))
+            end = min(int(last), size - 1) if first and last else size - 1
+            if start > end:
+                return self._send(416, headers={"Content-Range": f"bytes */{size}"})
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    # ----- House / Senate -----
+
+    def _house_archive(self):
+        if self.headers.get("If-None-Match") == self.stubs.house_etag:
+            return self._send(304, headers={"ETag": self.stubs.house_etag})
+        self._send(200, self.stubs.house_html, "text/html; charset=utf-8", {"ETag": self.stubs.house_etag})
+
+    def _senate_api(self):
+        payload = json.loads(self._body() or b"{}")
+        page, results = int(payload.get("page", 1)), int(payload.get("results", 30))
+        items = self.stubs.senate_items[(page - 1) * results:page * results]
+        self._json(200, {"allFiles": items})
+
+    def _senate_hls(self):
+        # /outputs/<id>/Default/HLS/<file>
+        if len(self.parts) != 6:
+            return self._send(404, b"not found")
+        directory = self.stubs.senate_hls.get(self.parts[2])
+        if directory is None:
+            return self._send(404, b"not found")
+        name = self.parts[5]
+        content_type = "application/vnd.apple.mpegurl" if name.endswith(".m3u8") else "video/mp2t"
+        self._serve_file(directory / name, content_type)
+
+    # ----- GCS JSON API -----
+
+    def _gcs(self):
+        gcs = self.stubs.gcs
+        parts = self.parts
+        offset = 1 if parts[1] in ("upload", "download") else 0
+        # ['', (upload|download,) 'storage', 'v1', 'b', bucket, 'o', name, ...]
+        bucket = unquote(parts[4 + offset]) if len(parts) > 4 + offset else None
+        name = unquote(parts[6 + offset]) if len(parts) > 6 + offset else None
+
+        if parts[1] == "upload":
+            return self._gcs_upload(bucket)
+
+        if parts[1] == "download" or self.query.get("alt") == "media":
+            obj = gcs.get(bucket, name)
+            if obj is None:
+                return self._json(404, {"error": {"code": 404, "message": "No such object"}})
+            return self._send(200, obj["data"], obj["contentType"], {
+                "X-Goog-Hash": f"crc32c={obj['crc32c']},md5={obj['md5Hash']}",
+                "X-Goog-Generation": obj["generation"],
+            })
+
+        if self.command == "POST" and len(parts) > 7 and parts[7] == "compose":
+            request = json.loads(self._body())
+            sources = [gcs.get(bucket, source["name"]) for source in request.get("sourceObjects", [])]
+            if any(source is None for source in sources):
+                return self._json(404, {"error": {"code": 404, "message": "Source object not found"}})
+            obj = gcs.store(bucket, name, b"".join(source["data"] for source in sources))
+            return self._json(200, gcs.resource(obj))
+
+        if self.command == "POST" and len(parts) > 11 and parts[7] in ("copyTo", "rewriteTo"):
+            self._body()
+            source = gcs.get(bucket, name)
+            if source is None:
+                return self._json(404, {"error": {"code": 404, "message": "No such object"}})
+            obj = gcs.store(unquote(parts[9]), unquote(parts[11]), source["data"], source["contentType"])
+            if parts[7] == "rewriteTo":
+                return self._json(200, {"kind": "storage#rewriteResponse", "done": True,
+                                        "totalBytesRewritten": obj["size"], "objectSize": obj["size"],
+                                        "resource": gcs.resource(obj)})
+            return self._json(200, gcs.resource(obj))
+
+        if self.command == "DELETE":
+            if not gcs.generation_matches(bucket, name, self.query.get("ifGenerationMatch")):
+                return self._precondition_failed()
+            if gcs.delete(bucket, name):
+                return self._send(204)
+            return self._json(404, {"error": {"code": 404, "message": "No such object"}})
+
+        if self.command == "GET" and name is not None:
+            obj = gcs.get(bucket, name)
+            if obj is None:
+                return self._json(404, {"error": {"code": 404, "message": "No such object"}})
+            return self._json(200, gcs.resource(obj))
+
+        if self.command == "GET" and bucket is not None:
+            return self._json(200, {"kind": "storage#bucket", "name": bucket, "id": bucket})
+
+        self._json(400, {"error": {"code": 400, "message": f"fake GCS does not handle {self.command} {self.path}"}})
+
+    def _precondition_failed(self):
+        self._json(412, {"error": {"code": 412, "message": "Precondition Failed"}})
+
+    def _gcs_upload(self, bucket: str):
+        gcs = self.stubs.gcs
+        upload_type = self.query.get("uploadType")
+        expected_generation = self.query.get("ifGenerationMatch")
+
+        if upload_type == "multipart" and self.command == "POST":
+            metadata, data = _split_multipart(self.headers.get("Content-Type", ""), self._body())
+            name = metadata.get("name") or self.query.get("name")
+            if not gcs.generation_matches(bucket, name, expected_generation):
+                return self._precondition_failed()
+            obj = gcs.store(bucket, name, data, metadata.get("contentType", "application/octet-stream"))
+            return self._json(200, gcs.resource(obj))
+
+        if upload_type == "media" and self.command == "POST":
+            obj = gcs.store(bucket, self.query.get("name"), self._body())
+            return self._json(200, gcs.resource(obj))
+
+        if upload_type == "resumable" and self.command == "POST":
+            body = self._body()
+            metadata = json.loads(body) if body else {}
+            upload_id = uuid.uuid4().hex
+            gcs.uploads[upload_id] = {
+                "bucket": bucket,
+                "name": metadata.get("name") or self.query.get("name"),
+                "content_type": metadata.get("contentType", "application/octet-stream"),
+                "data": bytearray(),
+            }
+            location = f"{self.stubs.url}/upload/storage/v1/b/{bucket}/o?uploadType=resumable&upload_id={upload_id}"
+            return self._send(200, headers={"Location": location})
+
+        if upload_type == "resumable" and self.command == "PUT":
+            upload = gcs.uploads.get(self.query.get("upload_id"))
+            if upload is None:
+                return self._json(404, {"error": {"code": 404, "message": "No such upload"}})
+            chunk = self._body()
+            # Content-Range: bytes <first>-<last>/<total|*>  or  bytes */<total>
+            spec = self.headers.get("Content-Range", "bytes */*")[6:]
+            span, _, total = spec.partition("/")
+            if span != "*":
+                first = int(span.split("-")[0])
+                del upload["data"][first:]
+                upload["data"] += chunk
+            if total != "*" and len(upload["data"]) >= int(total):
+                gcs.uploads.pop(self.query["upload_id"], None)
+                obj = gcs.store(upload["bucket"], upload["name"], bytes(upload["data"]), upload["content_type"])
+                return self._json(200, gcs.resource(obj))
+            headers = {"Range": f"bytes=0-{len(upload['data']) - 1}"} if upload["data"] else {}
+            return self._send(308, headers=headers)
+
+        self._json(400, {"error": {"code": 400, "message": f"fake GCS does not handle uploadType={upload_type}"}})
+
+
+def _split_multipart(content_type: str, body: bytes):
+    """multipart/related upload: JSON metadata part, then the object data.
+    @return: (metadata dict, data bytes)
+    """
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    parts = []
+    for part in body.split(b"--" + boundary)[1:]:
+        if part.startswith(b"--"):
+            break
+        _, _, content = part.partition(b"\r\n\r\n")
+        parts.append(content[:-2] if content.endswith(b"\r\n") else content)
+    return json.loads(parts[0]), parts[1]
@@ -4,6 +4,7 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 import requests
 from bs4 import BeautifulSoup
+from .http_client import get_client
 
 # bs because it is straightforward scraping. we are not doing anything too complex
 
@@ -15,7 +16,7 @@ class BaseScraper(ABC):
     def fetch_page(self, url: str = None) -> BeautifulSoup:
         url = url or self.base_url
         try:
-            response = requests.get(url)
+            response = get_client().get(url)
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
             print(f"Failed to fetch {url}: {e}")
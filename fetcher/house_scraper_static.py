@@ -1,39 +1,113 @@
 # fetcher/house_scraper_static.py
 
+from io import BytesIO
 from bs4 import BeautifulSoup
 import requests
 from .base_scraper import BaseScraper
+from .http_cache import conditional_get, load_derived, save_derived
+from pipeline import metrics
 
-class HouseScraperStatic(BaseScraper):
-    def __init__(self):
-        super().__init__("https://www.house.mi.gov/VideoArchive")
+# lxml is much faster than html.parser on the (large) archive page and lets us
+# parse it incrementally. Falls back to BeautifulSoup if it isn't installed.
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
-    def scrape(self) -> list:
-        soup = self.fetch_page()
-        results = []
+HOUSE_URL = "https://www.house.mi.gov"
+
+# XPath equivalents of the CSS selectors used with BeautifulSoup below
+_HEADER_XPATH = ".//div[contains(concat(' ', normalize-space(@class), ' '), ' text-clickable ')]//strong"
+_LINKS_XPATH = ".//div[contains(concat(' ', normalize-space(@class), ' '), ' page-search-object ')]//a"
+
+
+def _video_entry(committee: str, href: str, date_text: str):
+    if not href.endswith(".mp4"):
+        return None
+    return {
+        "committee": committee,
+        "date": date_text,
+        "url": f"{HOUSE_URL}{href}"
+    }
+
+
+def parse_archive_bs4(content) -> list:
+    """Parse the VideoArchive page with BeautifulSoup's html.parser (the original way)."""
+    soup = BeautifulSoup(content, "html.parser")
+    results = []
+
+    sections = soup.select("li.page-search-container")
+
+    for section in sections:
+        header = section.select_one("div.text-clickable strong")
+        committee = header.get_text(strip=True).split("|")[0].strip() if header else "Unknown Committee"
+
+        video_links = section.select("div.page-search-object a")
+
+        for link in video_links:
+            entry = _video_entry(committee, link.get("href", ""), link.get_text(strip=True))
+            if entry:
+                results.append(entry)
 
-        sections = soup.select("li.page-search-container")
+    return results
 
-        for section in sections:
-            header = section.select_one("div.text-clickable strong")
-            committee = header.get_text(strip=True).split("|")[0].strip() if header else "Unknown Committee"
 
-            video_links = section.select("div.page-search-object a")
+def parse_archive_lxml(content: bytes) -> list:
+    """Parse the VideoArchive page with lxml, one li.page-search-container at a time.
+    Each block is dropped once it has been read, so memory stays flat however long the page is.
+    """
+    results = []
 
-            for link in video_links:
-                href = link.get("href", "")
-                if not href.endswith(".mp4"):
-                    continue
+    for _, section in etree.iterparse(BytesIO(content), events=("end",), tag="li", html=True):
+        if "page-search-container" not in (section.get("class") or "").split():
+            continue
 
-                full_url = f"https://www.house.mi.gov{href}"
-                date_text = link.get_text(strip=True)
+        headers = section.xpath(_HEADER_XPATH)
+        # Same as get_text(strip=True): every text node stripped and joined
+        header_text = "".join(t.strip() for t in headers[0].itertext()) if headers else ""
+        committee = header_text.split("|")[0].strip() if headers else "Unknown Committee"
+
+        for link in section.xpath(_LINKS_XPATH):
+            date_text = "".join(t.strip() for t in link.itertext())
+            entry = _video_entry(committee, link.get("href", ""), date_text)
+            if entry:
+                results.append(entry)
+
+        # Free the block and everything before it
+        section.clear()
+        parent = section.getparent()
+        while parent is not None and section.getprevious() is not None:
+            del parent[0]
+
+    return results
+
+
+def parse_archive(content: bytes) -> list:
+    """Fastest parser available."""
+    return parse_archive_lxml(content) if etree is not None else parse_archive_bs4(content)
+
+
+class HouseScraperStatic(BaseScraper):
+    def __init__(self):
+        super().__init__(f"{HOUSE_URL}/VideoArchive")
+
+    def scrape(self) -> list:
+        """Conditional GET of the archive page. If it hasn't changed since the last
+        run (304) we reuse last run's results and skip parsing altogether."""
+        with metrics.timer("scrape_page_seconds", source="house"):
+            content, modified = conditional_get(self.base_url)
 
-                results.append({
-                    "committee": committee,
-                    "date": date_text,
-                    "url": full_url
-                })
+        if not modified:
+            cached = load_derived(self.base_url, "videos")
+            if cached is not None:
+                print("House archive unchanged since last run.")
+                metrics.inc("scrape_unchanged_total", source="house")
+                return cached
 
+        with metrics.timer("scrape_parse_seconds", source="house"):
+            results = parse_archive(content)
+        metrics.inc("scrape_items_total", len(results), source="house")
+        save_derived(self.base_url, "videos", results)
         return results
 
 
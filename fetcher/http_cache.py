@@ -0,0 +1,77 @@
+# fetcher/http_cache.py
+
+import hashlib
+import json
+from pathlib import Path
+from .http_client import get_client
+
+CACHE_DIR = Path(".cache/http")
+
+
+def _paths(url: str):
+    key = hashlib.sha256(url.encode()).hexdigest()[:32]
+    return CACHE_DIR / f"{key}.json", CACHE_DIR / f"{key}.body"
+
+
+def _load_meta(url: str) -> dict:
+    meta_path, body_path = _paths(url)
+    if not meta_path.exists() or not body_path.exists():
+        return {}
+    try:
+        return json.loads(meta_path.read_text())
+    except json.JSONDecodeError:
+        return {}
+
+
+def conditional_get(url: str):
+    """GET with If-None-Match / If-Modified-Since from the last response we kept.
+    @param url: Page to fetch
+    @return: (body bytes, modified). modified is False on a 304, body then comes from disk.
+    """
+    meta = _load_meta(url)
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = get_client().get(url, headers=headers)
+    meta_path, body_path = _paths(url)
+
+    if response.status_code == 304 and meta:
+        return body_path.read_bytes(), False
+
+    response.raise_for_status()
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    body_path.write_bytes(response.content)
+    meta_path.write_text(json.dumps({
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }))
+    return response.content, True
+
+
+def load_derived(url: str, name: str):
+    """Something computed from the cached body (e.g. parsed results), if it is still current.
+    @param name: Which derived value
+    @return: The saved value, or None if missing or from an older version of the page
+    """
+    meta = _load_meta(url)
+    path = _paths(url)[0].with_suffix(f".{name}.json")
+    if not meta or not path.exists():
+        return None
+    try:
+        saved = json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return None
+    if saved.get("validator") != [meta.get("etag"), meta.get("last_modified")]:
+        return None
+    return saved["value"]
+
+
+def save_derived(url: str, name: str, value):
+    """Keep a value computed from the current cached body, e.g. so a 304 can skip parsing."""
+    meta = _load_meta(url)
+    path = _paths(url)[0].with_suffix(f".{name}.json")
+    path.write_text(json.dumps({"validator": [meta.get("etag"), meta.get("last_modified")], "value": value}))
@@ -0,0 +1,120 @@
+# fetcher/http_client.py
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from pipeline import metrics
+
+# ===== CONFIGURATION =====
+TIMEOUT = (5, 30)           # (connect, read) seconds, applied to every call that doesn't pass its own
+MAX_RETRIES = 3             # Extra attempts after the first one
+BACKOFF_SECONDS = 0.5       # Base for exponential backoff, full jitter on top
+PER_HOST_LIMIT = 4          # Max requests in flight to one host
+POOL_SIZE = 16              # Keep-alive connections kept per host
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# =========================
+
+
+class HttpClient:
+    """
+    One requests.Session shared by every scraper and probe, so connections are
+    kept alive instead of paying TCP+TLS on each call. Adds default timeouts,
+    retry with jittered backoff, and a cap on concurrent requests per host.
+    Thread-safe: the session's connection pool is, and the per-host limits are semaphores.
+    """
+
+    def __init__(self, timeout=TIMEOUT, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS,
+                 per_host_limit=PER_HOST_LIMIT, pool_size=POOL_SIZE):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.per_host_limit = per_host_limit
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slots(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying connection errors, timeouts and 429/5xx.
+        @param method: GET, POST, HEAD, ...
+        @param url: Full URL
+        @param kwargs: Passed to requests (json, headers, stream, ...). timeout defaults to TIMEOUT.
+        @return: The last response. Callers still decide what a 4xx means for them.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        attempt = 0
+
+        while True:
+            started = time.perf_counter()
+            try:
+                with self._slots(host):
+                    response = self.session.request(method, url, **kwargs)
+                metrics.observe("http_request_seconds", time.perf_counter() - started, host=host, method=method)
+                metrics.inc("http_requests_total", host=host, method=method, status=response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.inc("http_requests_total", host=host, method=method, status=type(e).__name__)
+                if attempt >= self.max_retries:
+                    raise
+            metrics.inc("http_retries_total", host=host)
+
+            # Full jitter: spread retries out so both chambers don't hammer a struggling host together
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def map(self, func, items, workers: int = None) -> list:
+        """Run func over items concurrently (e.g. fetching several API pages).
+        The per-host limit still applies inside func's requests.
+        @return: Results in the same order as items. Exceptions are returned, not raised.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        def call(item):
+            try:
+                return func(item)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers or self.per_host_limit) as pool:
+            return list(pool.map(call, items))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Process-wide client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -1,18 +1,33 @@
 # fetcher/senate_scraper.py
 
 from .base_scraper import BaseScraper
-import requests
+from .http_client import get_client
+import json
+import time
 from datetime import datetime
 import re
+from storage.state_tracker import get_meta, set_meta
+from pipeline import metrics
+
+SENATE_API_URL = "https://tf4pr3wftk.execute-api.us-west-2.amazonaws.com/default/api/all"
+# Where the newest item of the last incremental run is kept (state.db meta table)
+CURSOR_KEY = "senate_cursor"
+BACKFILL_THROTTLE_SECONDS = 2
+PAGE_CONCURRENCY = 4 # API pages fetched at once when we know up front which pages we want
+# Why scrape() stopped. Only after "known" or "end" did it see everything newer than the old
+# cursor; after "max_pages" or "error" there may be unseen videos older than its newest item.
+CURSOR_SAFE_STOPS = ("known", "end")
 
 class SenateScraper(BaseScraper):
     def __init__(self):
-        super().__init__("https://tf4pr3wftk.execute-api.us-west-2.amazonaws.com/default/api/all")
+        super().__init__(SENATE_API_URL)
         self.api_payload = {
             "_id": "61b3adc8124d7d000891ca5c",
             "page": 1,
             "results": 30
         }
+        self.pending_cursor = None
+        self.stop_reason = None
 
     def fetch_data(self, page=1, results=30):
         payload = {
@@ -25,7 +40,7 @@ class SenateScraper(BaseScraper):
             "Accept": "application/json"
         }
 
-        response = requests.post(self.base_url, json=payload, headers=headers)
+        response = get_client().post(self.base_url, json=payload, headers=headers)
         response.raise_for_status()
         return response.json().get("allFiles", [])
 
@@ -42,58 +57,191 @@ class SenateScraper(BaseScraper):
                 pass
         return "Unknown"
     
-    def scrape(self, max_pages, batch_size=30 ):
+    def fetch_page_items(self, page: int, batch_size: int = 30) -> list:
+        """One page of /api/all, raw items."""
+        payload = {
+            "_id": "61b3adc8124d7d000891ca5c",
+            "page": page,
+            "results": batch_size
+        }
+        with metrics.timer("scrape_page_seconds", source="senate"):
+            response = get_client().post(self.base_url, json=payload, headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json"
+            })
+            response.raise_for_status()
+            items = response.json().get("allFiles", [])
+        metrics.inc("scrape_items_total", len(items), source="senate")
+        return items
+
+    def fetch_pages(self, pages, batch_size: int = 30) -> list:
+        """Fetch several pages concurrently over the shared connection pool.
+        @return: Raw items (or the exception) per page, in the same order as pages
+        """
+        return get_client().map(lambda page: self.fetch_page_items(page, batch_size), pages,
+                                workers=PAGE_CONCURRENCY)
+
+    def parse_item(self, item: dict) -> dict:
+        video_id = item.get("_id")
+        metadata = item.get("metadata", {})
+        filename = metadata.get("filename", "Untitled")
+        upload_date_raw = item.get("date", "")
+
+        recording_date = self.parse_recording_date(filename)
+        try:
+            upload_date = datetime.fromisoformat(upload_date_raw.rstrip("Z")).strftime("%Y-%m-%d")
+        except Exception:
+            upload_date = upload_date_raw
+
+        return {
+            "video_id": video_id,
+            "title": filename,
+            "recording_date": recording_date,
+            "upload_date": upload_date,
+            "uploaded_at": upload_date_raw  # Raw ISO timestamp, used for the incremental cursor
+        }
+
+    def load_cursor(self) -> dict:
+        """Newest item (_id and date) seen by the last completed incremental run."""
+        value = get_meta(CURSOR_KEY)
+        return json.loads(value) if value else None
+
+    def commit_cursor(self):
+        """Save the newest item of the last scrape() as the cursor.
+        Call this only once everything scrape() returned has been handed to the pipeline,
+        otherwise videos cut off by a run limit would look already known next time.
+        Does nothing unless the scrape stopped at a known or empty page (see stop_reason).
+        """
+        if self.pending_cursor and self.stop_reason in CURSOR_SAFE_STOPS:
+            set_meta(CURSOR_KEY, json.dumps(self.pending_cursor))
+
+    @staticmethod
+    def newest_item(videos: list, newest: dict = None) -> dict:
+        """Cursor entry (_id and date) for the newest of videos, or newest if that is newer still."""
+        for video in videos:
+            if video["uploaded_at"] and (newest is None or video["uploaded_at"] > newest["date"]):
+                newest = {"_id": video["video_id"], "date": video["uploaded_at"]}
+        return newest
+
+    @staticmethod
+    def is_known(video: dict, cursor: dict) -> bool:
+        """Seen by an earlier run: the cursor item itself or anything uploaded before it."""
+        if not cursor or not video["uploaded_at"]:
+            return False
+        return video["video_id"] == cursor["_id"] or video["uploaded_at"] <= cursor["date"]
+
+    def scrape(self, max_pages, batch_size=30, incremental=False):
+        """Walk /api/all newest first.
+        @param max_pages: Stop after this many pages
+        @param batch_size: Items per page
+        @param incremental: Stop at the first page where every item was seen by an earlier run.
+                            Steady state costs one or two API calls. Items on the pages we did
+                            read are all returned; the processed check drops the old ones.
+        @return: List of dicts with video_id, title, recording_date, upload_date.
+                 Why it stopped is left in self.stop_reason: "known" (reached the cursor),
+                 "end" (empty page), "max_pages" or "error".
+        """
         all_results = []
         page = 1
+        cursor = self.load_cursor() if incremental else None
+        self.pending_cursor = None
+        self.stop_reason = None
+        newest = None
+
+        # A full scrape knows which pages it wants, so fetch them all at once.
+        # Incremental runs usually stop after the first page, so they go one at a time.
+        prefetched = {} if incremental else dict(zip(
+            range(1, max_pages + 1), self.fetch_pages(range(1, max_pages + 1), batch_size)
+        ))
 
         while True:
             print(f"Fetching page {page}...")
 
-            payload = {
-                "_id": "61b3adc8124d7d000891ca5c",
-                "page": page,
-                "results": batch_size
-            }
-
             try:
-                response = requests.post(self.base_url, json=payload, headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                })
-                response.raise_for_status()
-                data = response.json().get("allFiles", [])
+                data = prefetched[page] if page in prefetched else self.fetch_page_items(page, batch_size)
+                if isinstance(data, Exception):
+                    raise data
             except Exception as e:
                 print(f"Failed on page {page}: {e}")
+                self.stop_reason = "error"
                 break
 
             if not data:
                 print("All pages fetched.")
+                self.stop_reason = "end"
+                break
+
+            page_results = [self.parse_item(item) for item in data]
+            all_results.extend(page_results)
+
+            newest = self.newest_item(page_results, newest)
+
+            if cursor and all(self.is_known(video, cursor) for video in page_results):
+                print(f"Page {page} already known. Stopping.")
+                self.stop_reason = "known"
                 break
 
-            for item in data:
-                video_id = item.get("_id")
-                metadata = item.get("metadata", {})
-                filename = metadata.get("filename", "Untitled")
-                upload_date_raw = item.get("date", "")
-
-                recording_date = self.parse_recording_date(filename)
-                try:
-                    upload_date = datetime.fromisoformat(upload_date_raw.rstrip("Z")).strftime("%Y-%m-%d")
-                except Exception:
-                    upload_date = upload_date_raw
-
-                all_results.append({
-                    "video_id": video_id,
-                    "title": filename,
-                    "recording_date": recording_date,
-                    "upload_date": upload_date
-                })
             if page >= max_pages:
                 print("Reached max page limit for test.")
+                self.stop_reason = "max_pages"
                 break
             page += 1
 
+        # Anything past where we stopped is older than newest, so only a walk that saw it all may move the cursor
+        if self.stop_reason in CURSOR_SAFE_STOPS:
+            self.pending_cursor = newest
+        else:
+            print(f"Stopped early ({self.stop_reason}); keeping the old cursor.")
+
+        return all_results
+
+    def backfill(self, batch_size=30, start_page=1, max_pages=None, throttle_seconds=BACKFILL_THROTTLE_SECONDS):
+        """Full walk of the archive, for catching up on anything incremental runs missed.
+        Pages are fetched PAGE_CONCURRENCY at a time with a pause between batches,
+        so it doesn't hammer the API. Meant to run as its own job, not every tick.
+        @param batch_size: Items per page
+        @param start_page: Resume a backfill from this page
+        @param max_pages: Stop after this many pages, None for all of them
+        @param throttle_seconds: Pause between batches of pages
+        @return: List of dicts like scrape(). A walk from page 1 to the end ("end" in
+                 self.stop_reason) has seen everything, so it leaves its newest item in
+                 self.pending_cursor for commit_cursor; this is how a first run gets a cursor.
+        """
+        all_results = []
+        page = start_page
+        self.pending_cursor = None
+        self.stop_reason = None
+        last_page = start_page + max_pages - 1 if max_pages else None
+
+        while last_page is None or page <= last_page:
+            window_end = page + PAGE_CONCURRENCY - 1
+            if last_page is not None:
+                window_end = min(window_end, last_page)
+            pages = list(range(page, window_end + 1))
+            print(f"[Backfill] Fetching pages {pages[0]}-{pages[-1]}...")
+
+            for number, data in zip(pages, self.fetch_pages(pages, batch_size)):
+                if isinstance(data, Exception):
+                    print(f"[Backfill] Failed on page {number}: {data}")
+                    self.stop_reason = "error"
+                    break
+                if not data:
+                    print("[Backfill] All pages fetched.")
+                    self.stop_reason = "end"
+                    break
+                all_results.extend(self.parse_item(item) for item in data)
+
+            if self.stop_reason:
+                break
+            page = window_end + 1
+            if last_page is not None and page > last_page:
+                self.stop_reason = "max_pages"
+                break
+            time.sleep(throttle_seconds)
 
+        # Pages before start_page weren't read, so only a walk from the top may set the cursor
+        if self.stop_reason == "end" and start_page == 1:
+            self.pending_cursor = self.newest_item(all_results)
         return all_results
 """
     def scrape(self) -> list:
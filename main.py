@@ -1,27 +1,61 @@
 from pathlib import Path
+import sys
 import threading
 from urllib.parse import urlparse, parse_qs
 
 from fetcher.house_scraper_static import HouseScraperStatic
-from fetcher.senate_scraper import SenateScraper
+from fetcher.senate_scraper import SenateScraper, CURSOR_SAFE_STOPS
 from storage.file_manager import (
     download_house_video_ffmpeg,
     download_senate_video_ffmpeg,
     upload_file_to_gcs
 )
-from storage.video_processor import process_video
+from storage import video_processor
+from storage.video_processor import process_video, make_job, release_job, STAGES, BATCH_STAGES
 from transcriber.whisper_transcriber import WhisperTranscriber
+from pipeline.engine import Pipeline, Stage
+from pipeline.metrics import start_exporters
+from pipeline.job_queue import WorkerPool
+from storage.state_tracker import is_processed
+from transcriber.whisper_config import load_config
 
 BUCKET_NAME = "legislature-videos-shaleen"
+HOUSE_VIDEO_URL = "https://www.house.mi.gov/ArchiveVideoFiles"
 SENATE_BATCH_SIZE = 30 # Tried larger, but received errors
 SENATE_MAX_PAGES = 2 # Limit for testing/ Demo
+SENATE_INCREMENTAL = True # Stop paginating at the first page the last run already saw
+
+# Threads per pipeline stage, shared by both chambers.
+# None for transcribe uses num_workers from whisper_config.json (python -m transcriber.autotune)
+PIPELINE_WORKERS = {"download": 2, "transcribe": None, "upload": 2}
+PIPELINE_QUEUE_SIZE = 2 # Videos allowed to wait in front of each stage
 
 def get_filename_from_url(url):
     query = parse_qs(urlparse(url).query)
     return query.get("video", ["video.mp4"])[0]
 
 
-def run_house(limit=None):
+def build_pipeline(on_finish=None):
+    """download -> transcribe -> upload, each stage with its own workers.
+    In "batched" transcribe mode the transcribe stage takes several waiting videos per call.
+    @param on_finish: See Pipeline, used by the worker pool to settle queue jobs
+    """
+    def finished(job, error):
+        release_job(job)  # Its leftovers on disk become evictable
+        if on_finish is not None:
+            on_finish(job, error)
+
+    stages = []
+    for name, func in STAGES:
+        batch_size = 1
+        if video_processor.TRANSCRIBE_MODE == "batched" and name in BATCH_STAGES:
+            func, batch_size = BATCH_STAGES[name]
+        workers = PIPELINE_WORKERS.get(name, 1) or load_config()["num_workers"]
+        stages.append(Stage(name, func, workers=workers, queue_size=PIPELINE_QUEUE_SIZE, batch_size=batch_size))
+    return Pipeline(stages, on_finish=finished)
+
+
+def run_house(limit=None, pipeline=None):
     print("Scraping House videos...")
     house_scraper = HouseScraperStatic()
     house_videos = house_scraper.scrape()
@@ -32,27 +66,28 @@ def run_house(limit=None):
         filename = get_filename_from_url(video["url"])
         committee = video["committee"]
         recording_date = video["date"]
-        real_url = f"https://www.house.mi.gov/ArchiveVideoFiles/{filename}"
+        real_url = f"{HOUSE_VIDEO_URL}/{filename}"
         processed_count += 1
-        process_video(
-            chamber="house",
-            committee=committee,
-            recording_date=recording_date,
-            filename=filename,
-            download_args={"real_url": real_url}
-        )
+        if pipeline:
+            pipeline.submit(make_job("house", committee, recording_date, filename, {"real_url": real_url}))
+        else:
+            process_video(
+                chamber="house",
+                committee=committee,
+                recording_date=recording_date,
+                filename=filename,
+                download_args={"real_url": real_url}
+            )
 
         if limit and processed_count >= limit:
             break
 
 
 
-def run_senate(limit=None):
-    print("Scraping Senate videos...")
-    scraper = SenateScraper()
-    videos = scraper.scrape(batch_size=SENATE_BATCH_SIZE, max_pages=SENATE_MAX_PAGES)
-    print(f"Found {len(videos)} Senate videos.\n")
-
+def submit_senate_videos(videos, limit=None, pipeline=None) -> bool:
+    """Hand scraped Senate videos to the pipeline (or process them inline).
+    @return: True if every video was handed over, False if limit cut the list short
+    """
     processed_count = 0
     for video in videos:  
         filename = video["title"]
@@ -62,22 +97,112 @@ def run_senate(limit=None):
         recording_date = video["recording_date"]
 
         processed_count += 1
-        process_video(
-            chamber="senate",
-            committee=committee,
-            recording_date=recording_date,
-            filename=filename,
-            download_args={"video_id": video["video_id"]}
-        )
+        if pipeline:
+            pipeline.submit(make_job("senate", committee, recording_date, filename, {"video_id": video["video_id"]}))
+        else:
+            process_video(
+                chamber="senate",
+                committee=committee,
+                recording_date=recording_date,
+                filename=filename,
+                download_args={"video_id": video["video_id"]}
+            )
 
         if limit and processed_count >= limit:
             break
 
-if __name__ == "__main__":
-    """ In case i dont want to run the scheduler, I can run this script directly."""
-    house_thread = threading.Thread(target=run_house, args=(2,))
-    senate_thread = threading.Thread(target=run_senate, args=(2,))
+    return processed_count == len(videos)
+
+
+def run_senate(limit=None, pipeline=None):
+    print("Scraping Senate videos...")
+    scraper = SenateScraper()
+    videos = scraper.scrape(batch_size=SENATE_BATCH_SIZE, max_pages=SENATE_MAX_PAGES, incremental=SENATE_INCREMENTAL)
+    print(f"Found {len(videos)} Senate videos.\n")
+
+    # Only move the cursor forward if the walk saw everything new (it stopped at a known or
+    # empty page, not at max_pages or an error) and nothing newer was left behind by the limit
+    if submit_senate_videos(videos, limit, pipeline) and scraper.stop_reason in CURSOR_SAFE_STOPS:
+        scraper.commit_cursor()
+
+
+def run_senate_backfill(limit=None, max_pages=None):
+    """Separate, throttled job that walks the whole Senate archive.
+    Anything already processed is skipped in the download stage.
+    A walk that reaches the end also commits the incremental cursor. Run it once on a fresh
+    state.db: until there is a cursor, incremental runs stop at SENATE_MAX_PAGES and can't set one.
+    @param limit: Max videos to hand to the pipeline
+    @param max_pages: Max API pages to walk, None for all
+    """
+    print("Backfilling Senate videos...")
+    scraper = SenateScraper()
+    videos = scraper.backfill(batch_size=SENATE_BATCH_SIZE, max_pages=max_pages)
+    print(f"Found {len(videos)} Senate videos.\n")
+
+    # One parallel pass over the playlists instead of probing inside each download
+    video_processor.prefetch_senate_playlists([video["video_id"] for video in videos[:limit]])
+
+    pipeline = build_pipeline()
+    pipeline.start()
+    if submit_senate_videos(videos, limit, pipeline):
+        scraper.commit_cursor()  # Only set after a walk to the end, see SenateScraper.backfill
+    pipeline.close()
+    pipeline.join()
+    pipeline.report()
+
+
+def run_all(limit=None):
+    """Scrape both chambers in parallel into one shared pipeline, so the download of
+    one video overlaps the transcription of the previous one and the upload of the one before.
+    @param limit: Max videos per chamber
+    @return: Per-stage stats of the run, see Pipeline.stats
+    """
+    pipeline = build_pipeline()
+    pipeline.start()
+
+    house_thread = threading.Thread(target=run_house, args=(limit, pipeline))
+    senate_thread = threading.Thread(target=run_senate, args=(limit, pipeline))
     house_thread.start()
     senate_thread.start()
     house_thread.join()
-    senate_thread.join()
\ No newline at end of file
+    senate_thread.join()
+
+    pipeline.close()
+    pipeline.join()
+    pipeline.report()
+    return pipeline.stats()
+
+
+def enqueue_all(queue, limit=None):
+    """Scrape both chambers in parallel into the durable job queue (see scheduler.py).
+    @param queue: JobQueue, filled the same way run_all fills a Pipeline
+    @param limit: Max videos per chamber, None for everything the scrapers return
+    """
+    threads = [
+        threading.Thread(target=run_house, args=(limit, queue)),
+        threading.Thread(target=run_senate, args=(limit, queue)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"[Queue] {queue.counts()}")
+
+
+def is_job_done(job) -> bool:
+    """A queue job is finished once the state tracker says the video is processed."""
+    return is_processed(job["chamber"], job["committee"], job["recording_date"], job["filename"])
+
+
+def build_worker_pool(queue, lease_store=None) -> WorkerPool:
+    """@param lease_store: Shared claims for running several nodes, see pipeline/leases.py"""
+    return WorkerPool(queue, build_pipeline, is_job_done, lease_store=lease_store)
+
+
+if __name__ == "__main__":
+    """ In case i dont want to run the scheduler, I can run this script directly."""
+    start_exporters()
+    if "--backfill" in sys.argv:
+        run_senate_backfill()
+    else:
+        run_all(2)
@@ -0,0 +1,188 @@
+# pipeline/engine.py
+
+import queue
+import threading
+import time
+from contextlib import ExitStack
+from pipeline import metrics
+
+# Put on a stage queue to tell one of its workers to exit
+_STOP = object()
+
+
+class Stage:
+    def __init__(self, name: str, func, workers: int = 1, queue_size: int = 4, batch_size: int = 1):
+        """One step of the pipeline with its own worker pool.
+        @param name: Used in logs and stats (download, transcribe, upload, ...)
+        @param func: Called with an item, returns the item for the next stage or None to drop it
+        @param workers: Number of threads running func
+        @param queue_size: Max items waiting for this stage. A full queue blocks
+                           the stage before it, which is our backpressure.
+        @param batch_size: Above 1, func is called with a list of up to this many items (whatever
+                           is already waiting, it never waits for a batch to fill) and returns
+                           a list of results in the same order. An exception in that list fails
+                           only its own item; one raised by func fails the whole batch.
+        """
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max(queue_size, batch_size))
+
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        self._alive = 0
+
+    def put(self, item):
+        """Blocks while the queue is full."""
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+        metrics.set_gauge("pipeline_queue_depth", depth, stage=self.name)
+
+
+class Pipeline:
+    def __init__(self, stages: list, on_finish=None):
+        """Stages connected by bounded queues, e.g. download -> transcribe -> upload.
+        Producers (the chamber scrapers) call submit(), then close() and join() once done.
+        @param stages: List of Stage in the order items flow through them
+        @param on_finish: Called with (item, exception or None) when an item leaves the pipeline:
+                          after the last stage, dropped by a stage returning None, or failed
+        """
+        self.stages = stages
+        self.on_finish = on_finish
+        self._threads = []
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            stage._alive = stage.workers
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(stage, next_stage),
+                    name=f"{stage.name}-{n}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, item):
+        """Feed an item into the first stage. Blocks while it is full."""
+        self.stages[0].put(item)
+
+    def close(self):
+        """No more items will be submitted. Stages drain and shut down in order."""
+        first = self.stages[0]
+        for _ in range(first.workers):
+            first.queue.put(_STOP)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _worker(self, stage: Stage, next_stage: Stage):
+        stopping = False
+        while not stopping:
+            item = stage.queue.get()
+            if item is _STOP:
+                metrics.set_gauge("pipeline_queue_depth", stage.queue.qsize(), stage=stage.name)
+                break
+            items = [item]
+            while len(items) < stage.batch_size:
+                try:
+                    item = stage.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True  # Finish this batch, then exit
+                    break
+                items.append(item)
+            metrics.set_gauge("pipeline_queue_depth", stage.queue.qsize(), stage=stage.name)
+
+            started = time.perf_counter()
+            error = None
+            try:
+                with ExitStack() as spans:
+                    for item in items:
+                        trace_id = item.get("trace_id") if isinstance(item, dict) else None
+                        spans.enter_context(metrics.span(stage.name, trace_id, batch=len(items)))
+                    if stage.batch_size > 1:
+                        results = list(stage.func(items))
+                    else:
+                        results = [stage.func(items[0])]
+            except Exception as e:
+                print(f"[Pipeline][{stage.name}] failed: {e}")
+                results = [None] * len(items)
+                error = e
+                with stage._lock:
+                    stage.failed += len(items)
+            elapsed = time.perf_counter() - started
+            metrics.observe("pipeline_stage_seconds", elapsed, stage=stage.name)
+
+            with stage._lock:
+                stage.processed += len(items)
+                stage.busy_seconds += elapsed
+
+            for item, result in zip(items, results):
+                item_error = error
+                if isinstance(result, Exception):  # A batched func that failed just this item
+                    print(f"[Pipeline][{stage.name}] failed: {result}")
+                    item_error, result = result, None
+                    with stage._lock:
+                        stage.failed += 1
+                if item_error is not None:
+                    outcome = "failed"
+                elif result is None:
+                    outcome = "dropped"  # Skipped or nothing left to do, e.g. already processed
+                else:
+                    outcome = "ok"
+                metrics.inc("pipeline_items_total", stage=stage.name, outcome=outcome)
+
+                if result is not None and next_stage is not None:
+                    next_stage.put(result)
+                elif self.on_finish is not None:
+                    try:
+                        self.on_finish(item, item_error)
+                    except Exception as e:
+                        print(f"[Pipeline][{stage.name}] on_finish failed: {e}")
+
+        # Last worker out tells the next stage there is nothing more coming
+        with stage._lock:
+            stage._alive -= 1
+            last = stage._alive == 0
+        if last and next_stage is not None:
+            for _ in range(next_stage.workers):
+                next_stage.queue.put(_STOP)
+
+    def stats(self) -> list:
+        """Per-stage throughput since start().
+        @return: List of dicts, one per stage
+        """
+        wall = time.perf_counter() - self._started_at if self._started_at else 0.0
+        results = []
+        for stage in self.stages:
+            with stage._lock:
+                results.append({
+                    "stage": stage.name,
+                    "workers": stage.workers,
+                    "processed": stage.processed,
+                    "failed": stage.failed,
+                    "busy_seconds": round(stage.busy_seconds, 2),
+                    "avg_seconds": round(stage.busy_seconds / stage.processed, 2) if stage.processed else 0.0,
+                    "per_hour": round(stage.processed / wall * 3600, 1) if wall else 0.0,
+                    "utilization": round(stage.busy_seconds / (wall * stage.workers), 2) if wall else 0.0,
+                    "max_queue_depth": stage.max_depth,
+                })
+        return results
+
+    def report(self):
+        for s in self.stats():
+            print(f"[Pipeline][{s['stage']}] {s['processed']} done ({s['failed']} failed), "
+                  f"{s['avg_seconds']}s avg, {s['per_hour']}/hour, "
+                  f"{int(s['utilization'] * 100)}% busy across {s['workers']} workers, "
+                  f"max queue {s['max_queue_depth']}")
@@ -0,0 +1,450 @@
+# pipeline/job_queue.py
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from pipeline import metrics
+from storage.state_tracker import STATE_DB
+
+# ===== CONFIGURATION =====
+LEASE_SECONDS = 15 * 60     # A leased job goes back to the queue if its worker stops heartbeating for this long
+POLL_SECONDS = 5            # How often an idle worker pool looks for new jobs
+MAX_ATTEMPTS = 5            # After this many failures a job is parked as "dead"
+RETRY_BASE_SECONDS = 60     # Backoff after the first failure, doubled each time (with jitter)
+RETRY_MAX_SECONDS = 6 * 3600
+# =========================
+
+QUEUED, LEASED, DONE, DEAD = "queued", "leased", "done", "dead"
+
+# Date formats seen in recording_date: Senate "2025-03-04", House "Tuesday, March 4, 2025"
+_DATE_FORMATS = ("%Y-%m-%d", "%A, %B %d, %Y", "%B %d, %Y")
+
+
+def session_priority(recording_date: str) -> float:
+    """Newer sessions first. Unparseable dates go to the back of the queue."""
+    for fmt in _DATE_FORMATS:
+        try:
+            return float(datetime.strptime(recording_date.strip(), fmt).toordinal())
+        except (ValueError, AttributeError):
+            continue
+    return 0.0
+
+
+def job_key(job: dict) -> str:
+    """One queue entry per video, however many scrapes see it."""
+    return "|".join((job["chamber"], job["committee"], job["recording_date"], job["filename"]))
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def node_id() -> str:
+    """Owner used for shared (cluster-wide) leases: the same across restarts of this node,
+    so a restarted node takes its own leases straight back instead of waiting for them to
+    expire. Set NODE_ID when hostnames aren't unique across nodes."""
+    return os.environ.get("NODE_ID") or socket.gethostname()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, just not ours
+    return True
+
+
+def _like_escape(text: str) -> str:
+    """Literal text for a LIKE pattern with ESCAPE '\\'."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class JobQueue:
+    """
+    Durable queue of videos to process, in the same SQLite file as the rest of the state.
+    Scrapers submit(); workers lease() the highest-priority job that is due, then complete()
+    or fail() it. A failed job comes back after an exponential backoff. A job whose worker
+    died stays leased only until its lease expires (or until the same host restarts).
+    """
+
+    def __init__(self, db_path: Path = STATE_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                priority REAL NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, available_at);
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the calling thread, created on first use (same setup as state_tracker)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, job: dict, priority: float = None) -> bool:
+        """Queue a video unless it is already queued, in flight or finished.
+        Same call as Pipeline.submit, so main.run_house / run_senate can fill either one.
+        @param job: Job dict from make_job
+        @param priority: Higher goes first, defaults to the recording date (newest first)
+        @return: True if it was new
+        """
+        now = time.time()
+        priority = session_priority(job["recording_date"]) if priority is None else priority
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO jobs (key, payload, priority, status, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_key(job), json.dumps(job, default=str), priority, QUEUED, now, now, now)
+        )
+        if cursor.rowcount:
+            metrics.inc("queue_jobs_total", event="submitted")
+        return cursor.rowcount == 1
+
+    def lease(self, owner: str, lease_seconds: float = LEASE_SECONDS) -> dict:
+        """Take the best job that is due.
+        @return: The job dict with "queue_id" and "attempt" added, or None if nothing is due
+        """
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Leases whose worker stopped heartbeating go back to the queue first
+            expired = conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ?", (QUEUED, now, LEASED, now)
+            ).rowcount
+            row = conn.execute(
+                "SELECT id, payload, attempts FROM jobs WHERE status = ? AND available_at <= ? "
+                "ORDER BY priority DESC, id LIMIT 1", (QUEUED, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?", (LEASED, owner, now + lease_seconds, now, row[0])
+                )
+
+        if expired:
+            print(f"[Queue] {expired} expired leases returned to the queue")
+            metrics.inc("queue_jobs_total", expired, event="lease_expired")
+        if row is None:
+            return None
+        job = json.loads(row[1])
+        job["queue_id"] = row[0]
+        job["attempt"] = row[2] + 1
+        metrics.inc("queue_jobs_total", event="leased")
+        return job
+
+    def heartbeat(self, job_ids: list, owner: str, lease_seconds: float = LEASE_SECONDS):
+        """Extend the leases a worker still holds."""
+        if not job_ids:
+            return
+        self._connect().executemany(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            [(time.time() + lease_seconds, job_id, LEASED, owner) for job_id in job_ids]
+        )
+
+    def complete(self, job_id: int, owner: str) -> bool:
+        """Mark a job done, if owner still holds its lease.
+        @return: False if the lease expired and was taken over, in which case nothing changes
+        """
+        updated = self._connect().execute(
+            "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, last_error = NULL, "
+            "updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (DONE, time.time(), job_id, LEASED, owner)
+        ).rowcount
+        if not updated:
+            print(f"[Queue] Job {job_id} is no longer leased by {owner}, not completing it")
+            return False
+        metrics.inc("queue_jobs_total", event="completed")
+        return True
+
+    def fail(self, job_id: int, error: str, owner: str) -> bool:
+        """Back off and retry, or park the job as dead after MAX_ATTEMPTS.
+        @return: False if owner no longer holds the lease, in which case nothing changes
+        """
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                               (job_id, LEASED, owner)).fetchone()
+            if row is None:
+                print(f"[Queue] Job {job_id} is no longer leased by {owner}, ignoring its failure: {error}")
+                return False
+            attempts = row[0]
+            if attempts >= MAX_ATTEMPTS:
+                status, available_at = DEAD, now
+                print(f"[Queue] Job {job_id} failed {attempts} times, giving up: {error}")
+            else:
+                delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+                status, available_at = QUEUED, now + random.uniform(delay / 2, delay)
+                print(f"[Queue] Job {job_id} failed (attempt {attempts}), retrying in {available_at - now:.0f}s: {error}")
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "last_error = ?, updated_at = ? WHERE id = ?", (status, available_at, error, now, job_id)
+            )
+        metrics.inc("queue_jobs_total", event="dead" if status == DEAD else "retried")
+        return True
+
+    def defer(self, job_id: int, seconds: float, owner: str) -> bool:
+        """Put a leased job back for later without counting an attempt,
+        e.g. because another node holds the video's shared lease.
+        @return: False if owner no longer holds the lease, in which case nothing changes
+        """
+        now = time.time()
+        return bool(self._connect().execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), available_at = ?, lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (QUEUED, now + seconds, now, job_id, LEASED, owner)
+        ).rowcount)
+
+    def release(self, owner: str, job_ids: list = None) -> int:
+        """Hand leases back without counting an attempt, e.g. on shutdown.
+        @param job_ids: Only these, defaults to every lease owner holds
+        @return: Number of jobs released
+        """
+        query = ("UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                 "lease_expires = NULL, updated_at = ? WHERE status = ? AND lease_owner = ?")
+        params = [QUEUED, time.time(), LEASED, owner]
+        if job_ids is not None:
+            query += f" AND id IN ({','.join('?' * len(job_ids))})"
+            params += list(job_ids)
+        return self._connect().execute(query, params).rowcount
+
+    def recover(self, owner: str) -> int:
+        """After a crash: leases held by processes on this host that no longer exist are
+        certainly dead, so put them back now instead of waiting for them to expire.
+        Leases of sibling worker processes that are still running are left alone.
+        @param owner: The new process's owner id (host:pid); its own leases are left alone
+        @return: Number of jobs put back
+        """
+        host = owner.split(":", 1)[0]
+        conn = self._connect()
+        owners = [row[0] for row in conn.execute(
+            "SELECT DISTINCT lease_owner FROM jobs WHERE status = ? AND lease_owner LIKE ? ESCAPE '\\' "
+            "AND lease_owner != ?", (LEASED, _like_escape(host) + ":%", owner)
+        )]
+        dead = [other for other in owners
+                if other.rsplit(":", 1)[1].isdigit() and not _pid_alive(int(other.rsplit(":", 1)[1]))]
+        count = 0
+        for other in dead:
+            count += conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_owner = ?", (QUEUED, time.time(), LEASED, other)
+            ).rowcount
+        if count:
+            print(f"[Queue] Recovered {count} jobs left in flight by an earlier run")
+        return count
+
+    def counts(self) -> dict:
+        """Jobs per status."""
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, LEASED, DONE, DEAD)}
+        counts.update(dict(rows))
+        for status, count in counts.items():
+            metrics.set_gauge("queue_jobs", count, status=status)
+        return counts
+
+
+class WorkerPool:
+    """
+    Long-running consumer of a JobQueue. Leased jobs flow through one Pipeline
+    (download -> transcribe -> upload with the usual per-stage workers and backpressure).
+    The feeder blocks on the first stage, so at most one job is leased ahead of what the
+    pipeline can hold; the backlog stays in the queue. Leases are heartbeated while jobs are in flight.
+
+    A job counts as done when is_done(job) says so after it leaves the pipeline
+    (so "already processed" skips complete too); anything else is retried with backoff.
+
+    With a lease_store (pipeline/leases.py) several nodes can drain their own queues over
+    the same archive: a job is only processed after its video is claimed cluster-wide,
+    the claim is renewed with the local heartbeat, and finished videos are marked done
+    there so no other node picks them up. Videos another node holds are deferred.
+    Shared leases are held under the node id, not the process, so a node that restarts
+    resumes its own claims at once. Processes on one node share its local queue, which
+    already keeps them from working on the same video.
+    """
+
+    def __init__(self, queue: JobQueue, build_pipeline, is_done, owner: str = None,
+                 lease_seconds: float = LEASE_SECONDS, poll_seconds: float = POLL_SECONDS, lease_store=None,
+                 node: str = None):
+        """
+        @param build_pipeline: Called with on_finish=..., returns a Pipeline
+        @param is_done: Called with a job dict once it left the pipeline
+        @param owner: Local queue lease owner, defaults to host:pid
+        @param lease_store: Shared store for multi-node runs, None when this is the only node
+        @param node: Owner for shared leases, defaults to node_id()
+        """
+        self.queue = queue
+        self.build_pipeline = build_pipeline
+        self.is_done = is_done
+        self.owner = owner or default_owner()
+        self.node = node or node_id()
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_store = lease_store
+
+        self.pipeline = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self.queue.recover(self.owner)
+        print(f"[Queue] Worker pool {self.owner} starting: {self.queue.counts()}")
+        self.pipeline = self.build_pipeline(on_finish=self._finished)
+        # A stage only runs while we still hold the video's shared lease
+        for stage in self.pipeline.stages:
+            stage.func = self._guarded(stage.func)
+        self.pipeline.start()
+        for target, name in ((self._feed, "queue-feeder"), (self._heartbeat, "queue-heartbeat")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _feed(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.lease(self.owner, self.lease_seconds)
+            except sqlite3.OperationalError as e:
+                print(f"[Queue] Could not lease a job: {e}")
+                job = None
+            if job is None:
+                self._stopping.wait(self.poll_seconds)
+                continue
+            if self.lease_store is not None and not self._claim(job):
+                continue
+            with self._lock:
+                self._in_flight[job["queue_id"]] = job
+            self.pipeline.submit(job)  # Blocks while the download stage is full
+
+    def _claim(self, job: dict) -> bool:
+        """Claim the job's video in the shared store.
+        @return: True if we may process it. Otherwise the local job is settled or deferred.
+        """
+        key = job_key(job)
+        try:
+            lease = self.lease_store.acquire(key, self.node, self.lease_seconds)
+            if lease is None and self.lease_store.is_done(key):
+                print(f"[Queue] {job['filename']} was already done by another node")
+                metrics.inc("shared_leases_total", event="done_elsewhere")
+                self.queue.complete(job["queue_id"], self.owner)
+                return False
+        except Exception as e:
+            print(f"[Queue] Shared lease store unavailable, retrying later: {e}")
+            lease = None
+        if lease is None:
+            metrics.inc("shared_leases_total", event="held_elsewhere")
+            self.queue.defer(job["queue_id"], self.lease_seconds / 3, self.owner)
+            return False
+        metrics.inc("shared_leases_total", event="acquired")
+        job["shared_lease"] = lease
+        return True
+
+    def _guarded(self, func):
+        def lost(job):
+            if job.get("shared_lease_lost"):
+                print(f"[Queue] Lost the shared lease on {job['filename']}, leaving it to the node that took over")
+                return True
+            return False
+
+        def run(job):
+            if isinstance(job, list):  # Batched stage, see Stage.batch_size
+                kept = [item for item in job if not lost(item)]
+                results = dict(zip(map(id, kept), func(kept))) if kept else {}
+                return [results.get(id(item)) for item in job]
+            if lost(job):
+                return None
+            return func(job)
+        return run
+
+    def _heartbeat(self):
+        while not self._stopping.wait(self.lease_seconds / 3):
+            with self._lock:
+                jobs = list(self._in_flight.values())
+            try:
+                self.queue.heartbeat([job["queue_id"] for job in jobs], self.owner, self.lease_seconds)
+            except sqlite3.OperationalError as e:
+                print(f"[Queue] Heartbeat failed, will retry: {e}")
+
+            for job in jobs:
+                lease = job.get("shared_lease")
+                if lease is None or job.get("shared_lease_lost"):
+                    continue
+                try:
+                    if not self.lease_store.renew(lease, self.lease_seconds):
+                        job["shared_lease_lost"] = True
+                        metrics.inc("shared_leases_total", event="lost")
+                except Exception as e:
+                    print(f"[Queue] Could not renew shared lease on {job['filename']}, will retry: {e}")
+
+    def _finished(self, job: dict, error: Exception):
+        with self._lock:
+            self._in_flight.pop(job["queue_id"], None)
+        lease = job.get("shared_lease")
+        if error is None and self.is_done(job):
+            if lease is not None:
+                try:
+                    self.lease_store.mark_done(lease)
+                except Exception as e:
+                    # The lease expires on its own; whoever takes it over finds the video processed
+                    print(f"[Queue] Could not mark {job['filename']} done in the shared store: {e}")
+            self.queue.complete(job["queue_id"], self.owner)
+            return
+
+        if lease is not None:
+            try:
+                self.lease_store.release(lease)
+            except Exception as e:
+                print(f"[Queue] Could not release shared lease on {job['filename']}: {e}")
+        if job.get("shared_lease_lost"):
+            self.queue.defer(job["queue_id"], self.lease_seconds, self.owner)
+        else:
+            self.queue.fail(job["queue_id"], str(error) if error else "stopped before finishing", self.owner)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def stop(self, drain: bool = True):
+        """Stop leasing. drain=True waits for in-flight jobs to finish; otherwise their
+        leases are handed back and the work is picked up again by the next run."""
+        self._stopping.set()
+        if drain:
+            self._threads[0].join()  # Feeder hands over its last job before the pipeline is closed
+            self.pipeline.close()
+            self.pipeline.join()
+        else:
+            if self.lease_store is not None:
+                with self._lock:
+                    jobs = list(self._in_flight.values())
+                for job in jobs:
+                    if job.get("shared_lease"):
+                        self.lease_store.release(job["shared_lease"])
+            released = self.queue.release(self.owner)
+            print(f"[Queue] Released {released} in-flight jobs")
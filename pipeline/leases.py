@@ -0,0 +1,265 @@
+# pipeline/leases.py
+"""
+Cluster-wide claims on videos, so several boxes can work the same archive without
+doing a video twice. A node claims a video (acquire) before processing it, renews the
+claim while it works (heartbeat), and marks it done at the end. A claim that isn't
+renewed expires and any node may take it over. Done markers are permanent.
+
+Every store has the same methods; a lease is a dict with key, owner, expires_at and
+token (whatever the store uses to detect that someone else wrote in between).
+
+    MemoryLeaseStore   one process only, for tests and single-node runs
+    SQLiteLeaseStore   a SQLite file every node can reach
+    GCSLeaseStore      one object per video, made atomic with generation preconditions
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from storage.gcs_uploader import get_storage_client
+
+# ===== CONFIGURATION =====
+CLOCK_SKEW_SECONDS = 30     # A lease only counts as expired this long after its expiry, in case node clocks disagree
+GCS_LEASE_PREFIX = "leases"
+# =========================
+
+
+class MemoryLeaseStore:
+    """Local stand-in with the same semantics as the shared stores."""
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, owner: str, ttl: float) -> dict:
+        """@return: The lease, or None if another node holds it or it is done"""
+        now = time.time()
+        with self._lock:
+            record = self._records.get(key)
+            if record and (record["done"] or (record["owner"] != owner
+                                              and record["expires_at"] + CLOCK_SKEW_SECONDS > now)):
+                return None
+            token = (record["token"] + 1) if record else 1
+            self._records[key] = {"owner": owner, "expires_at": now + ttl, "done": False, "token": token}
+            return {"key": key, "owner": owner, "expires_at": now + ttl, "token": token}
+
+    def renew(self, lease: dict, ttl: float) -> bool:
+        """@return: False if the lease was lost (taken over after expiring)"""
+        with self._lock:
+            record = self._records.get(lease["key"])
+            if not record or record["token"] != lease["token"] or record["done"]:
+                return False
+            record["token"] += 1
+            record["expires_at"] = time.time() + ttl
+            lease.update(expires_at=record["expires_at"], token=record["token"])
+            return True
+
+    def release(self, lease: dict):
+        with self._lock:
+            record = self._records.get(lease["key"])
+            if record and record["token"] == lease["token"] and not record["done"]:
+                del self._records[lease["key"]]
+
+    def mark_done(self, lease: dict) -> bool:
+        """@return: False if the lease had been lost, i.e. someone else may have done it too"""
+        with self._lock:
+            record = self._records.get(lease["key"])
+            lost = not record or record["token"] != lease["token"]
+            self._records[lease["key"]] = {"owner": lease["owner"], "expires_at": 0, "done": True,
+                                           "token": (record["token"] + 1) if record else 1}
+            return not lost
+
+    def is_done(self, key: str) -> bool:
+        with self._lock:
+            record = self._records.get(key)
+            return bool(record and record["done"])
+
+
+class SQLiteLeaseStore:
+    """Leases in a SQLite file on storage every node can reach (or a SQLite-compatible server).
+    Claims run in an IMMEDIATE transaction and every later write is guarded by the token,
+    so two nodes can never both think they won."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                token INTEGER NOT NULL
+            )
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # No WAL here: it needs shared memory, which doesn't work across machines on a network filesystem
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key: str, owner: str, ttl: float) -> dict:
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner, expires_at, done, token FROM leases WHERE key = ?", (key,)).fetchone()
+            if row and (row[2] or (row[0] != owner and row[1] + CLOCK_SKEW_SECONDS > now)):
+                return None
+            token = (row[3] + 1) if row else 1
+            conn.execute(
+                "INSERT INTO leases (key, owner, expires_at, done, token) VALUES (?, ?, ?, 0, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at, "
+                "token = excluded.token",
+                (key, owner, now + ttl, token)
+            )
+        return {"key": key, "owner": owner, "expires_at": now + ttl, "token": token}
+
+    def renew(self, lease: dict, ttl: float) -> bool:
+        expires_at = time.time() + ttl
+        updated = self._connect().execute(
+            "UPDATE leases SET expires_at = ?, token = token + 1 WHERE key = ? AND token = ? AND done = 0",
+            (expires_at, lease["key"], lease["token"])
+        ).rowcount
+        if updated:
+            lease.update(expires_at=expires_at, token=lease["token"] + 1)
+        return bool(updated)
+
+    def release(self, lease: dict):
+        self._connect().execute("DELETE FROM leases WHERE key = ? AND token = ? AND done = 0",
+                                (lease["key"], lease["token"]))
+
+    def mark_done(self, lease: dict) -> bool:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            ours = conn.execute("UPDATE leases SET done = 1, expires_at = 0, token = token + 1 "
+                                "WHERE key = ? AND token = ?", (lease["key"], lease["token"])).rowcount
+            if not ours:
+                conn.execute(
+                    "INSERT INTO leases (key, owner, expires_at, done, token) VALUES (?, ?, 0, 1, 1) "
+                    "ON CONFLICT (key) DO UPDATE SET done = 1, expires_at = 0, token = token + 1",
+                    (lease["key"], lease["owner"])
+                )
+        return bool(ours)
+
+    def is_done(self, key: str) -> bool:
+        row = self._connect().execute("SELECT done FROM leases WHERE key = ?", (key,)).fetchone()
+        return bool(row and row[0])
+
+
+class GCSLeaseStore:
+    """
+    One small JSON object per video under gs://<bucket>/<prefix>/. Every write carries
+    a generation precondition: 0 ("must not exist") to claim a new video, or the generation
+    we last saw to renew, take over or finish one. GCS rejects the write (412) if anyone
+    else wrote first, which is what makes claiming atomic without a database.
+    """
+
+    def __init__(self, bucket_name: str, prefix: str = GCS_LEASE_PREFIX):
+        self.bucket = get_storage_client().bucket(bucket_name)
+        self.prefix = prefix
+
+    def _blob(self, key: str):
+        return self.bucket.blob(f"{self.prefix}/{hashlib.sha256(key.encode()).hexdigest()}.json")
+
+    def _read(self, key: str):
+        """@return: (record, generation), or (None, 0) if there is no object"""
+        blob = self._blob(key)
+        try:
+            data = blob.download_as_bytes()
+        except NotFound:
+            return None, 0
+        return json.loads(data), blob.generation
+
+    def _write(self, key: str, record: dict, generation: int):
+        """@return: New generation, or None if the precondition failed"""
+        blob = self._blob(key)
+        try:
+            blob.upload_from_string(json.dumps(record), content_type="application/json",
+                                    if_generation_match=generation)
+        except PreconditionFailed:
+            return None
+        return blob.generation
+
+    def acquire(self, key: str, owner: str, ttl: float) -> dict:
+        record, generation = self._read(key)
+        now = time.time()
+        if record and (record["done"] or (record["owner"] != owner
+                                          and record["expires_at"] + CLOCK_SKEW_SECONDS > now)):
+            return None
+        expires_at = now + ttl
+        new_generation = self._write(key, {"key": key, "owner": owner, "expires_at": expires_at, "done": False},
+                                     generation)
+        if new_generation is None:
+            return None  # Another node got there between our read and write
+        return {"key": key, "owner": owner, "expires_at": expires_at, "token": new_generation}
+
+    def renew(self, lease: dict, ttl: float) -> bool:
+        expires_at = time.time() + ttl
+        record = {"key": lease["key"], "owner": lease["owner"], "expires_at": expires_at, "done": False}
+        new_generation = self._write(lease["key"], record, lease["token"])
+        if new_generation is None:
+            return False
+        lease.update(expires_at=expires_at, token=new_generation)
+        return True
+
+    def release(self, lease: dict):
+        try:
+            self._blob(lease["key"]).delete(if_generation_match=lease["token"])
+        except (NotFound, PreconditionFailed):
+            pass
+
+    def mark_done(self, lease: dict) -> bool:
+        record = {"key": lease["key"], "owner": lease["owner"], "expires_at": 0, "done": True}
+        if self._write(lease["key"], record, lease["token"]) is not None:
+            return True
+        # Lost the lease on the way; the work is done either way, so record it unconditionally
+        self._blob(lease["key"]).upload_from_string(json.dumps(record), content_type="application/json")
+        return False
+
+    def is_done(self, key: str) -> bool:
+        record, _ = self._read(key)
+        return bool(record and record["done"])
+
+
+def check_semantics(store, key: str = "check|video"):
+    """Walk a store through acquire, renew, takeover and mark_done and assert what each
+    must do. Any store works; use a fresh one (or a key nobody else uses).
+
+        python -m pipeline.leases                 # MemoryLeaseStore
+        python -m pipeline.leases /tmp/leases.db  # SQLiteLeaseStore
+    """
+    expired = -(CLOCK_SKEW_SECONDS + 1)  # A ttl that leaves the lease already past expiry and skew
+
+    first = store.acquire(key, "node-a", 60)
+    assert first is not None, "a free key can be acquired"
+    assert store.acquire(key, "node-b", 60) is None, "a live lease keeps other nodes out"
+    again = store.acquire(key, "node-a", 60)
+    assert again is not None, "the holder can re-acquire its own lease, e.g. after a restart"
+    assert not store.renew(first, 60), "the lease from before the re-acquire is superseded"
+    assert store.renew(again, expired), "the holder can renew"
+
+    taken = store.acquire(key, "node-b", 60)
+    assert taken is not None, "an expired lease can be taken over"
+    assert not store.renew(again, 60), "the old holder notices it lost the lease"
+    assert not store.is_done(key)
+
+    assert store.mark_done(taken), "the holder marks it done"
+    assert store.is_done(key)
+    assert store.acquire(key, "node-a", 60) is None, "a done video can't be acquired"
+    assert store.acquire(key, "node-b", 60) is None, "not even by the node that did it"
+    assert not store.renew(taken, 60), "a done lease can't be renewed"
+    print(f"[Leases] {type(store).__name__}: acquire/renew/takeover/mark_done OK")
+
+
+if __name__ == "__main__":
+    import sys
+    check_semantics(SQLiteLeaseStore(Path(sys.argv[1])) if len(sys.argv) > 1 else MemoryLeaseStore())
@@ -0,0 +1,225 @@
+# pipeline/metrics.py
+
+import atexit
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ===== CONFIGURATION =====
+METRICS_PORT = 9108                             # Prometheus text on http://127.0.0.1:<port>/metrics, None to disable
+METRICS_JSONL = Path("metrics/metrics.jsonl")   # Snapshot appended every METRICS_INTERVAL seconds, None to disable
+METRICS_INTERVAL = 30
+TRACE_PATH = None                               # e.g. Path("metrics/traces.jsonl") for per-video spans
+PREFIX = "legislature_"                         # Prepended to every Prometheus metric name
+# =========================
+
+
+class Registry:
+    """
+    Counters, gauges and timers keyed by name + labels.
+    Recording is a dict update under one lock (a few microseconds), cheap enough
+    to leave on everywhere: per HTTP request, per stage call, per upload.
+    Timers keep count, sum and max, which is what a Prometheus summary without quantiles has.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the block, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        """Everything recorded so far, as plain JSON-able data."""
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            timers = [(key, list(value)) for key, value in self._timers.items()]
+        return {
+            "time": time.time(),
+            "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in counters],
+            "gauges": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in gauges],
+            "timers": [{"name": n, "labels": dict(l), "count": c, "sum": round(s, 6), "max": round(m, 6)}
+                       for (n, l), (c, s, m) in timers],
+        }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def emit(name, kind, labels, value):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for row in sorted(snapshot["counters"], key=lambda row: row["name"]):
+            emit(PREFIX + row["name"], "counter", row["labels"], row["value"])
+        for row in sorted(snapshot["gauges"], key=lambda row: row["name"]):
+            emit(PREFIX + row["name"], "gauge", row["labels"], row["value"])
+        # A metric's lines have to be grouped together: all the summaries first, then their maxima
+        timers = sorted(snapshot["timers"], key=lambda row: row["name"])
+        for row in timers:
+            name = PREFIX + row["name"]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} summary")
+            lines.append(f"{name}_count{_format_labels(row['labels'])} {row['count']}")
+            lines.append(f"{name}_sum{_format_labels(row['labels'])} {row['sum']}")
+        for row in timers:
+            emit(f"{PREFIX}{row['name']}_max", "gauge", row["labels"], row["max"])
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+snapshot = REGISTRY.snapshot
+
+
+# ===== Per-video traces =====
+
+_trace_lock = threading.Lock()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def span(name: str, trace_id: str = None, **attributes):
+    """Record one step of one video (download, transcribe, ...) as a JSON line in TRACE_PATH.
+    Does nothing unless TRACE_PATH is set, so it can stay in the code path.
+    """
+    if TRACE_PATH is None:
+        yield
+        return
+
+    started_at = time.time()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record = {
+            "trace_id": trace_id,
+            "span": name,
+            "start": round(started_at, 6),
+            "seconds": round(time.perf_counter() - started, 6),
+            "attributes": attributes,
+            "error": error,
+        }
+        with _trace_lock:
+            TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(TRACE_PATH, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+# ===== Exporters =====
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_snapshot(path: Path):
+    """Append the current snapshot to a JSON lines file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(REGISTRY.snapshot()) + "\n")
+
+
+_exporters_started = False
+
+
+def start_exporters(port: int = METRICS_PORT, jsonl_path: Path = METRICS_JSONL, interval: float = METRICS_INTERVAL):
+    """Serve /metrics on localhost and/or append snapshots to jsonl_path in the background.
+    Safe to call more than once; only the first call starts anything.
+    """
+    global _exporters_started
+    if _exporters_started:
+        return
+    _exporters_started = True
+
+    if port is not None:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"[Metrics] Prometheus metrics on http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            print(f"[Metrics] Could not listen on port {port}: {e}")
+
+    if jsonl_path is not None:
+        def write_forever():
+            while True:
+                time.sleep(interval)
+                write_snapshot(jsonl_path)
+
+        threading.Thread(target=write_forever, name="metrics-jsonl", daemon=True).start()
+        atexit.register(write_snapshot, jsonl_path)  # Don't lose the tail of a short run
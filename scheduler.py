@@ -1,46 +1,71 @@
-import threading
 import schedule
+import threading
 import time
-from pathlib import Path
-from main import run_house, run_senate  
+from main import enqueue_all, build_worker_pool
+from pipeline.job_queue import JobQueue
+from pipeline.leases import GCSLeaseStore, SQLiteLeaseStore
+from transcriber.model_pool import warm_models
+from pipeline.metrics import start_exporters
 
 # ===== CONFIGURATION =====
-FREQ_MINUTES = 5   # How often to run both jobs
-VIDEO_LIMIT = 2           # Max number of videos to process per run
-LOCK_FILE = Path("scheduler.lock")
+FREQ_MINUTES = 5   # How often to scrape both chambers for new videos
+
+# Several transcription boxes on the same archive: every node claims a video in a shared
+# store before processing it, so none is done twice. None when this is the only node.
+# e.g. "gcs" (lease objects in BUCKET_NAME) or a path to a SQLite file all nodes can reach
+SHARED_LEASES = None
 # =========================
 
-def job_wrapper():
-    """Wraps the job to prevent overlapping runs."""
-    if LOCK_FILE.exists():
-        print("Previous run still in progress... waiting...")
-        return  # Skip this run if another is still active
 
-    try:
-        LOCK_FILE.touch()
+def make_lease_store():
+    if SHARED_LEASES is None:
+        return None
+    if SHARED_LEASES == "gcs":
+        from main import BUCKET_NAME
+        return GCSLeaseStore(BUCKET_NAME)
+    return SQLiteLeaseStore(SHARED_LEASES)
+
+# Scraping only fills the durable job queue (jobs table in state.db). A worker pool
+# drains it continuously, newest sessions first, so a long run never makes the next
+# scrape wait and there is no per-run video limit. Failed videos are retried with
+# backoff; videos in flight when the process died are picked up again on restart.
 
-        house_thread = threading.Thread(target=run_house, args=(VIDEO_LIMIT,))
-        senate_thread = threading.Thread(target=run_senate, args=(VIDEO_LIMIT,))
+_scrape_running = threading.Lock()
 
-        house_thread.start()
-        senate_thread.start()
 
-        house_thread.join()
-        senate_thread.join()
+def scrape_job(queue):
+    """Enqueue new videos. Runs in its own thread so the scheduler loop stays responsive;
+    a scrape still going when the next one is due just skips that tick."""
+    if not _scrape_running.acquire(blocking=False):
+        print("Previous scrape still in progress, skipping this tick.")
+        return
+
+    def run():
+        try:
+            enqueue_all(queue)
+        except Exception as e:
+            print(f"[Scheduler] Scrape failed: {e}")
+        finally:
+            _scrape_running.release()
+
+    threading.Thread(target=run, name="scrape", daemon=True).start()
 
-    finally:
-        if LOCK_FILE.exists():
-            LOCK_FILE.unlink()
 
 if __name__ == "__main__":
-    # Schedule both jobs
     print("Starting Jobs...")
-    schedule.every(FREQ_MINUTES).minutes.do(job_wrapper)
+    warm_models()  # Load Whisper once, before the first job needs it
+    start_exporters()  # /metrics on localhost + JSON lines snapshots, see pipeline/metrics.py
+
+    queue = JobQueue()
+    pool = build_worker_pool(queue, make_lease_store())
+    pool.start()  # Also re-queues anything a crashed run left in flight
+
+    schedule.every(FREQ_MINUTES).minutes.do(scrape_job, queue)
 
-    print(f"Scheduler started: Running both chambers every {FREQ_MINUTES} minutes.")
-    print(f"Processing up to {VIDEO_LIMIT} videos per run.\nPress Ctrl+C to stop.\n")
+    print(f"Scheduler started: scraping both chambers every {FREQ_MINUTES} minutes.")
+    print("Workers drain the job queue continuously.\nPress Ctrl+C to stop.\n")
 
-    job_wrapper()  # First Run
+    scrape_job(queue)  # First Run
 
     try:
         while True:
@@ -48,5 +73,4 @@ if __name__ == "__main__":
             time.sleep(1)
     except KeyboardInterrupt:
         print("\n Scheduler stopped by user.")
-        if LOCK_FILE.exists():
-            LOCK_FILE.unlink()
+        pool.stop(drain=False)  # In-flight jobs go back to the queue for the next start
@@ -0,0 +1,232 @@
+# storage/disk_budget.py
+"""
+Keeps downloads/ under a fixed size so parallel downloads can't fill a small disk.
+
+A download reserves its expected size first (Content-Length, or duration x bitrate).
+If that doesn't fit, the least recently used files nobody needs any more are deleted:
+leftovers of failed or abandoned runs, and anything already uploaded that cleanup missed.
+If it still doesn't fit, the download waits until other videos finish and free space.
+
+A file is needed while a download is writing it (reserved) or while its video is still
+between download and upload (pinned). Files belong to a video by name: everything in
+the same directory named <stem> or <stem>.<anything> (partials, checkpoints, segments,
+the transcript).
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from pipeline import metrics
+
+# ===== CONFIGURATION =====
+DOWNLOAD_ROOT = Path("downloads")
+BUDGET_BYTES = 20 * 1024 ** 3           # Most downloads/ may hold, reservations included
+MIN_FREE_BYTES = 1024 ** 3              # Also never leave less than this free on the disk
+AUDIO_BYTES_PER_SECOND = 16000 * 2      # 16 kHz mono s16 WAV
+VIDEO_BYTES_PER_SECOND = 5_000_000 // 8 # Estimate when a video's bitrate is unknown (5 Mbit/s)
+RECHECK_SECONDS = 5                     # A waiting download looks again this often (files can go away without notice)
+# =========================
+
+
+class Reservation:
+    """Space set aside for one download. Release it (or leave the with block) once the
+    download has finished or failed; what it wrote is then counted at its real size.
+    If the download produced its final file, that file is pinned until DiskBudget.unpin."""
+
+    def __init__(self, budget, path: Path, nbytes: int):
+        self.budget = budget
+        self.path = path
+        self.nbytes = nbytes
+
+    def release(self):
+        self.budget._release(self)
+
+    def resize(self, nbytes: int):
+        """Correct the estimate once the real size is known (e.g. from ffmpeg's header).
+        Never blocks: this download is already running, so a bigger estimate only
+        makes the next ones wait."""
+        self.budget._resize(self, nbytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class DiskBudget:
+    def __init__(self, root: Path = DOWNLOAD_ROOT, budget_bytes: int = BUDGET_BYTES,
+                 min_free_bytes: int = MIN_FREE_BYTES):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self.min_free_bytes = min_free_bytes
+        self._reservations = []
+        self._pinned = set()
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _owner(path: Path) -> tuple:
+        """(directory, stem) of a video's final download path."""
+        return str(path.parent), path.stem
+
+    @staticmethod
+    def _belongs(path: Path, owner: tuple) -> bool:
+        directory, stem = owner
+        return str(path.parent) == directory and (path.name == stem or path.name.startswith(stem + "."))
+
+    def _entries(self) -> list:
+        """Everything under root as (path, bytes, last used), directories (HLS segments) as one entry."""
+        entries = []
+        if not self.root.exists():
+            return entries
+        for directory in [self.root, *(p for p in self.root.iterdir() if p.is_dir())]:
+            for path in directory.iterdir():
+                try:
+                    if path.is_file():
+                        stat = path.stat()
+                        entries.append((path, stat.st_size, stat.st_mtime))
+                    elif directory != self.root and path.is_dir():
+                        size, last_used = 0, path.stat().st_mtime
+                        for inner_root, _, names in os.walk(path):
+                            for name in names:
+                                stat = os.stat(os.path.join(inner_root, name))
+                                size += stat.st_size
+                                last_used = max(last_used, stat.st_mtime)
+                        entries.append((path, size, last_used))
+                except FileNotFoundError:
+                    pass  # Deleted while we looked
+        return entries
+
+    def _usage(self, entries: list) -> tuple:
+        """@return: (bytes on disk plus whatever reservations haven't written yet, the not yet written part)"""
+        written = [0] * len(self._reservations)
+        loose = 0
+        for path, size, _ in entries:
+            for index, reservation in enumerate(self._reservations):
+                if self._belongs(path, self._owner(reservation.path)):
+                    written[index] += size
+                    break
+            else:
+                loose += size
+        # A download counts at its reservation until it has written more than that
+        usage = loose + sum(max(r.nbytes, done) for r, done in zip(self._reservations, written))
+        unwritten = sum(max(r.nbytes - done, 0) for r, done in zip(self._reservations, written))
+        return usage, unwritten
+
+    def _limit(self, usage: int, unwritten: int) -> int:
+        """The budget, or less if the disk itself is running out.
+        The disk's free space still includes what reservations haven't written yet,
+        so that part is taken off it, or outstanding reservations would count twice.
+        """
+        try:
+            free = shutil.disk_usage(self.root if self.root.exists() else Path(".")).free
+        except OSError:
+            return self.budget_bytes
+        return min(self.budget_bytes, usage + (free - unwritten) - self.min_free_bytes)
+
+    def _evictable(self, entries: list) -> list:
+        """Files no reservation or pinned video needs, least recently used first."""
+        busy = {self._owner(r.path) for r in self._reservations} | self._pinned
+        return sorted((e for e in entries if not any(self._belongs(e[0], owner) for owner in busy)),
+                      key=lambda e: e[2])
+
+    def _evict(self, entries: list, needed: int) -> int:
+        """Delete LRU leftovers until `needed` bytes are freed. @return: Bytes freed"""
+        freed = 0
+        for path, size, _ in self._evictable(entries):
+            if freed >= needed:
+                break
+            try:
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"[Disk] Could not evict {path}: {e}")
+                continue
+            freed += size
+            metrics.inc("disk_evicted_bytes_total", size)
+            print(f"[Disk] Evicted {path} ({size / 1e6:.0f} MB)")
+        return freed
+
+    def reserve(self, nbytes: int, path: Path, label: str = "Disk", timeout: float = None) -> Reservation:
+        """Set aside nbytes for a download to path, evicting leftovers or waiting as needed.
+        A reservation bigger than the whole budget is let through once nothing else is reserved
+        or pinned, so one huge video can't wait forever.
+        @param nbytes: Expected size on disk, see estimate helpers in file_manager
+        @param path: Final path of the download
+        @param timeout: Give up after this many seconds, None waits as long as it takes
+        @raise TimeoutError: If timeout passed without the space becoming free
+        """
+        nbytes = max(int(nbytes), 0)
+        started = time.perf_counter()
+        waited = False
+        with self._condition:
+            while True:
+                entries = self._entries()
+                usage, unwritten = self._usage(entries)
+                shortfall = usage + nbytes - self._limit(usage, unwritten)
+                if shortfall > 0:
+                    shortfall -= self._evict(entries, shortfall)
+                if shortfall <= 0 or not (self._reservations or self._pinned):
+                    break  # Fits, or nothing else will ever free space: let it through
+                if timeout is not None and time.perf_counter() - started >= timeout:
+                    raise TimeoutError(f"no room for {nbytes / 1e6:.0f} MB in {self.root}")
+                if not waited:
+                    waited = True
+                    print(f"[{label}] Waiting for {nbytes / 1e6:.0f} MB of disk for {path.name} "
+                          f"({usage / 1e6:.0f} MB in use)")
+                self._condition.wait(RECHECK_SECONDS)
+
+            reservation = Reservation(self, path, nbytes)
+            self._reservations.append(reservation)
+            metrics.set_gauge("disk_reserved_bytes", sum(r.nbytes for r in self._reservations))
+            metrics.set_gauge("disk_used_bytes", usage)
+        if waited:
+            metrics.observe("disk_wait_seconds", time.perf_counter() - started)
+        return reservation
+
+    def _release(self, reservation: Reservation):
+        with self._condition:
+            if reservation.path.exists():
+                self._pinned.add(self._owner(reservation.path))  # Before the reservation goes, so no gap
+            if reservation in self._reservations:
+                self._reservations.remove(reservation)
+                metrics.set_gauge("disk_reserved_bytes", sum(r.nbytes for r in self._reservations))
+            self._condition.notify_all()
+
+    def _resize(self, reservation: Reservation, nbytes: int):
+        with self._condition:
+            reservation.nbytes = max(int(nbytes), 0)
+            metrics.set_gauge("disk_reserved_bytes", sum(r.nbytes for r in self._reservations))
+            self._condition.notify_all()
+
+    def pin(self, path: Path):
+        """Keep this video's files from eviction until unpin (download done, upload still to come)."""
+        with self._condition:
+            self._pinned.add(self._owner(path))
+
+    def unpin(self, path: Path):
+        """The video is uploaded, deleted or abandoned; its files may go if space is needed."""
+        with self._condition:
+            self._pinned.discard(self._owner(path))
+            self._condition.notify_all()
+
+    def usage(self) -> dict:
+        """Current numbers, for logs and benchmarks."""
+        with self._condition:
+            entries = self._entries()
+            usage, unwritten = self._usage(entries)
+            return {
+                "used_bytes": usage,
+                "limit_bytes": self._limit(usage, unwritten),
+                "reserved_bytes": sum(r.nbytes for r in self._reservations),
+                "evictable_bytes": sum(size for _, size, _ in self._evictable(entries)),
+            }
+
+
+DISK_BUDGET = DiskBudget()
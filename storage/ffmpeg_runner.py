@@ -0,0 +1,199 @@
+# storage/ffmpeg_runner.py
+"""
+Every ffmpeg download and remux runs under one asyncio event loop in a background thread,
+so a dozen concurrent ffmpeg processes cost one thread instead of one blocked reader each.
+
+ffmpeg reports progress as key=value blocks on stdout (-progress pipe:1). The duration
+comes from the caller (e.g. the HLS playlist) or from the "Duration:" line ffmpeg prints
+when it opens the input, so there is no separate ffprobe round-trip before a download.
+Success is the exit code. Each job has a timeout, and cancelling it stops the process.
+
+    result = FFMPEG.run(["-y", "-i", url, "-c", "copy", "out.mp4"], "House")   # from any thread
+    result = await run_ffmpeg([...], "Senate", duration=3600, timeout=600)      # from a coroutine
+"""
+
+import asyncio
+import collections
+import re
+import threading
+import time
+from pipeline import metrics
+
+# ===== CONFIGURATION =====
+FFMPEG_TIMEOUT_SECONDS = 6 * 3600   # Per job; a stuck network read otherwise hangs a download forever
+KILL_GRACE_SECONDS = 5              # Between asking ffmpeg to stop and killing it
+STDERR_TAIL_LINES = 20              # Kept for the error message when ffmpeg fails
+FEED_CHUNK_BYTES = 1024 * 1024      # stdin_paths are written to ffmpeg in chunks this size
+# =========================
+
+_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_BITRATE = re.compile(r"bitrate: (\d+) kb/s")
+
+
+def _seconds(hours, minutes, seconds) -> float:
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+async def _read_progress(stream, state: dict, label: str):
+    """Parse -progress blocks: key=value lines, each block ending with progress=continue|end."""
+    last_update = 0
+    async for raw in stream:
+        key, _, value = raw.decode(errors="replace").strip().partition("=")
+        if key == "out_time_us" and value.isdigit():
+            state["out_seconds"] = int(value) / 1e6
+        elif key == "total_size" and value.isdigit():
+            state["total_size"] = int(value)
+        elif key == "progress":
+            if state["duration"]:
+                percent = min(int(state["out_seconds"] / state["duration"] * 100), 100)
+                if percent // 20 > last_update // 20:
+                    print(f"[{label}] Download progress: {percent}%")
+                    last_update = percent
+
+
+async def _read_stderr(stream, state: dict, on_header):
+    """Keep the tail for error messages, and pick the input's duration and bitrate out of the header."""
+    header_seen = False
+    async for raw in stream:
+        line = raw.decode(errors="replace").rstrip()
+        state["stderr"].append(line)
+        match = _DURATION.search(line) if not header_seen else None
+        if match:
+            header_seen = True
+            bitrate = _BITRATE.search(line)
+            state["duration"] = state["duration"] or _seconds(*match.groups())
+            state["bit_rate"] = int(bitrate.group(1)) * 1000 if bitrate else 0
+            if on_header is not None:
+                try:
+                    on_header(state["duration"], state["bit_rate"])
+                except Exception as e:
+                    print(f"[FFmpeg] on_header failed: {e}")
+
+
+async def _feed(stdin, paths: list):
+    """Write files to ffmpeg's stdin in order, e.g. HLS segments for a remux."""
+    try:
+        for path in paths:
+            with open(path, "rb") as f:
+                while chunk := f.read(FEED_CHUNK_BYTES):
+                    stdin.write(chunk)
+                    await stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # ffmpeg exited early; the exit code says why
+    finally:
+        stdin.close()
+
+
+async def _stop(process):
+    """Ask ffmpeg to stop, kill it if it doesn't."""
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+    except ProcessLookupError:
+        pass
+
+
+async def run_ffmpeg(args: list, label: str, duration: float = None, timeout: float = FFMPEG_TIMEOUT_SECONDS,
+                     on_header=None, stdin_paths: list = None) -> dict:
+    """Run one ffmpeg and follow its progress.
+    @param args: ffmpeg arguments after the global options (inputs, codecs, output)
+    @param label: House/Senate, for logs and metrics
+    @param duration: Input duration in seconds if the caller knows it, otherwise read from the header
+    @param timeout: Seconds before the process is stopped and the job reported as timed out
+    @param on_header: Called with (duration, bit_rate) once ffmpeg has opened the input
+    @param stdin_paths: Files to stream into ffmpeg's stdin, for an "-i pipe:0" input
+    @return: Dict with ok, returncode, timed_out, duration, out_seconds, total_size, error
+    @raise asyncio.CancelledError: If the job was cancelled; the process is stopped first
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-progress", "pipe:1"]
+    if not stdin_paths:
+        cmd.append("-nostdin")
+    cmd += args
+
+    state = {"duration": duration or 0.0, "bit_rate": 0, "out_seconds": 0.0, "total_size": 0,
+             "stderr": collections.deque(maxlen=STDERR_TAIL_LINES)}
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if stdin_paths else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    tasks = [
+        asyncio.create_task(_read_progress(process.stdout, state, label)),
+        asyncio.create_task(_read_stderr(process.stderr, state, on_header)),
+    ]
+    if stdin_paths:
+        tasks.append(asyncio.create_task(_feed(process.stdin, stdin_paths)))
+
+    timed_out = False
+    outcome = "failed"
+    try:
+        await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        print(f"[{label}] ffmpeg timed out after {timeout:.0f}s, stopping it")
+        await _stop(process)
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        await _stop(process)
+        raise
+    finally:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if timed_out:
+            outcome = "timeout"
+        elif process.returncode == 0:
+            outcome = "ok"
+        metrics.inc("ffmpeg_jobs_total", source=label.lower(), result=outcome)
+        metrics.observe("ffmpeg_seconds", time.perf_counter() - started, source=label.lower())
+
+    ok = process.returncode == 0 and not timed_out
+    return {
+        "ok": ok,
+        "returncode": process.returncode,
+        "timed_out": timed_out,
+        "duration": state["duration"],
+        "out_seconds": state["out_seconds"],
+        "total_size": state["total_size"],
+        "error": None if ok else "\n".join(state["stderr"]),
+    }
+
+
+class FFmpegManager:
+    """Owns the event loop thread. Threads hand it ffmpeg jobs and wait for the result;
+    the supervising (progress, stderr, stdin feeding, timeouts) all happens on the loop."""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="ffmpeg-loop", daemon=True).start()
+            return self._loop
+
+    def submit(self, args: list, label: str, **options):
+        """Start a job without waiting. Cancel the returned future to stop the process.
+        @param options: See run_ffmpeg
+        @return: concurrent.futures.Future with run_ffmpeg's result
+        """
+        return asyncio.run_coroutine_threadsafe(run_ffmpeg(args, label, **options), self._get_loop())
+
+    def run(self, args: list, label: str, **options) -> dict:
+        """Run a job and wait for it. If the waiting thread is interrupted, the process is stopped."""
+        future = self.submit(args, label, **options)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+
+FFMPEG = FFmpegManager()
@@ -1,26 +1,30 @@
 # storage/file_manager.py
 
 import requests
-import re
 from pathlib import Path
 import subprocess
-from google.cloud import storage
+from storage.gcs_uploader import upload_file
+from pipeline import metrics
+from storage.ranged_download import download_ranged, remote_size
+from storage.hls import load_media_playlist, estimate_segment_bytes, fetch_segments, remove_segments, HLS_PARALLELISM
+from storage.hls_resolver import find_senate_playlist, forget_playlist
+from storage.disk_budget import DISK_BUDGET, AUDIO_BYTES_PER_SECOND, VIDEO_BYTES_PER_SECOND
+from storage.ffmpeg_runner import FFMPEG
 
 def upload_file_to_gcs(bucket_name: str, local_path: Path, blob_path: str):
     """Uploads a file to Google Cloud Storage.
+    Uses the shared client, skips identical objects and splits large files
+    into parallel parts (see storage/gcs_uploader.py).
     @param bucket_name: Name of the GCS bucket
     @param local_path: Local file path to upload
     @param blob_path: Destination path in the bucket"""
 
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_path)
-    blob.upload_from_filename(str(local_path))
-    print(f"[Uploaded] {local_path.name} → gs://{bucket_name}/{blob_path}")
+    upload_file(bucket_name, local_path, blob_path)
 
 def get_video_duration(url: str) -> float:
     """Returns the duration of a video in seconds using ffprobe.
-       Used to log download progress.   
+       Used to check a finished download (downloads take the duration from
+       the playlist or ffmpeg's own header instead).
        @param url: URL of the video to check duration.
        @return: Duration in seconds."""
     
@@ -38,95 +42,232 @@ def get_video_duration(url: str) -> float:
         return 0.0
 
 
-def run_ffmpeg_with_progress(cmd, duration: float, label: str):
-    """Run ffmpeg command and log progress at 20% intervals.
-    @param cmd: ffmpeg command to run.
-    @param duration: Total duration of the video in seconds.
-    @param label: House/Senate
+def partial_path(output_path: Path) -> Path:
+    """Where a download is written until it is complete. Keeps the real extension
+    last so ffmpeg still knows which container to write (video.part.mp4)."""
+    return output_path.with_name(f"{output_path.stem}.part{output_path.suffix}")
+
+
+def verify_media(path: Path, expected_duration: float, label: str) -> bool:
+    """Check a finished download is playable and as long as the source.
+    @param path: Local file
+    @param expected_duration: Source duration in seconds, 0 if unknown
+    @return: True if it looks complete
     """
-    process = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True)
-    last_update = 0
-
-    for line in process.stderr:
-        if "time=" in line and duration > 0:
-            match = re.search(r"time=(\d+):(\d+):(\d+\.\d+)", line)
-            if match:
-                hours, minutes, seconds = map(float, match.groups())
-                elapsed = hours * 3600 + minutes * 60 + seconds
-                percent = int((elapsed / duration) * 100)
-
-                if percent // 20 > last_update // 20:
-                    print(f"[{label}] Download progress: {percent}%")
-                    last_update = percent
-
-    process.wait()
-    if process.returncode == 0:
-        print(f"[{label}] Download complete")
-    else:
-        print(f"[{label}] ffmpeg failed")
+    duration = get_video_duration(str(path))
+    if duration <= 0:
+        print(f"[{label}] {path.name} has no readable duration, treating it as incomplete")
+        return False
+    if expected_duration > 0 and duration < expected_duration - max(5.0, expected_duration * 0.01):
+        print(f"[{label}] {path.name} is {duration:.0f}s but the source is {expected_duration:.0f}s")
+        return False
+    return True
 
 
-def download_video_with_progress(source_url: str, output_path: Path, label: str):
-    """Common video download function with progress logging.
-    @param source_url: URL of the video to download.
-    @param output_path: Path to save the downloaded video.
-    @param label: House/ Senate
-    @return: Path to the downloaded video file."""
+def _download_with_ffmpeg(source_url: str, output_path: Path, label: str, codec_args: list,
+                          bytes_per_second: float = None, duration: float = None):
+    """Run one ffmpeg download into a partial file and give it its real name only
+    if ffmpeg succeeded and the result checks out. A crash can no longer leave
+    something at output_path that looks finished.
+    Disk for duration x bitrate is reserved (see storage/disk_budget.py): up front when the
+    duration is known, otherwise as soon as ffmpeg has read it from the container header.
+    @param bytes_per_second: Output bitrate if known (e.g. WAV), otherwise the source's
+    @param duration: Source duration if known (e.g. from the HLS playlist)
+    @return: output_path, or None on failure"""
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     if output_path.exists():
-        print(f"[{label}] Video already exists: {output_path.name}")
+        print(f"[{label}] Already exists: {output_path.name}")
         return output_path
 
-    duration = get_video_duration(source_url)
-    cmd = [
-        "ffmpeg",
+    part = partial_path(output_path)
+    args = [
         "-y",
         "-i", source_url,
-        "-c", "copy",
-        str(output_path)
+        *codec_args,
+        str(part)
     ]
 
-    run_ffmpeg_with_progress(cmd, duration, label)
+    estimate = duration * (bytes_per_second or VIDEO_BYTES_PER_SECOND) if duration else 0
+    with DISK_BUDGET.reserve(estimate, output_path, label) as reservation:
+        def on_header(found_duration, bit_rate):
+            if not estimate and found_duration:
+                reservation.resize(found_duration * (bytes_per_second or bit_rate / 8 or VIDEO_BYTES_PER_SECOND))
+
+        with metrics.timer("download_seconds", source=label.lower(), method="ffmpeg"):
+            result = FFMPEG.run(args, label, duration=duration, on_header=on_header)
+        if result["ok"]:
+            print(f"[{label}] Download complete")
+        else:
+            print(f"[{label}] ffmpeg failed (exit code {result['returncode']}): {(result['error'] or '')[-500:]}")
+        if not result["ok"] or not verify_media(part, result["duration"], label):
+            part.unlink(missing_ok=True)
+            metrics.inc("download_failures_total", source=label.lower(), method="ffmpeg")
+            return None
+
+        metrics.inc("download_bytes_total", part.stat().st_size, source=label.lower(), method="ffmpeg")
+        part.rename(output_path)
     return output_path
 
 
-def download_house_video_ffmpeg(url, destination):
-    """Download a House video using ffmpeg.
+def download_video_with_progress(source_url: str, output_path: Path, label: str, duration: float = None):
+    """Common video download function with progress logging.
+    @param source_url: URL of the video to download.
+    @param output_path: Path to save the downloaded video.
+    @param label: House/ Senate
+    @param duration: Source duration if already known, otherwise ffmpeg reports it
+    @return: Path to the downloaded video file, or None if it failed."""
+
+    return _download_with_ffmpeg(source_url, output_path, label, ["-c", "copy"], duration=duration)
+
+
+def download_audio_with_progress(source_url: str, output_path: Path, label: str, duration: float = None):
+    """Like download_video_with_progress, but ffmpeg drops the video stream and
+    writes 16 kHz mono PCM, which is exactly what Whisper decodes to anyway.
+    About 115 MB per hour instead of several GB of 1080p video.
+    @param source_url: URL of the video/stream to pull audio from.
+    @param output_path: Path to save the audio (.wav).
+    @param label: House/ Senate
+    @param duration: Source duration if already known, otherwise ffmpeg reports it
+    @return: Path to the audio file, or None if it failed."""
+
+    return _download_with_ffmpeg(source_url, output_path, label,
+                                 ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le"],
+                                 bytes_per_second=AUDIO_BYTES_PER_SECOND, duration=duration)
+
+
+def download_house_video_ffmpeg(url, destination, audio_only: bool = False):
+    """Download a House video. The full MP4 is fetched with resumable, multi-connection
+    Range requests and checked with ffprobe before it gets its final name.
+    Its Content-Length is reserved on disk first (see storage/disk_budget.py).
+    Audio-only goes through ffmpeg, which only keeps the audio track.
     @param url: The URL of the House video.
     @param destination: Path to save the downloaded video.
-    @return: Path to the downloaded video file.
+    @param audio_only: Only keep 16 kHz mono audio (destination should end in .wav)
+    @return: Path to the downloaded video file, or None if it failed.
     """
-    return download_video_with_progress(url, destination, label="House")
+    if audio_only:
+        return download_audio_with_progress(url, destination, label="House")
+
+    if destination.exists():
+        print(f"[House] Video already exists: {destination.name}")
+        return destination
 
+    size = remote_size(url) or 0
+    with DISK_BUDGET.reserve(size, destination, "House"):
+        # Download under a partial name, verify, then rename: only a checked file ever has the real name
+        staged = download_ranged(url, partial_path(destination), label="House")
+        if staged is None:
+            return None
+        if not verify_media(staged, 0, "House"):
+            staged.unlink(missing_ok=True)
+            return None
+        staged.rename(destination)
+    return destination
 
-def download_senate_video_ffmpeg(video_id: str, output_dir: Path) -> Path:
+
+def remux_segments(segment_paths: list, output_path: Path, label: str, audio_only: bool = False,
+                   duration: float = None) -> bool:
+    """Feed downloaded HLS segments through one ffmpeg process, in order, on stdin.
+    TS (and fMP4 after its init segment) can be concatenated byte for byte,
+    so this needs no joined copy on disk.
+    @param segment_paths: Segment files in playback order
+    @param output_path: Final .mp4 (or .wav for audio_only)
+    @param label: House/Senate
+    @param audio_only: Write 16 kHz mono PCM instead of copying streams
+    @param duration: Playlist duration, for progress
+    @return: True if ffmpeg succeeded
+    """
+    if audio_only:
+        codec = ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le"]
+    else:
+        codec = ["-c", "copy", "-bsf:a", "aac_adtstoasc"]
+    args = ["-y", "-i", "pipe:0", *codec, str(output_path)]
+
+    result = FFMPEG.run(args, label, duration=duration, stdin_paths=segment_paths)
+    if result["ok"]:
+        print(f"[{label}] Download complete")
+        return True
+    print(f"[{label}] ffmpeg failed (exit code {result['returncode']}): {(result['error'] or '')[-500:]}")
+    return False
+
+
+def download_senate_hls_parallel(m3u8_url: str, output_path: Path, audio_only: bool = False) -> Path:
+    """Download a Senate HLS stream segment by segment over several connections, then remux once.
+    An interrupted download resumes from the segments already on disk.
+    @return: Path to the file, or None if this playlist can't be done this way
+    @raise IOError: If segments or the remux failed. Finished segments are kept for a resume.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_path.exists():
+        print(f"[Senate] Already exists: {output_path.name}")
+        return output_path
+
+    work_dir = output_path.with_name(output_path.name + ".segments")
+    playlist = load_media_playlist(m3u8_url, work_dir)
+    if playlist["encrypted"] or not playlist["segments"]:
+        return None
+
+    # Segments and the remuxed file are on disk together until the segments are removed
+    segment_bytes = estimate_segment_bytes(playlist)
+    output_bytes = playlist["duration"] * AUDIO_BYTES_PER_SECOND if audio_only else segment_bytes
+    with DISK_BUDGET.reserve(segment_bytes + output_bytes, output_path, "Senate"):
+        fetched = fetch_segments(m3u8_url, work_dir, label="Senate", parallelism=HLS_PARALLELISM)
+        if fetched is None:
+            return None
+
+        segment_paths, duration = fetched
+        part = partial_path(output_path)
+        if not remux_segments(segment_paths, part, "Senate", audio_only=audio_only, duration=duration) \
+                or not verify_media(part, duration, "Senate"):
+            part.unlink(missing_ok=True)
+            raise IOError(f"remux of {work_dir.name} failed")
+
+        part.rename(output_path)
+        remove_segments(work_dir)
+    return output_path
+
+
+def download_senate_video_ffmpeg(video_id: str, output_dir: Path, audio_only: bool = False) -> Path:
     """Download a Senate video using ffmpeg. Has more setup than House.
     @param video_id: The unique ID of the Senate video.
     @param output_dir: Directory to save the downloaded video.
+    @param audio_only: Take the lightest rendition and only keep 16 kHz mono audio
     @return: Path to the downloaded video file.
     """
 
-    # Try both possible m3u8 paths
-    patterns = [
-        f"https://dlttx48mxf9m3.cloudfront.net/outputs/{video_id}/Default/HLS/out1080p.m3u8",
-        f"https://dlttx48mxf9m3.cloudfront.net/outputs/{video_id}/Default/HLS/1080p.m3u8"
-    ]
-
-    m3u8_url = None
-    for url in patterns:
-        try:
-            resp = requests.head(url, timeout=5)
-            if resp.status_code == 200:
-                m3u8_url = url
-                break
-        except requests.RequestException:
-            continue
-
+    m3u8_url = find_senate_playlist(video_id, "audio" if audio_only else "highest")
     if not m3u8_url:
         print(f"[Senate] Could not find a valid m3u8 for video {video_id}")
         return None
+    path = _download_senate_playlist(m3u8_url, video_id, output_dir, audio_only)
+    if path is None:
+        forget_playlist(video_id)  # In case the cached URL went stale; the next attempt resolves again
+    return path
+
+
+def _download_senate_playlist(m3u8_url: str, video_id: str, output_dir: Path, audio_only: bool) -> Path:
+    """Segments in parallel when we can, otherwise one ffmpeg. @return: Path, or None on failure"""
+    output_path = output_dir / f"{video_id}.wav" if audio_only else output_dir / f"{video_id}.mp4"
+
+    if HLS_PARALLELISM > 1:
+        try:
+            path = download_senate_hls_parallel(m3u8_url, output_path, audio_only=audio_only)
+        except IOError as e:
+            # Don't start over with ffmpeg: the next attempt resumes from the segments we have
+            print(f"[Senate] Download of {video_id} failed, will resume next run: {e}")
+            return None
+        if path is not None:
+            return path
+        print(f"[Senate] Parallel segment download unavailable for {video_id}, falling back to ffmpeg")
+
+    # The playlist already says how long the video is, so ffmpeg needs no probe first
+    try:
+        duration = load_media_playlist(m3u8_url)["duration"]
+    except requests.RequestException:
+        duration = None
 
-    output_path = output_dir / f"{video_id}.mp4"
-    return download_video_with_progress(m3u8_url, output_path, label="Senate")
\ No newline at end of file
+    if audio_only:
+        return download_audio_with_progress(m3u8_url, output_path, label="Senate", duration=duration)
+    return download_video_with_progress(m3u8_url, output_path, label="Senate", duration=duration)
\ No newline at end of file
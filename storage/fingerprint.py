@@ -0,0 +1,25 @@
+# storage/fingerprint.py
+
+import hashlib
+from pathlib import Path
+
+# Bytes hashed from each end of the file. Together with the size this tells recordings
+# apart reliably without reading multi-GB files end to end.
+FINGERPRINT_BYTES = 4 * 1024 * 1024
+
+
+def content_fingerprint(path: Path) -> str:
+    """Fingerprint of a downloaded file: SHA-256 over its size, first and last FINGERPRINT_BYTES.
+    The same recording listed twice (two House committees, a new Senate _id, a rename)
+    downloads to the same bytes and gets the same fingerprint.
+    @param path: Local file
+    @return: Hex digest
+    """
+    size = path.stat().st_size
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
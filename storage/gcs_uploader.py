@@ -0,0 +1,159 @@
+# storage/gcs_uploader.py
+
+import base64
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import google_crc32c
+from google.cloud import storage
+from pipeline import metrics
+
+# ===== CONFIGURATION =====
+PARALLEL_THRESHOLD = 64 * 1024 * 1024   # Files at least this big are uploaded as parallel parts
+MIN_PART_SIZE = 32 * 1024 * 1024
+MAX_PARTS = 32                          # GCS compose takes at most 32 sources per call
+PART_WORKERS = 8                        # Parts uploaded at once
+# =========================
+
+# storage.Client() does auth and sets up a connection pool, so build it once per process.
+# Set STORAGE_EMULATOR_HOST to point it at a local emulator or fake instead of GCS.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_storage_client() -> storage.Client:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = storage.Client()
+        return _client
+
+
+def file_crc32c(path: Path, offset: int = 0, length: int = None) -> str:
+    """CRC32C of a file (or a slice of it), base64 like GCS reports it."""
+    checksum = google_crc32c.Checksum()
+    remaining = length if length is not None else path.stat().st_size - offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            checksum.update(chunk)
+            remaining -= len(chunk)
+    return base64.b64encode(checksum.digest()).decode()
+
+
+def _already_uploaded(bucket, blob_path: str, crc32c: str) -> bool:
+    """Same content already at blob_path? CRC32C works for composite objects too, MD5 doesn't."""
+    existing = bucket.get_blob(blob_path)
+    return existing is not None and existing.crc32c == crc32c
+
+
+def _plan_parts(size: int) -> list:
+    """(offset, length) per part. Depends only on size, so a restarted upload names its parts the same way."""
+    part_size = max(MIN_PART_SIZE, math.ceil(size / MAX_PARTS))
+    return [(offset, min(part_size, size - offset)) for offset in range(0, size, part_size)]
+
+
+def _upload_part(bucket, local_path: Path, part_name: str, offset: int, length: int):
+    """Upload one slice as its own object, unless an earlier run already did."""
+    crc32c = file_crc32c(local_path, offset, length)
+    if _already_uploaded(bucket, part_name, crc32c):
+        return False
+
+    blob = bucket.blob(part_name)
+    with open(local_path, "rb") as f:
+        f.seek(offset)
+        blob.upload_from_file(f, size=length, checksum="crc32c")
+    return True
+
+
+def _upload_composite(bucket, local_path: Path, blob_path: str, size: int):
+    """Parallel composite upload: slices go up as separate objects at the same time, then
+    GCS composes them into blob_path server-side. Parts that finished before a crash or
+    restart are found by name and checksum and not sent again, so a restart only redoes
+    the parts that were in flight."""
+    parts = _plan_parts(size)
+    names = [f"{blob_path}.parts/{index:02d}-of-{len(parts):02d}" for index in range(len(parts))]
+
+    with ThreadPoolExecutor(max_workers=PART_WORKERS) as pool:
+        futures = [
+            pool.submit(_upload_part, bucket, local_path, name, offset, length)
+            for name, (offset, length) in zip(names, parts)
+        ]
+        sent = sum(1 for future in futures if future.result())
+    if sent < len(parts):
+        print(f"[Upload] {local_path.name}: reused {len(parts) - sent} of {len(parts)} parts from an earlier attempt")
+
+    destination = bucket.blob(blob_path)
+    destination.compose([bucket.blob(name) for name in names])
+    bucket.delete_blobs([bucket.blob(name) for name in names], on_error=lambda blob: None)
+    return destination
+
+
+def upload_file(bucket_name: str, local_path: Path, blob_path: str) -> bool:
+    """Upload a file to GCS unless an identical object is already there.
+    @param bucket_name: Name of the GCS bucket
+    @param local_path: Local file path to upload
+    @param blob_path: Destination path in the bucket
+    @return: True if uploaded, False if skipped as identical
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    size = local_path.stat().st_size
+    crc32c = file_crc32c(local_path)
+
+    if _already_uploaded(bucket, blob_path, crc32c):
+        print(f"[Upload] Skipped, identical object exists: gs://{bucket_name}/{blob_path}")
+        metrics.inc("upload_skipped_total")
+        return False
+
+    started = time.perf_counter()
+    if size >= PARALLEL_THRESHOLD:
+        blob = _upload_composite(bucket, local_path, blob_path, size)
+        blob.reload()
+        if blob.crc32c != crc32c:
+            raise IOError(f"checksum mismatch after composing gs://{bucket_name}/{blob_path}")
+    else:
+        bucket.blob(blob_path).upload_from_filename(str(local_path), checksum="crc32c")
+
+    elapsed = time.perf_counter() - started
+    method = "composite" if size >= PARALLEL_THRESHOLD else "single"
+    metrics.inc("upload_bytes_total", size, method=method)
+    metrics.observe("upload_seconds", elapsed, method=method)
+    print(f"[Uploaded] {local_path.name} → gs://{bucket_name}/{blob_path} "
+          f"({size / 1e6:.1f} MB, {size / 1e6 / max(elapsed, 0.001):.1f} MB/s)")
+    return True
+
+
+def upload_files(bucket_name: str, uploads: list) -> list:
+    """Upload several files at the same time (e.g. a video and its transcript).
+    @param bucket_name: Name of the GCS bucket
+    @param uploads: List of (local_path, blob_path)
+    @return: upload_file's result per file, in order. Raises the first failure.
+    """
+    if len(uploads) == 1:
+        return [upload_file(bucket_name, *uploads[0])]
+
+    with ThreadPoolExecutor(max_workers=len(uploads)) as pool:
+        futures = [pool.submit(upload_file, bucket_name, local_path, blob_path) for local_path, blob_path in uploads]
+        return [future.result() for future in futures]
+
+
+def copy_object(bucket_name: str, source_blob: str, blob_path: str) -> bool:
+    """Server-side copy inside the bucket, nothing goes through this machine.
+    Used to link a duplicate recording to what we already uploaded.
+    @return: True if copied, False if the source is gone
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    source = bucket.get_blob(source_blob)
+    if source is None:
+        return False
+    if _already_uploaded(bucket, blob_path, source.crc32c):
+        return True
+    bucket.copy_blob(source, bucket, blob_path)
+    metrics.inc("upload_server_copies_total")
+    print(f"[Linked] gs://{bucket_name}/{source_blob} → gs://{bucket_name}/{blob_path}")
+    return True
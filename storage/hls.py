@@ -0,0 +1,241 @@
+# storage/hls.py
+
+import re
+import shutil
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+from fetcher.http_client import get_client
+from pipeline import metrics
+
+# Senate HLS segments fetched at once. 1 hands the playlist to a single ffmpeg instead.
+HLS_PARALLELISM = 8
+
+
+def parse_master_playlist(text: str, base_url: str) -> list:
+    """Read the variants out of an HLS master playlist.
+    @param text: Playlist contents
+    @param base_url: URL of the playlist, relative URIs are resolved against it
+    @return: List of dicts with url, bandwidth, resolution and audio_only
+    """
+    variants = []
+    pending = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            attrs = _parse_attributes(line.split(":", 1)[1])
+            pending = {
+                "bandwidth": int(attrs.get("BANDWIDTH", 0)),
+                "resolution": attrs.get("RESOLUTION"),
+                # A variant without a resolution whose codecs are all audio (mp4a) carries no video
+                "audio_only": "RESOLUTION" not in attrs and all(
+                    c.strip().startswith("mp4a") for c in attrs.get("CODECS", "video").split(",")
+                ),
+            }
+        elif line.startswith("#EXT-X-MEDIA:"):
+            attrs = _parse_attributes(line.split(":", 1)[1])
+            if attrs.get("TYPE") == "AUDIO" and "URI" in attrs:
+                variants.append({
+                    "url": urljoin(base_url, attrs["URI"]),
+                    "bandwidth": 0,
+                    "resolution": None,
+                    "audio_only": True,
+                })
+        elif line and not line.startswith("#") and pending is not None:
+            pending["url"] = urljoin(base_url, line)
+            variants.append(pending)
+            pending = None
+
+    return variants
+
+
+def _parse_attributes(attr_text: str) -> dict:
+    """BANDWIDTH=123,CODECS="avc1,mp4a" -> {"BANDWIDTH": "123", "CODECS": "avc1,mp4a"}"""
+    return {key: value.strip('"') for key, value in re.findall(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)', attr_text)}
+
+
+def pick_variant(variants: list, policy: str = "highest") -> dict:
+    """Choose a rendition.
+    @param variants: Output of parse_master_playlist
+    @param policy: "highest", "lowest", or "audio" (audio-only if there is one, otherwise lowest)
+    @return: The chosen variant, or None if there are none
+    """
+    if not variants:
+        return None
+    if policy == "audio":
+        audio = [v for v in variants if v["audio_only"]]
+        if audio:
+            return audio[0]
+        policy = "lowest"
+
+    video = [v for v in variants if not v["audio_only"]] or variants
+    if policy == "lowest":
+        return min(video, key=lambda v: v["bandwidth"])
+    return max(video, key=lambda v: v["bandwidth"])
+
+
+def parse_media_playlist(text: str, base_url: str) -> dict:
+    """Read the segments out of an HLS media playlist.
+    @param text: Playlist contents
+    @param base_url: URL of the playlist, relative URIs are resolved against it
+    @return: Dict with segments (list of {url, duration}), init (fMP4 header URL or None),
+             duration (seconds) and encrypted
+    """
+    segments = []
+    init = None
+    encrypted = False
+    duration = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXTINF:"):
+            duration = float(line.split(":", 1)[1].split(",")[0] or 0)
+        elif line.startswith("#EXT-X-MAP:"):
+            init = urljoin(base_url, _parse_attributes(line.split(":", 1)[1])["URI"])
+        elif line.startswith("#EXT-X-KEY:"):
+            encrypted = encrypted or _parse_attributes(line.split(":", 1)[1]).get("METHOD", "NONE") != "NONE"
+        elif line and not line.startswith("#"):
+            segments.append({"url": urljoin(base_url, line), "duration": duration or 0.0})
+            duration = None
+
+    return {
+        "segments": segments,
+        "init": init,
+        "duration": sum(s["duration"] for s in segments),
+        "encrypted": encrypted,
+    }
+
+
+def _fetch_one(url: str, target: Path) -> int:
+    """Download one segment to a .part file and rename it when complete.
+    The rename is the checkpoint: any file without .part is a finished segment."""
+    if target.exists():
+        return target.stat().st_size
+
+    part = target.with_name(target.name + ".part")
+    response = get_client().get(url, stream=True)
+    response.raise_for_status()
+    expected = response.headers.get("Content-Length")
+
+    written = 0
+    with open(part, "wb") as f:
+        for chunk in response.iter_content(chunk_size=1024 * 256):
+            f.write(chunk)
+            written += len(chunk)
+
+    if expected is not None and written != int(expected):
+        raise IOError(f"short read on {url}: {written} of {expected} bytes")
+    part.rename(target)
+    return written
+
+
+def load_media_playlist(playlist_url: str, work_dir: Path = None) -> dict:
+    """Fetch and parse a media playlist, keeping a copy in work_dir if given.
+    VOD playlists don't change, so a resume uses the copy we started with.
+    @return: See parse_media_playlist
+    """
+    saved_playlist = work_dir / "playlist.m3u8" if work_dir else None
+    if saved_playlist and saved_playlist.exists():
+        text = saved_playlist.read_text()
+    else:
+        response = get_client().get(playlist_url)
+        response.raise_for_status()
+        text = response.text
+        if saved_playlist:
+            work_dir.mkdir(parents=True, exist_ok=True)
+            saved_playlist.write_text(text)
+    return parse_media_playlist(text, playlist_url)
+
+
+def estimate_segment_bytes(playlist: dict) -> int:
+    """Size of all segments, extrapolated from the first one's Content-Length.
+    @param playlist: Output of parse_media_playlist
+    @return: Estimated bytes, 0 if the first segment gives nothing to go on
+    """
+    first = playlist["segments"][0] if playlist["segments"] else None
+    if not first or not first["duration"]:
+        return 0
+    try:
+        response = get_client().head(first["url"], allow_redirects=True)
+        length = int(response.headers.get("Content-Length", 0))
+    except Exception:
+        return 0
+    return int(length / first["duration"] * playlist["duration"])
+
+
+def fetch_segments(playlist_url: str, work_dir: Path, label: str, parallelism: int = HLS_PARALLELISM):
+    """Download every segment of a media playlist concurrently into work_dir.
+    Finished segments are kept, so calling this again after a failure only fetches what's missing.
+    @param playlist_url: Media playlist (.m3u8) URL
+    @param work_dir: Where segments and the playlist are kept until remuxed
+    @param label: House/Senate
+    @param parallelism: Segments in flight at once
+    @return: (list of segment paths in playback order, total duration), or None if
+             the playlist can't be fetched this way (encrypted, empty)
+    @raise IOError: If some segments failed. The rest are kept for the next attempt.
+    """
+    playlist = load_media_playlist(playlist_url, work_dir)
+    if playlist["encrypted"] or not playlist["segments"]:
+        return None
+
+    # Keep the original extension (.ts, .aac, .m4s) so the checkpoint directory is easy to inspect
+    jobs = []
+    if playlist["init"]:
+        jobs.append((playlist["init"], work_dir / f"init{_extension(playlist['init'])}"))
+    for index, segment in enumerate(playlist["segments"]):
+        jobs.append((segment["url"], work_dir / f"{index:06d}{_extension(segment['url'])}"))
+
+    pending = [(url, path) for url, path in jobs if not path.exists()]
+    if len(pending) < len(jobs):
+        print(f"[{label}] Resuming: {len(jobs) - len(pending)} of {len(jobs)} segments already downloaded")
+
+    started = time.perf_counter()
+    done = 0
+    total_bytes = 0
+    failures = []
+    last_update = 0
+
+    # Chunk the work so progress can be logged between batches
+    batch = parallelism * 4
+    for offset in range(0, len(pending), batch):
+        window = pending[offset:offset + batch]
+        results = get_client().map(lambda job: _fetch_one(*job), window, workers=parallelism)
+        for (url, _), result in zip(window, results):
+            if isinstance(result, Exception):
+                failures.append((url, result))
+            else:
+                total_bytes += result
+                done += 1
+
+        percent = int((len(jobs) - len(pending) + done) / len(jobs) * 100)
+        if percent // 20 > last_update // 20:
+            print(f"[{label}] Download progress: {percent}%")
+            last_update = percent
+
+    elapsed = time.perf_counter() - started
+    source = label.lower()
+    metrics.inc("download_bytes_total", total_bytes, source=source, method="hls")
+    metrics.inc("hls_segments_total", done, source=source, result="ok")
+    metrics.observe("download_seconds", elapsed, source=source, method="hls")
+
+    if failures:
+        metrics.inc("hls_segments_total", len(failures), source=source, result="failed")
+        url, error = failures[0]
+        raise IOError(f"{len(failures)} segments failed (first: {url}: {error})")
+
+    if elapsed > 0 and total_bytes:
+        print(f"[{label}] Fetched {total_bytes / 1e6:.0f} MB in {elapsed:.0f}s "
+              f"({total_bytes / 1e6 / elapsed:.1f} MB/s, {parallelism} connections)")
+
+    return [path for _, path in jobs], playlist["duration"]
+
+
+def _extension(url: str) -> str:
+    suffix = Path(url.split("?", 1)[0]).suffix
+    return suffix if re.fullmatch(r"\.[A-Za-z0-9]{1,5}", suffix or "") else ".ts"
+
+
+def remove_segments(work_dir: Path):
+    """Drop the segment checkpoint once the remuxed file is in place."""
+    shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,98 @@
+# storage/hls_resolver.py
+"""
+Which playlist to download for a Senate video.
+
+The master playlist (out.m3u8) lists every rendition, so we read it once and pick by
+policy. Outputs without a master playlist are found by probing the known rendition
+names, all at once. Whatever we find goes into the hls_playlists table of state.db,
+so a retry, a re-run or the download stage after a backfill prefetch never probes again.
+"""
+
+import requests
+from fetcher.http_client import get_client
+from pipeline import metrics
+from storage.hls import parse_master_playlist, pick_variant
+from storage.state_tracker import get_playlist, get_playlists, record_playlist, forget_playlist
+
+SENATE_CDN_URL = "https://dlttx48mxf9m3.cloudfront.net"  # Where the Senate HLS outputs live
+RENDITIONS = ("1080p", "720p", "480p", "360p")            # Highest first
+RESOLVE_WORKERS = 8                                       # Videos resolved at once by resolve_playlists
+PROBE_TIMEOUT = 5
+
+
+def _base(video_id: str) -> str:
+    return f"{SENATE_CDN_URL}/outputs/{video_id}/Default/HLS"
+
+
+def _from_master(video_id: str, policy: str) -> str:
+    master_url = f"{_base(video_id)}/out.m3u8"
+    try:
+        resp = get_client().get(master_url, timeout=PROBE_TIMEOUT)
+    except requests.RequestException:
+        return None
+    if resp.status_code != 200:
+        return None
+    variant = pick_variant(parse_master_playlist(resp.text, master_url), policy)
+    return variant["url"] if variant else None
+
+
+def _from_probes(video_id: str, policy: str) -> str:
+    """HEAD every known rendition name in parallel and pick by policy among the ones that exist."""
+    candidates = [f"{_base(video_id)}/{prefix}{rendition}.m3u8"
+                  for rendition in RENDITIONS for prefix in ("out", "")]
+
+    def exists(url):
+        return get_client().head(url, timeout=PROBE_TIMEOUT).status_code == 200
+
+    found = [url for url, ok in zip(candidates, get_client().map(exists, candidates, workers=len(candidates)))
+             if ok is True]
+    if not found:
+        return None
+    # No bandwidth to go on, so rendition order stands in for it; audio-only has no name, lowest is closest
+    return found[0] if policy == "highest" else found[-1]
+
+
+def find_senate_playlist(video_id: str, policy: str = "highest", refresh: bool = False) -> str:
+    """Find the m3u8 to download for a Senate video.
+    @param video_id: The unique ID of the Senate video.
+    @param policy: Rendition to pick, see pick_variant: "highest", "lowest" or "audio"
+    @param refresh: Ignore the cache, e.g. when the cached URL stopped working
+    @return: m3u8 URL, or None if nothing was found
+    """
+    if not refresh:
+        cached = get_playlist(video_id, policy)
+        if cached:
+            metrics.inc("hls_playlist_lookups_total", result="cached")
+            return cached
+
+    url = _from_master(video_id, policy)
+    result = "master"
+    if url is None:
+        url = _from_probes(video_id, policy)
+        result = "probe"
+
+    if url is None:
+        metrics.inc("hls_playlist_lookups_total", result="missing")
+        return None  # Not cached: the output may simply not exist yet
+    metrics.inc("hls_playlist_lookups_total", result=result)
+    record_playlist(video_id, policy, url)
+    return url
+
+
+def resolve_playlists(video_ids: list, policy: str = "highest", workers: int = RESOLVE_WORKERS) -> dict:
+    """Resolve many videos in parallel ahead of downloading them, e.g. before a backfill.
+    Cached ones cost nothing; the rest go RESOLVE_WORKERS at a time.
+    @return: {video_id: url or None}
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    resolved = get_playlists(video_ids, policy)
+    missing = [video_id for video_id in video_ids if video_id not in resolved]
+    if missing:
+        print(f"[Senate] Resolving {len(missing)} playlists ({len(resolved)} cached)...")
+        results = get_client().map(lambda video_id: find_senate_playlist(video_id, policy), missing, workers=workers)
+        for video_id, url in zip(missing, results):
+            resolved[video_id] = None if isinstance(url, Exception) else url
+    return {video_id: resolved.get(video_id) for video_id in video_ids}
+
+
+__all__ = ["SENATE_CDN_URL", "find_senate_playlist", "resolve_playlists", "forget_playlist"]
@@ -0,0 +1,182 @@
+# storage/ranged_download.py
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from fetcher.http_client import get_client
+from pipeline import metrics
+
+RANGE_CONNECTIONS = 4                   # Parallel ranged GETs for one large file
+MIN_SPLIT_BYTES = 64 * 1024 * 1024      # Smaller files use one connection
+CHECKPOINT_EVERY_BYTES = 8 * 1024 * 1024
+
+
+def _probe(url: str) -> dict:
+    """HEAD the file for its size, validator and whether ranges are allowed."""
+    response = get_client().head(url, allow_redirects=True)
+    response.raise_for_status()
+    length = response.headers.get("Content-Length")
+    return {
+        "size": int(length) if length is not None else None,
+        "etag": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+        "ranges": response.headers.get("Accept-Ranges", "").lower() == "bytes",
+    }
+
+
+def remote_size(url: str) -> int:
+    """Content-Length of a file, or None if the server doesn't say or can't be reached."""
+    try:
+        return _probe(url)["size"]
+    except Exception:
+        return None
+
+
+def _plan(size: int, connections: int) -> list:
+    """Split [0, size) into [start, end, done] ranges, end inclusive like the Range header.
+    An empty file has no ranges."""
+    if size <= 0:
+        return []
+    count = connections if size >= MIN_SPLIT_BYTES else 1
+    step = -(-size // count)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+
+def download_ranged(url: str, output_path: Path, label: str, connections: int = RANGE_CONNECTIONS) -> Path:
+    """Download a file with HTTP Range requests into output_path + ".part".
+    Progress per range is checkpointed next to it (".part.json"), so after a crash or
+    network blip the next call resumes at the last byte written instead of starting over.
+    Large files are fetched over several connections at once. The file only gets its
+    real name once its size matches Content-Length.
+    @param url: File URL
+    @param output_path: Final path
+    @param label: House/Senate
+    @param connections: Ranged GETs in flight for large files
+    @return: output_path, or None if the download failed (what we have is kept for a resume)
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    part = output_path.with_name(output_path.name + ".part")
+    checkpoint = output_path.with_name(output_path.name + ".part.json")
+
+    try:
+        remote = _probe(url)
+    except Exception as e:
+        print(f"[{label}] Could not reach {url}: {e}")
+        return None
+
+    if remote["size"] is None or not remote["ranges"]:
+        # No way to resume; fetch it in one go but still only rename when complete
+        return _download_whole(url, output_path, part, label)
+
+    if remote["size"] == 0:
+        part.touch()
+        part.rename(output_path)
+        checkpoint.unlink(missing_ok=True)
+        print(f"[{label}] Download complete: {output_path.name} is empty")
+        return output_path
+
+    state = None
+    if checkpoint.exists() and part.exists():
+        try:
+            saved = json.loads(checkpoint.read_text())
+            if saved["size"] == remote["size"] and saved["etag"] == remote["etag"]:
+                state = saved
+        except (json.JSONDecodeError, KeyError):
+            pass
+
+    if state is None:
+        state = {"url": url, "size": remote["size"], "etag": remote["etag"], "ranges": _plan(remote["size"], connections)}
+        with open(part, "wb") as f:
+            f.truncate(remote["size"])
+        checkpoint.write_text(json.dumps(state))
+    else:
+        have = sum(r[2] for r in state["ranges"])
+        print(f"[{label}] Resuming {output_path.name} at {have / remote['size'] * 100:.0f}%")
+
+    lock = threading.Lock()
+    started = time.perf_counter()
+    fetched = [0]
+
+    def fetch_range(rng):
+        start, end, done = rng
+        if start + done > end:
+            return
+        response = get_client().get(url, headers={"Range": f"bytes={start + done}-{end}"}, stream=True)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError(f"server ignored Range header (HTTP {response.status_code})")
+
+        fd = os.open(part, os.O_WRONLY)
+        position = start + done  # Next byte to write
+
+        def save():
+            """Checkpoint this range's progress only once its bytes are on disk. rng[2] only
+            ever holds synced progress, so no range can claim bytes a crash would lose."""
+            os.fsync(fd)
+            with lock:
+                rng[2] = position - start
+                checkpoint.write_text(json.dumps(state))
+
+        since_checkpoint = 0
+        try:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                os.pwrite(fd, chunk, position)
+                position += len(chunk)
+                with lock:
+                    fetched[0] += len(chunk)
+                since_checkpoint += len(chunk)
+                if since_checkpoint >= CHECKPOINT_EVERY_BYTES:
+                    save()
+                    since_checkpoint = 0
+        finally:
+            try:
+                save()
+            finally:
+                os.close(fd)
+
+        if start + rng[2] <= end:
+            raise IOError(f"connection closed at byte {start + rng[2]} of range ending {end}")
+
+    results = get_client().map(fetch_range, state["ranges"], workers=len(state["ranges"]))
+    elapsed = time.perf_counter() - started
+    metrics.inc("download_bytes_total", fetched[0], source=label.lower(), method="ranged")
+    metrics.observe("download_seconds", elapsed, source=label.lower(), method="ranged")
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        print(f"[{label}] Download interrupted, will resume next run: {errors[0]}")
+        return None
+
+    if part.stat().st_size != remote["size"] or sum(r[2] for r in state["ranges"]) != remote["size"]:
+        print(f"[{label}] Size mismatch for {output_path.name}, will resume next run")
+        return None
+
+    part.rename(output_path)
+    checkpoint.unlink(missing_ok=True)
+
+    print(f"[{label}] Download complete: {remote['size'] / 1e6:.0f} MB "
+          f"({fetched[0] / 1e6 / max(elapsed, 0.001):.1f} MB/s over {len(state['ranges'])} connections)")
+    return output_path
+
+
+def _download_whole(url: str, output_path: Path, part: Path, label: str) -> Path:
+    try:
+        response = get_client().get(url, stream=True)
+        response.raise_for_status()
+        expected = response.headers.get("Content-Length")
+        written = 0
+        with open(part, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+                written += len(chunk)
+    except Exception as e:
+        print(f"[{label}] Download failed: {e}")
+        return None
+
+    if expected is not None and written != int(expected):
+        print(f"[{label}] Short download: {written} of {expected} bytes")
+        return None
+
+    part.rename(output_path)
+    print(f"[{label}] Download complete")
+    return output_path
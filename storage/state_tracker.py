@@ -1,46 +1,235 @@
 import json
+import sqlite3
+import time
 from pathlib import Path
 from typing import Dict, Any
 import threading
 
+STATE_DB = Path("state.db")
+
+# Old JSON state, imported into STATE_DB once and then left alone
 STATE_FILE = Path("state.json")
 
 #Empty state file
 DEFAULT_STATE = {"house": [], "senate": []}
 
-# Added RLock instead of Lock to allow nested state access
-# Esp. for load_state() called within mark_processed() / is_processed()
-STATE_LOCK = threading.RLock()
+# Stage a video reaches once everything is uploaded. Earlier stages are
+# recorded as the pipeline goes (downloaded, transcribed) so we can see where a video stopped.
+DONE = "done"
+
+# One connection per thread. WAL mode lets readers run while another thread
+# writes, so the House and Senate pipelines don't wait on each other.
+_local = threading.local()
+
+# Only guards the one-time schema setup / state.json import
+_INIT_LOCK = threading.Lock()
+_initialized = False
+
+
+def _connect() -> sqlite3.Connection:
+    """Connection for the calling thread, created on first use."""
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(STATE_DB, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _local.conn = conn
+
+    with _INIT_LOCK:
+        if not _initialized:
+            _create_schema(conn)
+            _import_legacy_state(conn)
+            _initialized = True
+    return conn
+
+
+def _create_schema(conn: sqlite3.Connection):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS videos (
+            chamber TEXT NOT NULL,
+            committee TEXT NOT NULL,
+            recording_date TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (chamber, committee, recording_date, filename)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS content_index (
+            fingerprint TEXT PRIMARY KEY,
+            chamber TEXT NOT NULL,
+            committee TEXT NOT NULL,
+            recording_date TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            transcript_blob TEXT NOT NULL,
+            video_blob TEXT,
+            created_at REAL NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS hls_playlists (
+            video_id TEXT NOT NULL,
+            policy TEXT NOT NULL,
+            url TEXT NOT NULL,
+            resolved_at REAL NOT NULL,
+            PRIMARY KEY (video_id, policy)
+        ) WITHOUT ROWID;
+    """)
 
-def load_state() -> Dict[str, Any]:
-    """Load the state from JSON. Create/reset 
-        if missing, empty, or corrupted.
-        @return: Dict with keys "house" and "senate" 
+
+def load_legacy_state() -> Dict[str, Any]:
+    """Load the old state.json. Empty if missing, empty, or corrupted.
+        @return: Dict with keys "house" and "senate"
                 containing lists of processed videos
         """
-    with STATE_LOCK:
-        if not STATE_FILE.exists():
-            return DEFAULT_STATE.copy()
-
-        try:
-            with open(STATE_FILE, "r") as f:
-                content = f.read().strip()
-                if not content:  # Empty file
-                    return DEFAULT_STATE.copy()
-                return json.loads(content)
-        except json.JSONDecodeError:
-            print("[Warning] state.json is corrupted. Resetting to empty.")
-            return DEFAULT_STATE.copy()
-
-
-def save_state(state: Dict[str, Any]):
-    """Save state to JSON file.
-    @param state: Dict with keys "house" and "senate" 
-                containing lists of processed videos
+    if not STATE_FILE.exists():
+        return DEFAULT_STATE.copy()
+
+    try:
+        with open(STATE_FILE, "r") as f:
+            content = f.read().strip()
+            if not content:  # Empty file
+                return DEFAULT_STATE.copy()
+            return json.loads(content)
+    except json.JSONDecodeError:
+        print("[Warning] state.json is corrupted. Skipping import.")
+        return DEFAULT_STATE.copy()
+
+
+def _import_legacy_state(conn: sqlite3.Connection):
+    """Copy state.json into the database the first time it is opened."""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+        return
+
+    state = load_legacy_state()
+    now = time.time()
+    rows = [
+        (chamber, entry["committee"], entry["recording_date"], entry["filename"], DONE, now)
+        for chamber, entries in state.items()
+        for entry in entries
+    ]
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR IGNORE INTO videos VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.execute("INSERT OR IGNORE INTO meta VALUES ('legacy_imported', ?)", (str(now),))
+    if rows:
+        print(f"[State] Imported {len(rows)} processed videos from {STATE_FILE}")
+
+
+def get_meta(key: str) -> str:
+    """Small bits of run state, e.g. scraper cursors.
+    @return: Stored value, or None
+    """
+    row = _connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(key: str, value: str):
+    _connect().execute(
+        "INSERT INTO meta VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (key, value)
+    )
+
+
+def get_stage(chamber: str, committee: str, recording_date: str, filename: str) -> str:
+    """Last stage recorded for a video.
+    @return: Stage name, or None if we have never seen it
+    """
+    row = _connect().execute(
+        "SELECT stage FROM videos WHERE chamber = ? AND committee = ? AND recording_date = ? AND filename = ?",
+        (chamber, committee, recording_date, filename)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def set_stage(chamber: str, committee: str, recording_date: str, filename: str, stage: str):
+    """Record how far a video got through the pipeline.
+    @param stage: downloaded, transcribed, done, ...
+    """
+    _connect().execute(
+        "INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (chamber, committee, recording_date, filename) "
+        "DO UPDATE SET stage = excluded.stage, updated_at = excluded.updated_at",
+        (chamber, committee, recording_date, filename, stage, time.time())
+    )
+
+
+def find_content(fingerprint: str) -> dict:
+    """Earlier video with the same content fingerprint, if we have one.
+    @return: Dict with chamber, committee, recording_date, filename, transcript_blob, video_blob, or None
+    """
+    row = _connect().execute(
+        "SELECT chamber, committee, recording_date, filename, transcript_blob, video_blob "
+        "FROM content_index WHERE fingerprint = ?", (fingerprint,)
+    ).fetchone()
+    if row is None:
+        return None
+    keys = ("chamber", "committee", "recording_date", "filename", "transcript_blob", "video_blob")
+    return dict(zip(keys, row))
+
+
+def record_content(fingerprint: str, chamber: str, committee: str, recording_date: str, filename: str,
+                   transcript_blob: str, video_blob: str = None):
+    """Remember where the transcript (and video) for this content lives in the bucket.
+    The first video with a fingerprint stays the original; later copies don't replace it.
     """
-    with STATE_LOCK:
-        with open(STATE_FILE, "w") as f:
-            json.dump(state, f, indent=2)
+    _connect().execute(
+        "INSERT OR IGNORE INTO content_index VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (fingerprint, chamber, committee, recording_date, filename, transcript_blob, video_blob, time.time())
+    )
+
+
+def forget_content(fingerprint: str):
+    """Drop an index entry whose objects are gone from the bucket."""
+    _connect().execute("DELETE FROM content_index WHERE fingerprint = ?", (fingerprint,))
+
+
+def get_playlist(video_id: str, policy: str) -> str:
+    """Playlist URL resolved earlier for this Senate video and rendition policy.
+    @return: URL, or None if we never resolved it
+    """
+    row = _connect().execute(
+        "SELECT url FROM hls_playlists WHERE video_id = ? AND policy = ?", (video_id, policy)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def get_playlists(video_ids: list, policy: str) -> dict:
+    """get_playlist for many videos in one query.
+    @return: {video_id: url} for the ones we have
+    """
+    found = {}
+    video_ids = list(video_ids)
+    for start in range(0, len(video_ids), 500):  # Stay under SQLite's bound-parameter limit
+        chunk = video_ids[start:start + 500]
+        rows = _connect().execute(
+            f"SELECT video_id, url FROM hls_playlists WHERE policy = ? AND video_id IN ({','.join('?' * len(chunk))})",
+            (policy, *chunk)
+        ).fetchall()
+        found.update(rows)
+    return found
+
+
+def record_playlist(video_id: str, policy: str, url: str):
+    _connect().execute(
+        "INSERT INTO hls_playlists VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (video_id, policy) DO UPDATE SET url = excluded.url, resolved_at = excluded.resolved_at",
+        (video_id, policy, url, time.time())
+    )
+
+
+def forget_playlist(video_id: str):
+    """Drop cached playlists for a video, e.g. after its download failed, so the next try resolves again."""
+    _connect().execute("DELETE FROM hls_playlists WHERE video_id = ?", (video_id,))
 
 
 def is_processed(chamber: str, committee: str, recording_date: str, filename: str) -> bool:
@@ -51,14 +240,7 @@ def is_processed(chamber: str, committee: str, recording_date: str, filename: st
     @param filename: Name of the file
     @return: True if processed, False otherwise
     """
-    with STATE_LOCK:
-        state = load_state()
-        for entry in state.get(chamber, []):
-            if (entry["committee"] == committee and
-                entry["recording_date"] == recording_date and
-                entry["filename"] == filename):
-                return True
-        return False
+    return get_stage(chamber, committee, recording_date, filename) == DONE
 
 
 def mark_processed(chamber: str, committee: str, recording_date: str, filename: str):
@@ -68,13 +250,4 @@ def mark_processed(chamber: str, committee: str, recording_date: str, filename:
     @param recording_date: Date of recording
     @param filename: Name of the file
     """
-    with STATE_LOCK:
-        state = load_state()
-        if chamber not in state:
-            state[chamber] = []
-        state[chamber].append({
-            "committee": committee,
-            "recording_date": recording_date,
-            "filename": filename
-        })
-        save_state(state)
+    set_stage(chamber, committee, recording_date, filename, DONE)
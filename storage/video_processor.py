@@ -1,65 +1,405 @@
 from pathlib import Path
-from transcriber.whisper_transcriber import WhisperTranscriber
-from storage.file_manager import download_house_video_ffmpeg, download_senate_video_ffmpeg, upload_file_to_gcs
-from storage.state_tracker import is_processed, mark_processed
+import re
+import threading
+from transcriber.whisper_transcriber import WhisperTranscriber, write_transcript
+from transcriber.transcript_cache import TranscriptCache
+from transcriber.chunked_transcriber import ChunkedWhisperTranscriber
+from transcriber.streaming_transcriber import StreamingWhisperTranscriber
+from transcriber.batched_transcriber import BatchedWhisperTranscriber
+from storage.file_manager import (
+    download_house_video_ffmpeg,
+    download_senate_video_ffmpeg,
+    find_senate_playlist
+)
+from storage.hls_resolver import resolve_playlists
+from storage.gcs_uploader import upload_files, copy_object
+from storage.fingerprint import content_fingerprint
+from storage.disk_budget import DISK_BUDGET
+from storage.state_tracker import (
+    is_processed,
+    mark_processed,
+    set_stage,
+    find_content,
+    record_content,
+    forget_content
+)
+from pipeline import metrics
 
 BUCKET_NAME = "legislature-videos-shaleen"
 
-def process_video(chamber, committee, recording_date, filename, download_args):
-    """Generic video processing: download, transcribe and upload to cloud
+# "test" writes a placeholder transcript (demo runs), "whisper" transcribes serially,
+# "parallel" splits long sessions into chunks transcribed across CPU cores,
+# "batched" runs speech clips through faster-whisper's batched pipeline, several videos at a time
+TRANSCRIBE_MODE = "test"
+BATCH_VIDEOS = 4 # Videos waiting for transcription that "batched" mode takes in one go
+
+# "audio" only keeps 16 kHz mono audio for transcription and uploads just the transcript.
+# "video" is the opt-in archive mode: full video is downloaded and uploaded with the transcript.
+# "stream" never writes media to disk: ffmpeg pipes audio straight into Whisper during transcription.
+INGEST_MODE = "audio"
+
+# Finished transcriptions by audio hash + model settings. Set bucket_name=BUCKET_NAME to share it through GCS.
+TRANSCRIPT_CACHE = TranscriptCache()
+
+# Fingerprints a job in this process is working on: {fingerprint: Event set once that job leaves the pipeline}.
+# Another job that downloads the same recording meanwhile waits for it and links to its upload.
+_IN_FLIGHT = {}
+_IN_FLIGHT_LOCK = threading.Lock()
+
+def make_job(chamber, committee, recording_date, filename, download_args) -> dict:
+    """Bundle everything the stages need to know about one video.
     @param chamber: house/senate
     @param committee: Committee name
     @param recording_date: Date of the recording
     @param filename: Name of the video file
     @param download_args: real_url or video_id based on chamber
+    @return: Job dict passed from stage to stage
     """
+    return {
+        "chamber": chamber,
+        "committee": committee,
+        "recording_date": recording_date,
+        "filename": filename,
+        "download_args": download_args,
+        "local_path": None,
+        "transcript_path": None,
+        "archive_video": False,
+        "source_url": None,
+        "fingerprint": None,
+        "duplicate_of": None,
+        "trace_id": metrics.new_trace_id(),  # Ties this video's spans together when tracing is on
+    }
+
+
+def download_stage(job):
+    """Skip check and download. Returns the job, or None if there is nothing left to do."""
+    chamber = job["chamber"]
+    committee, recording_date, filename = job["committee"], job["recording_date"], job["filename"]
 
     if is_processed(chamber, committee, recording_date, filename):
         print(f"[{chamber.capitalize()}]\
               [Skip] Already processed: {committee} | {recording_date} | {filename}")
-        return
+        return None
 
-    output_dir = Path(f"downloads/{chamber}")
+    output_dir = job_dir(job)
     output_dir.mkdir(parents=True, exist_ok=True)
-    local_path = output_dir / filename
+
+    if INGEST_MODE == "stream":
+        return resolve_stream(job, output_dir)
+
+    audio_only = INGEST_MODE == "audio"
+    local_path = output_dir / (Path(filename).with_suffix(".wav").name if audio_only else filename)
 
     # Download based on chamber
     if chamber == "house":
-        real_url = download_args["real_url"]
+        real_url = job["download_args"]["real_url"]
         print(f"\nHouse: Downloading from {real_url}")
-        download_house_video_ffmpeg(real_url, local_path)
+        local_path = download_house_video_ffmpeg(real_url, local_path, audio_only=audio_only)
     elif chamber == "senate":
-        video_id = download_args["video_id"]
+        video_id = job["download_args"]["video_id"]
         print(f"\nSenate: Downloading video ID: {video_id}")
-        local_path = download_senate_video_ffmpeg(video_id, output_dir)
+        local_path = download_senate_video_ffmpeg(video_id, output_dir, audio_only=audio_only)
+
+    if local_path is None:
+        print(f"[{chamber.capitalize()}][Error] Download failed: {filename}")
+        return None
 
     print(f"{chamber.capitalize()}: Download complete.")
+    set_stage(chamber, committee, recording_date, filename, "downloaded")
+    DISK_BUDGET.pin(local_path)  # Not evictable until it is uploaded or the job is abandoned
+    job["local_path"] = local_path
+    job["archive_video"] = not audio_only
+
+    # Same recording under another committee heading, _id or name? Link it instead of transcribing again.
+    job["fingerprint"] = content_fingerprint(local_path)
+    original = find_original(job)
+    if original:
+        print(f"[{chamber.capitalize()}][Duplicate] {filename} is the same recording as "
+              f"{original['committee']} | {original['recording_date']} | {original['filename']}")
+        job["duplicate_of"] = original
+    return job
+
+
+def job_dir(job) -> Path:
+    """Where a job's files go: one directory per chamber and committee, so the same file name
+    listed under two committees never shares a download, .part file or transcript."""
+    committee = re.sub(r"[^A-Za-z0-9]+", "_", job["committee"]).strip("_") or "unknown"
+    return Path(f"downloads/{job['chamber']}-{committee}")
+
+
+def find_original(job):
+    """The earlier video this job's recording duplicates, or None if this job is the original.
+    When another job in this process is still working on the same fingerprint, wait until it
+    leaves the pipeline: if it got uploaded we link to it, if it failed this job takes over.
+    @return: find_content dict of the original, or None
+    """
+    fingerprint = job["fingerprint"]
+    own = (job["chamber"], job["committee"], job["recording_date"], job["filename"])
+    while True:
+        with _IN_FLIGHT_LOCK:
+            original = find_content(fingerprint)
+            if original and (original["chamber"], original["committee"],
+                             original["recording_date"], original["filename"]) != own:
+                return original
+            done = _IN_FLIGHT.get(fingerprint)
+            if done is None:
+                _IN_FLIGHT[fingerprint] = threading.Event()
+                job["holds_fingerprint"] = True
+                return None
+        print(f"[{job['chamber'].capitalize()}][Duplicate] {job['filename']} is already being processed, waiting for it")
+        done.wait()
+
+
+def senate_playlist_policy() -> str:
+    """Rendition the download stage will ask for, so prefetched playlists match its cache key."""
+    return "highest" if INGEST_MODE == "video" else "audio"
+
+
+def prefetch_senate_playlists(video_ids: list) -> dict:
+    """Resolve playlists for many Senate videos in parallel before they reach the download stage.
+    @return: {video_id: m3u8 URL or None}
+    """
+    return resolve_playlists(video_ids, senate_playlist_policy())
+
+
+def resolve_stream(job, output_dir: Path):
+    """Stream mode: nothing to download, just find the URL ffmpeg should read from."""
+    chamber = job["chamber"]
+    if chamber == "house":
+        job["source_url"] = job["download_args"]["real_url"]
+        job["transcript_path"] = output_dir / Path(job["filename"]).with_suffix(".txt").name
+    elif chamber == "senate":
+        video_id = job["download_args"]["video_id"]
+        job["source_url"] = find_senate_playlist(video_id, senate_playlist_policy())
+        job["transcript_path"] = output_dir / f"{video_id}.txt"
+
+    if not job.get("source_url"):
+        print(f"[{chamber.capitalize()}][Error] No stream found: {job['filename']}")
+        return None
+    return job
+
+
+def transcribe_stage(job):
+    chamber = job["chamber"]
+    if job.get("duplicate_of"):
+        return job
 
-    # Transcribe
     print(f"\n{chamber.capitalize()}: transcribing...")
-    transcriber = WhisperTranscriber()
-    transcript_path = transcriber.transcribe_test(local_path)
+    if job.get("source_url"):
+        StreamingWhisperTranscriber().transcribe_stream(job["source_url"], job["transcript_path"])
+    elif TRANSCRIBE_MODE in ("parallel", "whisper", "batched"):
+        transcriber = {"parallel": ChunkedWhisperTranscriber, "batched": BatchedWhisperTranscriber}.get(
+            TRANSCRIBE_MODE, WhisperTranscriber)()
+        job["transcript_path"] = transcribe_cached(transcriber, job["local_path"], job.get("fingerprint"))
+    else:
+        job["transcript_path"] = WhisperTranscriber().transcribe_test(job["local_path"])
     print(f"\n{chamber.capitalize()}: Transcript Done:\n")
+    set_stage(chamber, job["committee"], job["recording_date"], job["filename"], "transcribed")
+    return job
+
+
+def transcribe_batch_stage(jobs):
+    """Transcribe stage for several jobs at once (main.build_pipeline uses it in "batched" mode).
+    Every video that isn't a duplicate, a stream or in the transcript cache goes through
+    one BatchedWhisperTranscriber.transcribe_many call, so short videos share batches.
+    A video that fails only fails its own job: its slot holds the exception (see Stage.batch_size).
+    If the shared batch itself fails, its videos are retried one by one.
+    @return: The jobs (or the exception for a failed one), in the same order
+    """
+    if TRANSCRIBE_MODE != "batched":
+        return [_isolated(transcribe_stage, job) for job in jobs]
+
+    transcriber = BatchedWhisperTranscriber()
+    results = {}
+    pending = []
+    for job in jobs:
+        if job.get("duplicate_of") or job.get("source_url"):
+            results[id(job)] = _isolated(transcribe_stage, job)
+            continue
+        try:
+            key, segments = cached_segments(transcriber, job["local_path"], job.get("fingerprint"))
+        except Exception as e:
+            results[id(job)] = e
+            continue
+        if segments is None:
+            pending.append((job, key))
+        else:
+            results[id(job)] = _isolated(finish_transcript, job, segments)
+
+    if pending:
+        print(f"\nTranscribing {len(pending)} videos in one batch...")
+        try:
+            transcripts = transcriber.transcribe_many([job["local_path"] for job, _ in pending])
+        except Exception as e:
+            print(f"[Whisper] Batch failed ({e}), transcribing its {len(pending)} videos one by one")
+            for job, _ in pending:
+                results[id(job)] = _isolated(transcribe_stage, job)
+            pending = []
+        for job, key in pending:
+            segments = transcripts[job["local_path"]]
+            if isinstance(segments, Exception):
+                results[id(job)] = segments
+                continue
+            if key:
+                TRANSCRIPT_CACHE.put(key, segments)
+            results[id(job)] = _isolated(finish_transcript, job, segments)
+    return [results[id(job)] for job in jobs]
+
+
+def _isolated(func, job, *args):
+    """func(job, *args) for one job of a batch. @return: What func returned, or the exception"""
+    try:
+        return func(job, *args)
+    except Exception as e:
+        return e
+
+
+def finish_transcript(job, segments):
+    """Write a batched job's transcript and record the stage, as transcribe_stage does."""
+    chamber = job["chamber"]
+    job["transcript_path"] = job["local_path"].with_suffix(".txt")
+    write_transcript(segments, job["transcript_path"])
+    print(f"\n{chamber.capitalize()}: Transcript Done: {job['filename']}\n")
+    set_stage(chamber, job["committee"], job["recording_date"], job["filename"], "transcribed")
+    return job
+
+
+def cached_segments(transcriber, local_path: Path, fingerprint: str):
+    """@return: (cache key or None, cached segments or None)"""
+    if not fingerprint:
+        return None, None
+    key = TranscriptCache.key(fingerprint, **transcriber.cache_key_parts())
+    segments = TRANSCRIPT_CACHE.get(key)
+    metrics.inc("transcript_cache_total", result="miss" if segments is None else "hit")
+    if segments is not None:
+        print(f"[Cache] Reusing transcript for {local_path.name}")
+    return key, segments
+
+
+def transcribe_cached(transcriber, local_path: Path, fingerprint: str) -> Path:
+    """Reuse a cached transcription of the same audio with the same settings, otherwise transcribe and cache it.
+    @return: Path to the transcript file
+    """
+    key, segments = cached_segments(transcriber, local_path, fingerprint)
+    if segments is None:
+        segments = transcriber.transcribe_to_segments(local_path)
+        if key:
+            TRANSCRIPT_CACHE.put(key, segments)
+
+    transcript_path = local_path.with_suffix(".txt")
+    write_transcript(segments, transcript_path)
+    return transcript_path
+
+
+def upload_stage(job):
+    """Upload video and transcript, mark processed and clean up local files."""
+    chamber = job["chamber"]
+    committee, recording_date, filename = job["committee"], job["recording_date"], job["filename"]
+    local_path, transcript_path = job["local_path"], job["transcript_path"]
 
-    # Upload
-    print(f"\nUploading {chamber} video and transcript to GCS...")
     cloud_dir = f"{chamber}/{committee}/{recording_date}"
-    upload_file_to_gcs(BUCKET_NAME, local_path, f"{cloud_dir}/{local_path.name}")
-    upload_file_to_gcs(BUCKET_NAME, transcript_path, f"{cloud_dir}/{transcript_path.name}")
+    if job.get("duplicate_of"):
+        return link_duplicate(job, cloud_dir)
+
+    uploads = [(transcript_path, f"{cloud_dir}/{transcript_path.name}")]
+    if job.get("archive_video"):
+        print(f"\nUploading {chamber} video and transcript to GCS...")
+        uploads.insert(0, (local_path, f"{cloud_dir}/{local_path.name}"))
+    else:
+        print(f"\nUploading {chamber} transcript to GCS...")
+    # Video and transcript go up at the same time
+    upload_files(BUCKET_NAME, uploads)
     print(f"{chamber.capitalize()}: Upload complete.")
 
     # Mark as processed
     mark_processed(chamber, committee, recording_date, filename)
+    if job.get("fingerprint"):
+        record_content(job["fingerprint"], chamber, committee, recording_date, filename,
+                       transcript_blob=uploads[-1][1],
+                       video_blob=uploads[0][1] if job.get("archive_video") else None)
+
+    cleanup_local_files(job)
+    return job
+
+
+def link_duplicate(job, cloud_dir: str):
+    """Copy the original's transcript (and video) to this video's place in the bucket, server-side."""
+    chamber = job["chamber"]
+    original = job["duplicate_of"]
+    local_path = job["local_path"]
+    transcript_name = local_path.with_suffix(".txt").name
+
+    links = [(original["transcript_blob"], f"{cloud_dir}/{transcript_name}")]
+    if job.get("archive_video") and original["video_blob"]:
+        links.append((original["video_blob"], f"{cloud_dir}/{local_path.name}"))
+
+    for source, destination in links:
+        if not copy_object(BUCKET_NAME, source, destination):
+            # Original is gone from the bucket; forget it so the next run processes this one normally
+            print(f"[{chamber.capitalize()}][Warning] {source} no longer exists, will transcribe next run")
+            forget_content(job["fingerprint"])
+            cleanup_local_files(job)
+            return None
+
+    mark_processed(chamber, job["committee"], job["recording_date"], job["filename"])
+    cleanup_local_files(job)
+    return job
+
+
+def release_job(job, error=None):
+    """The job left the pipeline (done, dropped or failed). Whatever it still has on disk
+    may now be evicted when space is needed; a retry that finds it first simply reuses it.
+    Signature matches Pipeline.on_finish."""
+    if job.get("local_path"):
+        DISK_BUDGET.unpin(job["local_path"])
+    if job.pop("holds_fingerprint", False):
+        # Uploaded (and in content_index) or given up on; either way jobs waiting in find_original can go on
+        with _IN_FLIGHT_LOCK:
+            _IN_FLIGHT.pop(job["fingerprint"]).set()
+
+
+def cleanup_local_files(job):
+    chamber = job["chamber"]
+    local_path, transcript_path = job["local_path"], job["transcript_path"]
+    release_job(job)
 
     # Cleanup local files
     try:
-        local_path.unlink()
-        transcript_path.unlink()
-        print(f"[{chamber.capitalize()}][Cleanup] Deleted local files: {local_path.name}, {transcript_path.name}")
+        local_files = [path for path in (local_path, transcript_path) if path is not None]
+        for path in local_files:
+            path.unlink()
+        print(f"[{chamber.capitalize()}][Cleanup] Deleted local files: {', '.join(p.name for p in local_files)}")
     except Exception as e:
         print(f"[{chamber.capitalize()}][Warning] Could not delete files: {e}")
 
 
+# Order the stages run in, both here and in the concurrent pipeline (main.build_pipeline)
+STAGES = [("download", download_stage), ("transcribe", transcribe_stage), ("upload", upload_stage)]
+
+# Stages that can take a list of jobs: stage name -> (function, max jobs per call)
+BATCH_STAGES = {"transcribe": (transcribe_batch_stage, BATCH_VIDEOS)}
+
+
+def process_video(chamber, committee, recording_date, filename, download_args):
+    """Generic video processing: download, transcribe and upload to cloud.
+    Runs every stage one after the other in the calling thread.
+    @param chamber: house/senate
+    @param committee: Committee name
+    @param recording_date: Date of the recording
+    @param filename: Name of the video file
+    @param download_args: real_url or video_id based on chamber
+    """
+    job = make_job(chamber, committee, recording_date, filename, download_args)
+    try:
+        for name, stage in STAGES:
+            with metrics.span(name, job["trace_id"]), metrics.timer("pipeline_stage_seconds", stage=name):
+                result = stage(job)
+            if result is None:
+                return
+    finally:
+        release_job(job)
+
+
 
 """
  ======================= No Cloud Upload Approach =======================
@@ -0,0 +1,225 @@
+# transcriber/autotune.py
+"""
+Find the fastest Whisper settings for this machine that are still accurate enough.
+
+    python -m transcriber.autotune clip.wav
+    python -m transcriber.autotune clip.wav --reference clip.txt --floor 0.9
+    python -m transcriber.autotune clip.wav --models base small --compute-types int8 --dry-run
+
+Runs a short clip (a minute or two of a real hearing) through every
+(model_size, compute_type, cpu_threads, num_workers) candidate, each in a fresh process,
+and records real-time factor, load time and peak memory. num_workers transcriptions run
+at the same time, the way the pipeline's transcribe workers would.
+
+Accuracy is 1 - word error rate against --reference (a checked transcript of the clip),
+or without one, against the output of the biggest float32 model among the candidates.
+The fastest candidate at or above --floor (and under --max-memory-mb) is written to
+whisper_config.json, which every WhisperTranscriber picks up.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import re
+import time
+from pathlib import Path
+from transcriber.whisper_config import CONFIG_PATH, save_config
+
+MODEL_SIZES = ("tiny", "base", "small", "medium", "large-v3")  # Smallest to biggest
+WARMUP_SECONDS = 5  # Transcribed once before timing; the first call pays one-off allocations
+POLL_SECONDS = 5    # How often we check that a candidate's process is still alive while waiting for it
+
+
+def default_threads() -> list:
+    cores = os.cpu_count() or 1
+    return sorted({max(1, cores // 4), max(1, cores // 2), cores})
+
+
+def candidates(models, compute_types, threads, workers) -> list:
+    """Every combination that doesn't oversubscribe the cores."""
+    cores = os.cpu_count() or 1
+    return [
+        {"model_size": model_size, "compute_type": compute_type, "cpu_threads": cpu_threads, "num_workers": num_workers}
+        for model_size in models
+        for compute_type in compute_types
+        for cpu_threads in threads
+        for num_workers in workers
+        if num_workers == 1 or cpu_threads * num_workers <= cores
+    ]
+
+
+def _words(text: str) -> list:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance divided by the reference length."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _measure(candidate: dict, clip: Path, language: str, results):
+    """Runs in a fresh process so load time and memory aren't shared with other candidates."""
+    import resource
+    import threading
+    from transcriber.audio import SAMPLE_RATE, decode_pcm, to_float
+    from transcriber.model_pool import get_model, current_rss_mb
+
+    try:
+        audio = to_float(decode_pcm(clip))
+        audio_seconds = len(audio) / SAMPLE_RATE
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        model = get_model(candidate["model_size"], candidate["compute_type"],
+                          candidate["cpu_threads"], candidate["num_workers"])
+        load_seconds = time.perf_counter() - started
+
+        def transcribe(samples):
+            segments, _ = model.transcribe(samples, language=language)
+            return " ".join(segment.text.strip() for segment in segments)
+
+        transcribe(audio[:WARMUP_SECONDS * SAMPLE_RATE])
+
+        texts = [None] * candidate["num_workers"]
+
+        def worker(index):
+            texts[index] = transcribe(audio)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(candidate["num_workers"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        results.put({
+            **candidate,
+            "audio_seconds": round(audio_seconds, 1),
+            "load_seconds": round(load_seconds, 2),
+            "seconds": round(elapsed, 2),
+            # Per audio-second across all workers: 0.1 means ten hours of audio per hour of wall time
+            "real_time_factor": round(elapsed / (audio_seconds * candidate["num_workers"]), 4),
+            "memory_mb": round(peak - rss_before, 1),
+            "text": texts[0],
+        })
+    except Exception as e:
+        results.put({**candidate, "error": f"{type(e).__name__}: {e}"})
+
+
+def reference_row(rows: list) -> dict:
+    """The candidate whose output stands in for the truth: biggest model, float32 if we tried it."""
+    def rank(row):
+        size = MODEL_SIZES.index(row["model_size"]) if row["model_size"] in MODEL_SIZES else -1
+        return size, row["compute_type"] == "float32"
+    return max(rows, key=rank)
+
+
+def wait_for_result(process, results) -> dict:
+    """The candidate's row, or an error row if its process died without sending one
+    (OOM kill, segfault in CTranslate2), which no except in _measure can catch."""
+    while True:
+        try:
+            return results.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if not process.is_alive():
+                break
+    try:
+        return results.get(timeout=1)  # Sent just before it exited
+    except queue.Empty:
+        return {"error": f"process died with exit code {process.exitcode}"}
+
+
+def pick(rows: list, floor: float, max_memory_mb: float = None) -> dict:
+    """Lowest real-time factor among the candidates that are accurate enough and fit in memory."""
+    eligible = [row for row in rows if row["accuracy"] >= floor
+                and (max_memory_mb is None or row["memory_mb"] <= max_memory_mb)]
+    return min(eligible, key=lambda row: row["real_time_factor"]) if eligible else None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("clip", type=Path, help="Short recording with real speech, 1-2 minutes is plenty")
+    arg_parser.add_argument("--reference", type=Path, help="Correct transcript of the clip, plain text")
+    arg_parser.add_argument("--floor", type=float, default=0.9, help="Minimum accuracy (1 - WER), default 0.9")
+    arg_parser.add_argument("--max-memory-mb", type=float, help="Skip candidates using more than this")
+    arg_parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    arg_parser.add_argument("--compute-types", nargs="+", default=["int8", "float32"])
+    arg_parser.add_argument("--threads", type=int, nargs="+", default=default_threads())
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    arg_parser.add_argument("--language", default="en")
+    arg_parser.add_argument("--config", type=Path, default=CONFIG_PATH, help="Where to write the winner")
+    arg_parser.add_argument("--output", type=Path, help="Write every measurement as JSON")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Measure and report, don't write the config")
+    args = arg_parser.parse_args()
+
+    todo = candidates(args.models, args.compute_types, args.threads, args.workers)
+    print(f"[Tune] {len(todo)} candidates on {os.cpu_count()} cores")
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    rows = []
+    for candidate in todo:
+        process = context.Process(target=_measure, args=(candidate, args.clip, args.language, results))
+        process.start()
+        row = wait_for_result(process, results)
+        process.join()
+        if "error" in row:
+            print(f"[Tune] {candidate}: {row['error']}")
+            continue
+        rows.append(row)
+        print(f"[Tune] {row['model_size']}/{row['compute_type']} threads={row['cpu_threads']} "
+              f"workers={row['num_workers']}: RTF {row['real_time_factor']}, {row['memory_mb']} MB")
+
+    if not rows:
+        raise SystemExit("[Tune] Every candidate failed")
+
+    if args.reference:
+        reference, source = args.reference.read_text(), str(args.reference)
+    else:
+        best = reference_row(rows)
+        reference, source = best["text"], f"{best['model_size']}/{best['compute_type']}"
+    for row in rows:
+        row["accuracy"] = round(max(0.0, 1 - word_error_rate(reference, row.pop("text"))), 4)
+
+    print(f"\nAccuracy against {source}:")
+    for row in sorted(rows, key=lambda row: row["real_time_factor"]):
+        print(f"  {row['model_size']:>8} {row['compute_type']:>8} threads={row['cpu_threads']:<3} "
+              f"workers={row['num_workers']}  RTF {row['real_time_factor']:<7} "
+              f"accuracy {row['accuracy']:<6} memory {row['memory_mb']} MB")
+
+    if args.output:
+        args.output.write_text(json.dumps(rows, indent=2))
+
+    winner = pick(rows, args.floor, args.max_memory_mb)
+    if winner is None:
+        raise SystemExit(f"[Tune] Nothing reached accuracy {args.floor}; config left unchanged")
+    print(f"\n[Tune] Best at accuracy >= {args.floor}: {winner['model_size']}/{winner['compute_type']} "
+          f"threads={winner['cpu_threads']} workers={winner['num_workers']} (RTF {winner['real_time_factor']})")
+
+    if args.dry_run:
+        return
+    save_config({
+        **winner,
+        "accuracy_floor": args.floor,
+        "reference": source,
+        "clip": str(args.clip),
+        "cpu_count": os.cpu_count(),
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }, args.config)
+    print(f"[Tune] Wrote {args.config}")
+
+
+if __name__ == "__main__":
+    main()
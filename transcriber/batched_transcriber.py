@@ -0,0 +1,161 @@
+import time
+from bisect import bisect_right
+from pathlib import Path
+import numpy as np
+from faster_whisper import BatchedInferencePipeline
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from transcriber.audio import SAMPLE_RATE, decode_pcm, to_float
+from transcriber.whisper_transcriber import WhisperTranscriber, write_transcript, record_transcription
+
+BATCH_SIZE = 8              # Clips decoded together; more uses more memory, gains flatten past the core count
+BEAM_SIZE = 5               # Same as the sequential path; 1 (greedy) is noticeably faster
+CLIP_SECONDS = 30           # Whisper's window. Speech is packed into clips up to this long
+MIN_SILENCE_MS = 500        # Pauses shorter than this don't end a speech region
+GROUP_SECONDS = 30 * 60     # Audio held in memory per model run when batching several videos
+
+
+def speech_clips(audio, clip_seconds: float = CLIP_SECONDS) -> list:
+    """Find speech with Silero VAD and pack neighbouring regions into clips of at most clip_seconds.
+    A clip keeps the pauses inside it, so it is one contiguous span of the recording.
+    @param audio: 16 kHz float32 samples
+    @return: List of (start_sample, end_sample)
+    """
+    regions = get_speech_timestamps(audio, VadOptions(max_speech_duration_s=clip_seconds,
+                                                      min_silence_duration_ms=MIN_SILENCE_MS))
+    limit = int(clip_seconds * SAMPLE_RATE)
+    clips = []
+    for region in regions:
+        if clips and region["end"] - clips[-1][0] <= limit:
+            clips[-1][1] = region["end"]
+        else:
+            clips.append([region["start"], region["end"]])
+    return [(start, end) for start, end in clips]
+
+
+class BatchedWhisperTranscriber(WhisperTranscriber):
+    def __init__(self, model_size: str = None, compute_type: str = None, cpu_threads: int = None,
+                 language: str = None, decode_options: dict = None,
+                 batch_size: int = BATCH_SIZE, beam_size: int = BEAM_SIZE):
+        """
+        Batched inference for draining a backlog: the speech in a recording is cut into
+        clips of up to 30s and batch_size clips are encoded and decoded at once, instead
+        of one window after the other. Clips from several videos can share a batch
+        (transcribe_many), so short House clips fill batches too.
+        Per-video latency can go up; total throughput is what this is for.
+
+        batch_size: clips per model call
+        beam_size: beam search width, 1 for greedy decoding
+        """
+        # speech_clips already leaves the silence out
+        super().__init__(model_size, compute_type, cpu_threads, language, decode_options, skip_silence=False)
+        self.batch_size = batch_size
+        self.beam_size = beam_size
+        self.pipeline = BatchedInferencePipeline(model=self.model)
+
+    def cache_key_parts(self) -> dict:
+        """Beam width changes the output, batch size doesn't."""
+        return {**super().cache_key_parts(), "batched": True, "beam_size": self.beam_size}
+
+    def _run(self, clips: list, **options) -> list:
+        """One batched model run over clips that may come from different recordings.
+        @param clips: List of (audio, start_sample, end_sample), audio as float32 or int16 PCM
+        @return: One list of (start, end, text) per clip, on its recording's timeline
+        """
+        if not clips:
+            return []
+        joined = np.concatenate([audio[start:end] if audio.dtype == np.float32 else to_float(audio[start:end])
+                                 for audio, start, end in clips])
+        # Where each clip starts in the joined audio, in seconds
+        joined_starts = []
+        position = 0
+        for _, start, end in clips:
+            joined_starts.append(position / SAMPLE_RATE)
+            position += end - start
+        clip_timestamps = [{"start": joined_start, "end": joined_start + (end - start) / SAMPLE_RATE}
+                           for joined_start, (_, start, end) in zip(joined_starts, clips)]
+
+        options = {**self.decode_options, **options}
+        if self.language:
+            options.setdefault("language", self.language)
+        options.setdefault("beam_size", self.beam_size)
+        options.setdefault("without_timestamps", False)  # Segment-level lines, like the sequential path
+
+        started = time.perf_counter()
+        segments, info = self.pipeline.transcribe(joined, batch_size=self.batch_size,
+                                                  clip_timestamps=clip_timestamps, **options)
+        results = [[] for _ in clips]
+        for segment in segments:
+            index = max(0, bisect_right(joined_starts, segment.start + 1e-3) - 1)
+            shift = clips[index][1] / SAMPLE_RATE - joined_starts[index]
+            results[index].append((segment.start + shift, segment.end + shift, segment.text.strip()))
+        record_transcription(len(joined) / SAMPLE_RATE, time.perf_counter() - started, self.model_size)
+        return results
+
+    def transcribe_segments(self, audio, offset: float = 0.0, **options):
+        """
+        Batched version of WhisperTranscriber.transcribe_segments, same arguments.
+        Silence between speech clips is never sent to the model.
+        """
+        if isinstance(audio, (str, Path)):
+            audio = to_float(decode_pcm(Path(audio)))
+        clips = [(audio, start, end) for start, end in speech_clips(audio)]
+        for segments in self._run(clips, **options):
+            for start, end, text in segments:
+                yield start + offset, end + offset, text
+
+    def transcribe_to_segments(self, video_path: Path) -> list:
+        """Whole file in one batched run. Not checkpointed like WhisperTranscriber: the segments
+        only come out once every batch is done, so there is nothing to save part way."""
+        return list(self.transcribe_segments(video_path))
+
+    def transcribe_many(self, paths: list) -> dict:
+        """
+        Transcribe several recordings, sharing batches between them.
+        Recordings are run in groups of about GROUP_SECONDS of audio to bound memory.
+        @param paths: Media files
+        @return: {path: [(start, end, text), ...]} with each recording's own timestamps,
+                 or the exception for a file that could not be decoded
+        """
+        started = time.perf_counter()
+        results = {path: [] for path in paths}
+        audio_seconds = 0.0
+        speech_seconds = 0.0
+        group = []
+        group_samples = 0
+
+        def flush():
+            for (path, _, _, _), segments in zip(group, self._run([clip[1:] for clip in group])):
+                results[path].extend(segments)
+            group.clear()
+
+        for path in paths:
+            try:
+                pcm = decode_pcm(Path(path))  # Kept as int16 until its clips are batched, half the memory
+            except Exception as e:
+                print(f"[Whisper] Could not decode {Path(path).name}, leaving it out of the batch: {e}")
+                results[path] = e
+                continue
+            audio_seconds += len(pcm) / SAMPLE_RATE
+            for start, end in speech_clips(to_float(pcm)):
+                group.append((path, pcm, start, end))
+                group_samples += end - start
+                speech_seconds += (end - start) / SAMPLE_RATE
+            if group_samples >= GROUP_SECONDS * SAMPLE_RATE:
+                flush()
+                group_samples = 0
+        flush()
+
+        elapsed = time.perf_counter() - started
+        print(f"[Whisper] Batched {len(paths)} recordings: {audio_seconds / 60:.1f} min of audio "
+              f"({speech_seconds / 60:.1f} min speech) in {elapsed:.0f}s "
+              f"({audio_seconds / elapsed if elapsed else 0:.1f} audio s per second)")
+        return results
+
+    def transcribe(self, video_path: Path) -> str:
+        """
+        Batched transcription of one file into the usual [start - end] transcript.
+        Returns the path to the transcript file.
+        """
+        transcript_path = video_path.with_suffix(".txt")
+        write_transcript(self.transcribe_to_segments(video_path), transcript_path)
+        return transcript_path
@@ -0,0 +1,44 @@
+import json
+import os
+from pathlib import Path
+
+CHECKPOINT_SECONDS = 5 * 60 # Audio transcribed between checkpoint writes; a crash costs at most about this much
+
+
+class TranscriptCheckpoint:
+    """
+    Segments finished so far for one recording, saved next to it as <name>.transcript.json.
+    Only valid for the same file (size and mtime) and the same transcriber settings;
+    anything else starts over.
+    """
+
+    def __init__(self, media_path: Path, settings: dict):
+        """
+        media_path: the recording being transcribed
+        settings: what changes the output, e.g. WhisperTranscriber.cache_key_parts()
+        """
+        media_path = Path(media_path)
+        self.path = media_path.with_name(media_path.name + ".transcript.json")
+        stat = media_path.stat()
+        self.key = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "settings": settings}
+
+    def load(self):
+        """@return: (offset in seconds to resume from, segments before it), (0.0, []) if there is nothing to resume"""
+        try:
+            saved = json.loads(self.path.read_text())
+            if saved["key"] == json.loads(json.dumps(self.key)):
+                return saved["offset"], [tuple(segment) for segment in saved["segments"]]
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError, TypeError):
+            print(f"[Whisper] Ignoring unreadable checkpoint {self.path.name}")
+        return 0.0, []
+
+    def save(self, offset: float, segments: list):
+        """Everything before offset is done. Written atomically, so a crash mid-write keeps the last one."""
+        staged = self.path.with_name(self.path.name + ".tmp")
+        staged.write_text(json.dumps({"key": self.key, "offset": offset, "segments": segments}))
+        os.replace(staged, self.path)
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,210 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from transcriber.audio import SAMPLE_RATE, decode_pcm, to_float, frame_energy
+from transcriber.whisper_transcriber import WhisperTranscriber, write_transcript, record_transcription
+
+CHUNK_SECONDS = 10 * 60     # Nominal chunk length before snapping to silence
+OVERLAP_SECONDS = 5         # Audio shared with each neighbour so words at a cut aren't lost
+SEARCH_SECONDS = 30         # How far back from a nominal cut we look for the quietest spot
+FRAME_SECONDS = 0.1         # Energy frame used when looking for silence
+THREADS_PER_WORKER = 2      # CTranslate2 threads per worker process
+
+# Set in each worker process by _init_worker
+_worker_transcriber = None
+
+# One worker pool per (model_size, compute_type, threads_per_worker, workers) for the whole process,
+# so worker processes load their model once and keep it for every recording, not once per video
+_EXECUTORS = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def plan_chunks(pcm, chunk_seconds: float = CHUNK_SECONDS, search_seconds: float = SEARCH_SECONDS,
+                sample_rate: int = SAMPLE_RATE) -> list:
+    """Pick cut points roughly every chunk_seconds, moved back to the quietest
+    frame within search_seconds so we cut in a pause rather than mid-sentence.
+    @param pcm: int16 PCM for the whole recording
+    @return: List of (start_sample, end_sample) that tile the recording without overlap
+    """
+    total = len(pcm)
+    chunk = int(chunk_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    frame = int(FRAME_SECONDS * sample_rate)
+
+    cuts = [0]
+    while total - cuts[-1] > chunk + search:
+        nominal = cuts[-1] + chunk
+        window_start = nominal - search
+        energy = frame_energy(pcm[window_start:nominal], frame)
+        quietest = int(energy.argmin()) if len(energy) else search // frame
+        cuts.append(window_start + quietest * frame + frame // 2)
+    cuts.append(total)
+
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def merge_segments(chunk_results) -> list:
+    """Stitch per-chunk segments back into one timeline.
+    Every chunk owns [start, end) of the original recording; a segment is kept
+    by the chunk that owns its midpoint, so the overlap is only transcribed once.
+    Anything still repeated across the cut (same text, overlapping times) is dropped.
+    @param chunk_results: List of (owned_start, owned_end, segments) with global timestamps
+    @return: Sorted list of (start, end, text)
+    """
+    merged = []
+    for owned_start, owned_end, segments in chunk_results:
+        for start, end, text in segments:
+            if owned_start <= (start + end) / 2 < owned_end:
+                merged.append((start, end, text))
+    merged.sort()
+
+    deduped = []
+    for segment in merged:
+        if deduped:
+            prev_start, prev_end, prev_text = deduped[-1]
+            if segment[0] < prev_end and segment[2].lower() == prev_text.lower():
+                continue
+        deduped.append(segment)
+    return deduped
+
+
+def _init_worker(model_size, compute_type, cpu_threads):
+    """Each worker process loads its own model once and keeps it for every chunk of every recording."""
+    global _worker_transcriber
+    _worker_transcriber = WhisperTranscriber(model_size, compute_type, cpu_threads)
+    _worker_transcriber.model  # Load now rather than in the first chunk
+
+
+def _transcribe_chunk(pcm, offset, owned_start, owned_end, language, decode_options, skip_silence):
+    """Runs in a worker. Returns the chunk's segments with global timestamps, and the silence it skipped.
+    The settings that don't need another model come with each chunk, so one pool serves every transcriber."""
+    _worker_transcriber.language = language
+    _worker_transcriber.decode_options = decode_options
+    _worker_transcriber.skip_silence = skip_silence
+    skipped_before = _worker_transcriber.skipped_seconds
+    segments = list(_worker_transcriber.transcribe_segments(to_float(pcm), offset=offset))
+    return (owned_start, owned_end, segments), _worker_transcriber.skipped_seconds - skipped_before
+
+
+def get_executor(model_size: str, compute_type: str, threads_per_worker: int, workers: int) -> ProcessPoolExecutor:
+    """The shared worker pool for this configuration, started on first use."""
+    key = (model_size, compute_type, threads_per_worker, workers)
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(key)
+        if executor is None:
+            # spawn, not fork: CTranslate2 threads don't survive a fork of a process that already loaded a model
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_size, compute_type, threads_per_worker),
+            )
+            _EXECUTORS[key] = executor
+        return executor
+
+
+def discard_executor(model_size: str, compute_type: str, threads_per_worker: int, workers: int):
+    """Forget a pool that can't be used any more, so get_executor starts a new one."""
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.pop((model_size, compute_type, threads_per_worker, workers), None)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_executors():
+    """Stop every worker pool; runs at interpreter exit."""
+    with _EXECUTORS_LOCK:
+        executors = list(_EXECUTORS.values())
+        _EXECUTORS.clear()
+    for executor in executors:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ChunkedWhisperTranscriber(WhisperTranscriber):
+    def __init__(self, model_size: str = None, compute_type: str = None, workers: int = None,
+                 threads_per_worker: int = THREADS_PER_WORKER, language: str = None, decode_options: dict = None):
+        """
+        Parallel transcription for long floor sessions and hearings.
+        Splits the audio at pauses into ~CHUNK_SECONDS pieces with OVERLAP_SECONDS
+        on each side and transcribes them in a process pool, one model per worker.
+        The pool lives as long as the process (get_executor), so workers load the model once.
+
+        workers: processes to use, defaults to cpu_count // threads_per_worker
+        threads_per_worker: CTranslate2 threads in each worker. Keeping workers * threads
+        at the core count avoids oversubscription, which is what keeps scaling near linear.
+        Unlike WhisperTranscriber, a crash mid-recording is not checkpointed; it starts over.
+        """
+        self.workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.threads_per_worker = threads_per_worker
+        # The in-process model is only used for recordings too short to split, and only loaded then.
+        # It runs alone, so it gets the configured cpu_threads (the whole machine) like WhisperTranscriber.
+        super().__init__(model_size, compute_type, language=language, decode_options=decode_options)
+
+    def transcribe_to_segments(self, video_path: Path) -> list:
+        """
+        Transcribe in parallel chunks.
+        Returns the merged (start, end, text) segments on the original timeline.
+        """
+        started = time.perf_counter()
+        pcm = decode_pcm(video_path)
+        chunks = plan_chunks(pcm)
+
+        if len(chunks) == 1 or self.workers == 1:
+            skipped_before = self.skipped_seconds
+            segments = list(self.transcribe_segments(to_float(pcm)))
+            if self.skip_silence:
+                print(f"[Whisper] Skipped {(self.skipped_seconds - skipped_before) / 60:.1f} min as silence: "
+                      f"{Path(video_path).name}")
+            return segments
+
+        overlap = int(OVERLAP_SECONDS * SAMPLE_RATE)
+        pool = get_executor(self.model_size, self.compute_type, self.threads_per_worker, self.workers)
+        futures = []
+        for start, end in chunks:
+            padded_start = max(0, start - overlap)
+            padded_end = min(len(pcm), end + overlap)
+            futures.append(pool.submit(
+                _transcribe_chunk,
+                pcm[padded_start:padded_end],
+                padded_start / SAMPLE_RATE,
+                start / SAMPLE_RATE,
+                end / SAMPLE_RATE if end < len(pcm) else float("inf"),
+                self.language,
+                self.decode_options,
+                self.skip_silence,
+            ))
+        try:
+            results, skipped = zip(*(future.result() for future in futures))
+        except BaseException as e:
+            for future in futures:
+                future.cancel()
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. OOM); the next recording gets a fresh pool
+                discard_executor(self.model_size, self.compute_type, self.threads_per_worker, self.workers)
+            raise
+
+        audio_seconds = len(pcm) / SAMPLE_RATE
+        elapsed = time.perf_counter() - started
+        # Chunks ran in worker processes, whose metrics we never see, so record the whole file here
+        record_transcription(audio_seconds, elapsed, self.model_size)
+        print(f"[Whisper] {len(chunks)} chunks on {self.workers} workers: "
+              f"{audio_seconds / 60:.0f} min of audio in {elapsed:.0f}s ({audio_seconds / elapsed:.1f}x real time)")
+        if self.skip_silence:
+            # Chunk overlaps are counted twice, so this can be a few seconds high
+            print(f"[Whisper] Skipped about {sum(skipped) / 60:.1f} min as silence")
+        return merge_segments(results)
+
+    def transcribe(self, video_path: Path) -> str:
+        """
+        Transcribe in parallel chunks and write the usual [start - end] transcript.
+        Returns the path to the transcript file.
+        """
+        transcript_path = video_path.with_suffix(".txt")
+        write_transcript(self.transcribe_to_segments(video_path), transcript_path)
+        return transcript_path
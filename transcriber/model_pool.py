@@ -0,0 +1,89 @@
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+from faster_whisper import WhisperModel
+from transcriber.whisper_config import load_config
+
+# One WhisperModel per (model_size, compute_type, cpu_threads, num_workers) for the whole process.
+# Loading the model costs more than transcribing a short committee clip, so
+# the House and Senate pipelines share whatever has already been loaded.
+_MODELS = {}
+_MODEL_STATS = {}
+
+# Guards _MODELS so two threads asking for the same key don't both load it
+_POOL_LOCK = threading.Lock()
+
+
+def current_rss_mb() -> float:
+    """Resident memory of this process in MB.
+    Reads /proc on Linux, falls back to peak RSS elsewhere.
+    @return: RSS in MB
+    """
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        pages = int(statm.read_text().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KB
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def get_model(model_size: str = "base", compute_type: str = "float32", cpu_threads: int = 0,
+              num_workers: int = 1) -> WhisperModel:
+    """Return the shared model for this configuration, loading it on first use.
+    @param model_size: one of ["tiny", "base", "small", "medium", "large"]
+    @param compute_type: "int8", "int8_float16", "float16", "float32", "auto"
+    @param cpu_threads: CTranslate2 threads, 0 lets it decide
+    @param num_workers: Model replicas, so this many threads can transcribe at the same time
+    @return: WhisperModel shared by every caller with the same key
+    """
+    key = (model_size, compute_type, cpu_threads, num_workers)
+
+    with _POOL_LOCK:
+        model = _MODELS.get(key)
+        if model is not None:
+            return model
+
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        model = WhisperModel(model_size, compute_type=compute_type, cpu_threads=cpu_threads,
+                             num_workers=num_workers)
+        load_seconds = time.perf_counter() - started
+        rss_after = current_rss_mb()
+
+        _MODELS[key] = model
+        _MODEL_STATS[key] = {
+            "model_size": model_size,
+            "compute_type": compute_type,
+            "cpu_threads": cpu_threads,
+            "num_workers": num_workers,
+            "load_seconds": round(load_seconds, 2),
+            "memory_mb": round(rss_after - rss_before, 1),
+        }
+        print(f"[Whisper] Loaded {model_size}/{compute_type}/threads={cpu_threads}/workers={num_workers} "
+              f"in {load_seconds:.2f}s (+{rss_after - rss_before:.0f} MB, RSS {rss_after:.0f} MB)")
+        return model
+
+
+def warm_models(configs=None):
+    """Load models ahead of time, e.g. at scheduler startup,
+    so the first video doesn't pay for it.
+    @param configs: list of (model_size, compute_type, cpu_threads[, num_workers]),
+                    defaults to what the transcriber uses (whisper_config.json or its defaults)
+    """
+    if not configs:
+        config = load_config()
+        configs = [(config["model_size"], config["compute_type"], config["cpu_threads"], config["num_workers"])]
+    for config in configs:
+        get_model(*config)
+
+
+def pool_stats() -> list:
+    """Load time and memory for every model in the pool.
+    @return: List of dicts, one per loaded model
+    """
+    with _POOL_LOCK:
+        return [dict(stats) for stats in _MODEL_STATS.values()]
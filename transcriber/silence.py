@@ -0,0 +1,123 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from transcriber.audio import SAMPLE_RATE, to_float, frame_energy
+
+DECIMATION = 4              # Energy is measured on every 4th sample; 4 kHz is plenty to tell sound from dead air
+FRAME_SECONDS = 0.05        # Energy frame
+SILENCE_DBFS = -50          # Frames quieter than this are silence, whatever the recording sounds like
+NOISE_MARGIN_DB = 10        # ... and so are frames within this much of the recording's own noise floor
+MAX_THRESHOLD_DBFS = -35    # The threshold never goes above this, so a quiet speaker is never cut
+MIN_GAP_SECONDS = 3.0       # Only quiet stretches at least this long are skipped; shorter ones are pauses
+PAD_SECONDS = 0.5           # Kept on both sides of each speech region so soft onsets and endings survive
+USE_VAD = True              # Confirm loud stretches with Silero VAD, which also drops music, gavels and crowd noise
+
+
+def energy_regions(pcm: np.ndarray) -> list:
+    """Stretches with any sound in them, from a vectorized energy pass over decimated audio.
+    @param pcm: 16 kHz int16 PCM or float32 samples
+    @return: List of (start_sample, end_sample)
+    """
+    full_scale = 32768.0 if pcm.dtype == np.int16 else 1.0
+    frame = max(1, int(FRAME_SECONDS * SAMPLE_RATE / DECIMATION))
+    energy = frame_energy(pcm[::DECIMATION], frame)
+    if not len(energy):
+        return []
+    db = 20 * np.log10(np.maximum(energy / full_scale, 1e-10))
+    threshold = min(max(SILENCE_DBFS, np.percentile(db, 10) + NOISE_MARGIN_DB), MAX_THRESHOLD_DBFS)
+
+    # Runs of loud frames: +1 where one starts, -1 just past where it ends
+    edges = np.diff(np.concatenate(([0], (db > threshold).astype(np.int8), [0])))
+    samples_per_frame = frame * DECIMATION
+    return [(int(start) * samples_per_frame, int(end) * samples_per_frame)
+            for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))]
+
+
+def vad_regions(pcm: np.ndarray, regions: list) -> list:
+    """Speech inside the given regions according to Silero VAD.
+    Only what the energy pass kept is looked at, so recesses cost nothing here.
+    @return: List of (start_sample, end_sample)
+    """
+    options = VadOptions(min_silence_duration_ms=int(MIN_GAP_SECONDS * 1000), speech_pad_ms=0)
+    found = []
+    for start, end in regions:
+        audio = pcm[start:end]
+        audio = to_float(audio) if audio.dtype == np.int16 else audio
+        found.extend((start + speech["start"], start + speech["end"])
+                     for speech in get_speech_timestamps(audio, options))
+    return found
+
+
+def merge_regions(regions: list, total: int, min_gap: float = MIN_GAP_SECONDS, pad: float = PAD_SECONDS) -> list:
+    """Pad each region and close gaps shorter than min_gap.
+    @param total: Samples in the recording, regions are clipped to it
+    @return: Sorted, non-overlapping list of (start_sample, end_sample)
+    """
+    pad_samples = int(pad * SAMPLE_RATE)
+    gap_samples = int(min_gap * SAMPLE_RATE)
+    merged = []
+    for start, end in sorted(regions):
+        start, end = max(0, start - pad_samples), min(total, end + pad_samples)
+        if merged and start - merged[-1][1] < gap_samples:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def speech_regions(pcm: np.ndarray, use_vad: bool = USE_VAD) -> list:
+    """Where the speech is: energy pass first, then VAD over what it kept.
+    @param pcm: 16 kHz int16 PCM or float32 samples
+    @return: Sorted, non-overlapping list of (start_sample, end_sample)
+    """
+    regions = merge_regions(energy_regions(pcm), len(pcm))
+    if use_vad and regions:
+        regions = merge_regions(vad_regions(pcm, regions), len(pcm))
+    return regions
+
+
+class SpeechMap:
+    """
+    The speech regions of a recording, joined into one array for the model, and the way
+    back from a time in the joined audio to the same moment in the recording.
+    """
+
+    def __init__(self, regions: list, total_samples: int):
+        self.regions = regions
+        self.total_samples = total_samples
+        self.joined_starts = []  # Seconds into the joined audio where each region starts
+        position = 0
+        for start, end in regions:
+            self.joined_starts.append(position / SAMPLE_RATE)
+            position += end - start
+        self.speech_samples = position
+
+    @property
+    def total_seconds(self) -> float:
+        return self.total_samples / SAMPLE_RATE
+
+    @property
+    def skipped_seconds(self) -> float:
+        return (self.total_samples - self.speech_samples) / SAMPLE_RATE
+
+    def join(self, pcm: np.ndarray) -> np.ndarray:
+        """Speech only, as float32 for WhisperModel.transcribe."""
+        if not self.regions:
+            return np.zeros(0, dtype=np.float32)
+        joined = np.concatenate([pcm[start:end] for start, end in self.regions])
+        return to_float(joined) if joined.dtype == np.int16 else joined
+
+    def to_original(self, seconds: float, end: bool = False) -> float:
+        """Map a time in the joined audio back onto the recording.
+        @param end: The time ends a segment; one landing exactly on a join belongs to the region before it
+        """
+        if not self.regions:
+            return seconds
+        find = bisect_left if end else bisect_right
+        index = max(0, find(self.joined_starts, seconds) - 1)
+        return self.regions[index][0] / SAMPLE_RATE + seconds - self.joined_starts[index]
+
+    def describe(self) -> str:
+        """e.g. "Skipped 41.3 of 180.0 min as silence (23%)"."""
+        share = self.skipped_seconds / self.total_seconds * 100 if self.total_samples else 0.0
+        return f"Skipped {self.skipped_seconds / 60:.1f} of {self.total_seconds / 60:.1f} min as silence ({share:.0f}%)"
@@ -0,0 +1,92 @@
+import subprocess
+import time
+from pathlib import Path
+import numpy as np
+from transcriber.audio import SAMPLE_RATE, to_float
+from transcriber.whisper_transcriber import WhisperTranscriber, format_segment
+
+WINDOW_SECONDS = 30      # Audio read from ffmpeg before each model call
+GUARD_SECONDS = 2        # Segments ending this close to the end of the buffer may be cut off mid-word
+MAX_CARRY_SECONDS = 60   # Never carry more than this into the next window
+
+
+class StreamingWhisperTranscriber(WhisperTranscriber):
+    """
+    Transcribes while ffmpeg is still reading the source. ffmpeg decodes the
+    House MP4 URL or Senate HLS stream to PCM on stdout, we transcribe it in
+    fixed windows and write transcript lines as each window finishes.
+    Nothing but the transcript touches the disk.
+    """
+
+    def transcribe_stream(self, source_url: str, transcript_path: Path) -> Path:
+        """
+        Stream source_url through ffmpeg into the model.
+        The tail of each window (from the end of the last safe segment) is carried
+        into the next one, so words at a window boundary are transcribed whole.
+        Returns the path to the transcript file.
+        """
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error",
+            "-i", source_url,
+            "-vn", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "pipe:1"
+        ]
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        window_bytes = WINDOW_SECONDS * SAMPLE_RATE * 2
+        buffer = np.zeros(0, dtype=np.int16)
+        buffer_offset = 0.0
+        started = time.perf_counter()
+        first_line_at = None
+
+        try:
+            with open(transcript_path, "w") as f:
+                while True:
+                    data = process.stdout.read(window_bytes)
+                    eof = len(data) < window_bytes
+                    # Keep whole samples only; an odd byte would shift every sample after it
+                    data = data[:len(data) - len(data) % 2]
+                    buffer = np.concatenate([buffer, np.frombuffer(data, dtype=np.int16)])
+                    if len(buffer) == 0:
+                        break
+
+                    buffer_end = buffer_offset + len(buffer) / SAMPLE_RATE
+                    segments = list(self.transcribe_segments(to_float(buffer), offset=buffer_offset))
+
+                    if eof:
+                        committed, cut = segments, buffer_end
+                    elif not segments:
+                        # Silence: nothing worth re-reading except the very end
+                        committed, cut = [], max(buffer_offset, buffer_end - GUARD_SECONDS)
+                    else:
+                        committed = [s for s in segments if s[1] <= buffer_end - GUARD_SECONDS]
+                        if committed:
+                            cut = committed[-1][1]
+                        elif buffer_end - buffer_offset > WINDOW_SECONDS + MAX_CARRY_SECONDS:
+                            committed, cut = segments, buffer_end
+                        else:
+                            cut = buffer_offset
+
+                    for start, end, text in committed:
+                        f.write(format_segment(start, end, text))
+                    if committed:
+                        f.flush()
+                        if first_line_at is None:
+                            first_line_at = time.perf_counter() - started
+                            print(f"[Whisper] First transcript line after {first_line_at:.1f}s")
+
+                    buffer = buffer[int((cut - buffer_offset) * SAMPLE_RATE):]
+                    buffer_offset = cut
+                    if eof:
+                        break
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read().decode(errors="replace").strip()
+            process.wait()
+
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed while streaming {source_url}: {stderr}")
+
+        elapsed = time.perf_counter() - started
+        print(f"[Whisper] Streamed {buffer_offset / 60:.1f} min of audio in {elapsed:.0f}s")
+        return transcript_path
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from storage.gcs_uploader import get_storage_client, upload_file
+
+CACHE_DIR = Path(".cache/transcripts")
+MAX_CACHE_BYTES = 512 * 1024 * 1024   # Least recently used entries go once the local cache is bigger than this
+GCS_PREFIX = "transcript-cache"       # Where the optional shared tier lives in the bucket
+
+
+class TranscriptCache:
+    """
+    Segment-level transcripts keyed by the audio content hash and the transcriber's
+    settings (model, compute_type, language, decode options, ...). A retried upload, a re-run, or switching back to
+    a model we already used never pays for the same transcription twice.
+
+    Local tier: one JSON file per entry, mtime is the LRU clock.
+    Optional GCS tier (bucket_name): shared between machines and survives wiping the local disk.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES, bucket_name: str = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bucket_name = bucket_name
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(audio_hash: str, **settings) -> str:
+        """Cache key. Anything that changes the output has to be in here.
+        @param audio_hash: Content fingerprint of the audio/video file
+        @param settings: Everything else that changes the transcript, i.e. the transcriber's
+                         cache_key_parts() (model_size, compute_type, language, decode_options,
+                         plus whatever a subclass adds, e.g. batched and beam_size)
+        @return: Hex digest
+        """
+        return hashlib.sha256(json.dumps([audio_hash, settings], sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> list:
+        """@return: List of (start, end, text), or None on a miss"""
+        path = self._path(key)
+        try:
+            segments = json.loads(path.read_text())["segments"]
+            os.utime(path)  # Mark as recently used
+            return [tuple(segment) for segment in segments]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+        segments = self._get_remote(key)
+        if segments is not None:
+            self._put_local(key, segments)
+        return segments
+
+    def put(self, key: str, segments: list):
+        """Store a finished transcription locally (and in GCS if configured)."""
+        self._put_local(key, segments)
+        self._put_remote(key)
+
+    def _put_local(self, key: str, segments: list):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"segments": [list(segment) for segment in segments]}))
+        tmp.replace(path)
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until we are under max_bytes."""
+        with self._lock:
+            entries = []
+            for path in self.root.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def _get_remote(self, key: str):
+        if not self.bucket_name:
+            return None
+        try:
+            blob = get_storage_client().bucket(self.bucket_name).get_blob(f"{GCS_PREFIX}/{key}.json")
+            if blob is None:
+                return None
+            return [tuple(segment) for segment in json.loads(blob.download_as_bytes())["segments"]]
+        except Exception as e:
+            print(f"[Cache] GCS lookup failed, transcribing instead: {e}")
+            return None
+
+    def _put_remote(self, key: str):
+        if not self.bucket_name:
+            return
+        try:
+            upload_file(self.bucket_name, self._path(key), f"{GCS_PREFIX}/{key}.json")
+        except Exception as e:
+            print(f"[Cache] Could not copy transcript to GCS: {e}")
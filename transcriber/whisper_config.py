@@ -0,0 +1,55 @@
+# transcriber/whisper_config.py
+"""
+Which Whisper settings to use on this machine. `python -m transcriber.autotune <clip>`
+measures the candidates and writes the winner to CONFIG_PATH; every transcriber created
+without explicit settings reads it. Without the file we use DEFAULTS.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+CONFIG_PATH = Path("whisper_config.json")
+DEFAULTS = {
+    "model_size": "base",
+    "compute_type": "float32",
+    "cpu_threads": 0,       # 0 lets CTranslate2 decide
+    "num_workers": 1,       # Concurrent transcriptions, i.e. transcribe workers in the pipeline
+}
+
+_cache = {}  # path -> (mtime, config)
+_cache_lock = threading.Lock()
+
+
+def load_config(path: Path = None) -> dict:
+    """Tuned settings, falling back to DEFAULTS for anything missing.
+    Re-read only when the file changes, so calling it per video is free.
+    @return: Dict with the DEFAULTS keys
+    """
+    path = path or CONFIG_PATH
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return dict(DEFAULTS)
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return dict(cached[1])
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"[Whisper] Ignoring unreadable {path}: {e}")
+            return dict(DEFAULTS)
+        config = {key: data.get(key, default) for key, default in DEFAULTS.items()}
+        _cache[path] = (mtime, config)
+        return dict(config)
+
+
+def save_config(config: dict, path: Path = None):
+    """Write the settings (plus whatever measurements came with them) atomically."""
+    path = path or CONFIG_PATH
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(config, indent=2) + "\n")
+    os.replace(tmp, path)
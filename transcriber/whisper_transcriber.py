@@ -1,9 +1,42 @@
+import time
 from pathlib import Path
-from faster_whisper import WhisperModel
+import numpy as np
+from pipeline import metrics
 from transcriber.transcriber import Transcriber
+from transcriber.model_pool import get_model
+from transcriber.whisper_config import load_config
+from transcriber.audio import decode_pcm, to_float
+from transcriber.checkpoint import TranscriptCheckpoint, CHECKPOINT_SECONDS
+from transcriber.silence import SpeechMap, speech_regions
+
+SKIP_SILENCE = True # Leave recesses, dead air and muted stretches out of the model (transcriber/silence.py)
+
+def format_segment(start: float, end: float, text: str) -> str:
+    """One transcript line in [start - end] format."""
+    return f"[{start:.2f} - {end:.2f}] {text}\n"
+
+
+def write_transcript(segments, transcript_path: Path):
+    """Write (start, end, text) segments to a transcript file as they arrive.
+    @param segments: Iterable of (start, end, text)
+    @param transcript_path: Where to write
+    """
+    with open(transcript_path, "w") as f:
+        for start, end, text in segments:
+            f.write(format_segment(start, end, text))
+
+
+def record_transcription(audio_seconds: float, elapsed: float, model_size: str):
+    """Audio seconds in, compute seconds out. real_time_factor < 1 means faster than real time."""
+    metrics.inc("transcribe_audio_seconds_total", audio_seconds, model=model_size)
+    metrics.observe("transcribe_seconds", elapsed, model=model_size)
+    if audio_seconds:
+        metrics.set_gauge("transcribe_real_time_factor", round(elapsed / audio_seconds, 4), model=model_size)
+
 
 class WhisperTranscriber(Transcriber):
-    def __init__(self, model_size: str = "base", compute_type: str = "float32"):
+    def __init__(self, model_size: str = None, compute_type: str = None, cpu_threads: int = None,
+                 language: str = None, decode_options: dict = None, skip_silence: bool = SKIP_SILENCE):
         """
         model_size: one of ["tiny", "base", "small", "medium", "large"]
         better model for gpu - "small", "medium", "large"
@@ -13,8 +46,107 @@ class WhisperTranscriber(Transcriber):
         i went with "base" as the best trade-off for speed and accuraccy. 
         might mess with background noise and heavy accents: 
         dont think that'll be a problem for michigan lol
+
+        Anything left as None comes from whisper_config.json, which
+        `python -m transcriber.autotune` writes after measuring this machine
+        (base/float32 if it was never run).
+
+        cpu_threads: 0 lets CTranslate2 decide.
+        The model comes from the process-wide pool, so creating a transcriber per video is cheap.
+        Concurrent transcribe() calls from the House and Senate threads are safe; CTranslate2 queues them.
+
+        language: e.g. "en", None lets Whisper detect it.
+        decode_options: extra WhisperModel.transcribe arguments (beam_size, temperature, ...).
+        skip_silence: only send speech to the model. A recess costs an energy pass instead of
+        Whisper windows; timestamps stay on the recording's timeline.
+        """
+        config = load_config()
+        self.model_size = model_size or config["model_size"]
+        self.compute_type = compute_type or config["compute_type"]
+        self.cpu_threads = config["cpu_threads"] if cpu_threads is None else cpu_threads
+        self.language = language
+        self.decode_options = dict(decode_options or {})
+        self.skip_silence = skip_silence
+        self.skipped_seconds = 0.0  # Silence left out by this transcriber so far
+        self.num_workers = config["num_workers"]
+        self._model = None
+
+    @property
+    def model(self):
+        """Taken from the process-wide pool on first use, so a transcriber that never runs
+        the model in this process (e.g. chunked with worker processes) doesn't load it."""
+        if self._model is None:
+            self._model = get_model(self.model_size, self.compute_type, self.cpu_threads, self.num_workers)
+        return self._model
+
+    def transcribe_segments(self, audio, offset: float = 0.0, **options):
+        """
+        Run the model and yield (start, end, text) per segment.
+        audio: path to a media file or a 16 kHz float32 numpy array.
+        offset: seconds added to every timestamp, for audio cut out of a longer recording.
+        options: passed through to WhisperModel.transcribe (beam_size, language, ...),
+                 on top of the transcriber's own language / decode_options.
+        """
+        source = str(audio) if isinstance(audio, Path) else audio
+        options = {**self.decode_options, **options}
+        if self.language:
+            options.setdefault("language", self.language)
+
+        speech = None
+        if self.skip_silence:
+            pcm = audio if isinstance(audio, np.ndarray) else decode_pcm(audio)
+            speech = SpeechMap(speech_regions(pcm), len(pcm))
+            self.skipped_seconds += speech.skipped_seconds
+            metrics.inc("transcribe_skipped_seconds_total", speech.skipped_seconds, model=self.model_size)
+            if not isinstance(audio, np.ndarray):
+                print(f"[Whisper] {speech.describe()}: {Path(audio).name}")
+            if not speech.regions:
+                return
+            source = speech.join(pcm)
+
+        started = time.perf_counter()
+        segments, info = self.model.transcribe(source, **options)
+        for segment in segments:
+            start, end = segment.start, segment.end
+            if speech is not None:
+                start, end = speech.to_original(start), speech.to_original(end, end=True)
+            yield start + offset, end + offset, segment.text.strip()
+        record_transcription(info.duration, time.perf_counter() - started, self.model_size)
+
+    def transcribe_to_segments(self, video_path: Path) -> list:
+        """Whole file as a list of (start, end, text), e.g. to cache it.
+        Finished segments are checkpointed every CHECKPOINT_SECONDS of audio. If an earlier
+        run died part way (OOM, deploy, restart), this one decodes from its last segment on
+        and stitches the rest onto what it had.
         """
-        self.model = WhisperModel(model_size, compute_type=compute_type)
+        checkpoint = TranscriptCheckpoint(video_path, self.cache_key_parts())
+        offset, segments = checkpoint.load()
+        audio = video_path
+        if offset:
+            print(f"[Whisper] Resuming {Path(video_path).name} at {offset / 60:.1f} min ({len(segments)} segments done)")
+            audio = to_float(decode_pcm(video_path, start=offset))
+            if not len(audio):  # Died after the last segment, nothing left to transcribe
+                checkpoint.remove()
+                return segments
+
+        saved_at = offset
+        for segment in self.transcribe_segments(audio, offset=offset):
+            segments.append(segment)
+            if segment[1] - saved_at >= CHECKPOINT_SECONDS:
+                checkpoint.save(segment[1], segments)
+                saved_at = segment[1]
+        checkpoint.remove()
+        return segments
+
+    def cache_key_parts(self) -> dict:
+        """Everything besides the audio that changes what this transcriber outputs."""
+        return {
+            "model_size": self.model_size,
+            "compute_type": self.compute_type,
+            "language": self.language,
+            "decode_options": self.decode_options,
+            "skip_silence": self.skip_silence,
+        }
 
     def transcribe(self, video_path: Path) -> str:
         """
@@ -22,18 +154,8 @@ class WhisperTranscriber(Transcriber):
         Prints in segments with start and end times.
         Returns the path to the transcript file.
         """
-        segments, _ = self.model.transcribe(str(video_path))
-
         transcript_path = video_path.with_suffix(".txt")
-        with open(transcript_path, "w") as f:
-            for segment in segments:
-                start = f"{segment.start:.2f}"
-                end = f"{segment.end:.2f}"
-                text = segment.text.strip()
-
-                # Write in [start - end] format into file
-                f.write(f"[{start} - {end}] {text}\n")
-
+        write_transcript(self.transcribe_to_segments(video_path), transcript_path)
         return transcript_path
 
     def transcribe_test(self, video_path: Path) -> str: